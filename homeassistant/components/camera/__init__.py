@@ -51,6 +51,7 @@ from homeassistant.helpers.entity_component import EntityComponent
 from homeassistant.helpers.network import get_url
 from homeassistant.helpers.typing import ConfigType
 from homeassistant.loader import bind_hass
+from homeassistant.util.executor import POOL_INTERACTIVE
 
 from .const import (
     CAMERA_IMAGE_TIMEOUT,
@@ -387,7 +388,9 @@ class Camera(Entity):
 
     async def async_camera_image(self) -> bytes | None:
         """Return bytes of camera image."""
-        return await self.hass.async_add_executor_job(self.camera_image)
+        return await self.hass.async_add_pool_executor_job(
+            POOL_INTERACTIVE, self.camera_image
+        )
 
     async def handle_async_still_stream(
         self, request: web.Request, interval: float
@@ -1,6 +1,7 @@
 """Allows the creation of a sensor that filters state property."""
 from __future__ import annotations
 
+import asyncio
 from collections import Counter, deque
 from copy import copy
 from datetime import timedelta
@@ -30,7 +31,7 @@ from homeassistant.const import (
     STATE_UNAVAILABLE,
     STATE_UNKNOWN,
 )
-from homeassistant.core import callback
+from homeassistant.core import HomeAssistant, State, callback
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.event import async_track_state_change_event
 from homeassistant.helpers.reload import async_setup_reload_service
@@ -69,6 +70,8 @@ DEFAULT_PRECISION = 2
 DEFAULT_FILTER_RADIUS = 2.0
 DEFAULT_FILTER_TIME_CONSTANT = 10
 
+DATA_HISTORY_LOADER = "filter_history_loader"
+
 NAME_TEMPLATE = "{} filter"
 ICON = "mdi:chart-line-variant"
 
@@ -179,6 +182,57 @@ async def async_setup_platform(hass, config, async_add_entities, discovery_info=
     async_add_entities([SensorFilter(name, entity_id, filters)])
 
 
+class HistoryLoader:
+    """Load the last state changes of the sources of the filter sensors.
+
+    The requests of all sensors that are added in the same iteration
+    of the event loop are loaded with one query.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the loader."""
+        self.hass = hass
+        # entity_id -> the number of state changes to load
+        self._requests: dict[str, int] = {}
+        self._future: asyncio.Future | None = None
+
+    async def async_get_last_state_changes(
+        self, entity_id: str, number_of_states: int
+    ) -> list[State]:
+        """Return the last number_of_states state changes of entity_id."""
+        self._requests[entity_id] = max(
+            number_of_states, self._requests.get(entity_id, 0)
+        )
+        if self._future is None:
+            self._future = self.hass.loop.create_future()
+            self.hass.loop.call_soon(self._async_load)
+        states = await self._future
+        return states.get(entity_id, [])[-number_of_states:]
+
+    @callback
+    def _async_load(self) -> None:
+        """Start loading the requested state changes."""
+        requests, future = self._requests, self._future
+        self._requests, self._future = {}, None
+        self.hass.async_create_task(self._async_load_states(requests, future))
+
+    async def _async_load_states(
+        self, requests: dict[str, int], future: asyncio.Future
+    ) -> None:
+        """Load the state changes and resolve the future."""
+        try:
+            states = await self.hass.async_add_executor_job(
+                history.get_last_state_changes_for_entities,
+                self.hass,
+                max(requests.values()),
+                list(requests),
+            )
+        except Exception as err:  # pylint: disable=broad-except
+            future.set_exception(err)
+        else:
+            future.set_result(states)
+
+
 class SensorFilter(SensorEntity):
     """Representation of a Filter Sensor."""
 
@@ -279,16 +333,16 @@ class SensorFilter(SensorEntity):
 
             # Retrieve the largest window_size of each type
             if largest_window_items > 0:
-                filter_history = await self.hass.async_add_executor_job(
-                    partial(
-                        history.get_last_state_changes,
-                        self.hass,
-                        largest_window_items,
-                        entity_id=self._entity,
+                loader = self.hass.data.get(DATA_HISTORY_LOADER)
+                if loader is None:
+                    loader = self.hass.data[DATA_HISTORY_LOADER] = HistoryLoader(
+                        self.hass
+                    )
+                history_list.extend(
+                    await loader.async_get_last_state_changes(
+                        self._entity, largest_window_items
                     )
                 )
-                if self._entity in filter_history:
-                    history_list.extend(filter_history[self._entity])
             if largest_window_time > timedelta(seconds=0):
                 start = dt_util.utcnow() - largest_window_time
                 filter_history = await self.hass.async_add_executor_job(
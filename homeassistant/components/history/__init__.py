@@ -1,7 +1,9 @@
 """Provide pre-made queries on top of the recorder component."""
 from __future__ import annotations
 
-from collections.abc import Iterable
+import asyncio
+from collections.abc import Callable, Iterable
+from concurrent.futures import CancelledError
 from datetime import datetime as dt, timedelta
 import logging
 import time
@@ -15,23 +17,34 @@ from homeassistant.components import websocket_api
 from homeassistant.components.http import HomeAssistantView
 from homeassistant.components.recorder import history
 from homeassistant.components.recorder.models import States
-from homeassistant.components.recorder.statistics import statistics_during_period
+from homeassistant.components.recorder.statistics import (
+    PERIOD_5MINUTE,
+    PERIOD_DAILY,
+    PERIOD_HOURLY,
+    PERIOD_MONTHLY,
+    statistics_during_period,
+)
 from homeassistant.components.recorder.util import session_scope
 from homeassistant.const import (
+    ATTR_ENTITY_ID,
     CONF_DOMAINS,
     CONF_ENTITIES,
     CONF_EXCLUDE,
     CONF_INCLUDE,
+    EVENT_STATE_CHANGED,
     HTTP_BAD_REQUEST,
 )
-from homeassistant.core import HomeAssistant
+from homeassistant.core import Event, HomeAssistant, State, callback
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.deprecation import deprecated_function
 from homeassistant.helpers.entityfilter import (
     CONF_ENTITY_GLOBS,
     INCLUDE_EXCLUDE_BASE_FILTER_SCHEMA,
+    convert_include_exclude_filter,
 )
+from homeassistant.util.async_ import run_callback_threadsafe
 import homeassistant.util.dt as dt_util
+from homeassistant.util.executor import POOL_INTERACTIVE
 
 # mypy: allow-untyped-defs, no-check-untyped-defs
 
@@ -40,6 +53,11 @@ _LOGGER = logging.getLogger(__name__)
 DOMAIN = "history"
 CONF_ORDER = "use_include_order"
 
+DATA_FILTERS = "filters"
+DATA_ENTITY_FILTER = "entity_filter"
+
+STREAM_END_OF_HISTORY = "end_of_history"
+
 GLOB_TO_SQL_CHARS = {
     42: "%",  # *
     46: "_",  # .
@@ -96,6 +114,10 @@ async def async_setup(hass, config):
     conf = config.get(DOMAIN, {})
 
     filters = sqlalchemy_filter_from_include_exclude_conf(conf)
+    hass.data[DOMAIN] = {
+        DATA_FILTERS: filters,
+        DATA_ENTITY_FILTER: convert_include_exclude_filter(conf) if conf else None,
+    }
 
     use_include_order = conf.get(CONF_ORDER)
 
@@ -106,6 +128,7 @@ async def async_setup(hass, config):
     hass.components.websocket_api.async_register_command(
         ws_get_statistics_during_period
     )
+    hass.components.websocket_api.async_register_command(ws_stream_history)
 
     return True
 
@@ -116,6 +139,9 @@ async def async_setup(hass, config):
         vol.Required("start_time"): str,
         vol.Optional("end_time"): str,
         vol.Optional("statistic_id"): str,
+        vol.Optional("period", default=PERIOD_HOURLY): vol.In(
+            [PERIOD_5MINUTE, PERIOD_HOURLY, PERIOD_DAILY, PERIOD_MONTHLY]
+        ),
     }
 )
 @websocket_api.async_response
@@ -149,10 +175,235 @@ async def ws_get_statistics_during_period(
         start_time,
         end_time,
         msg.get("statistic_id"),
+        msg["period"],
     )
     connection.send_result(msg["id"], {"statistics": statistics})
 
 
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "history/stream",
+        vol.Required("start_time"): str,
+        vol.Optional("end_time"): str,
+        vol.Optional("entity_ids"): [cv.entity_id],
+        vol.Optional("include_start_time_state", default=True): bool,
+        vol.Optional("significant_changes_only", default=True): bool,
+    }
+)
+@websocket_api.async_response
+async def ws_stream_history(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Stream the history of a period in chunks.
+
+    Without an end_time the stream continues with the live state
+    changes of the same entities once the history has been sent.
+    """
+    start_time = dt_util.parse_datetime(msg["start_time"])
+    if start_time:
+        start_time = dt_util.as_utc(start_time)
+    else:
+        connection.send_error(msg["id"], "invalid_start_time", "Invalid start_time")
+        return
+
+    end_time = None
+    if "end_time" in msg:
+        end_time = dt_util.parse_datetime(msg["end_time"])
+        if end_time:
+            end_time = dt_util.as_utc(end_time)
+        else:
+            connection.send_error(msg["id"], "invalid_end_time", "Invalid end_time")
+            return
+
+    entity_ids = msg.get("entity_ids")
+    if entity_ids is not None:
+        entity_ids = [entity_id.lower() for entity_id in entity_ids]
+
+    data = hass.data[DOMAIN]
+    stream = HistoryStream(
+        hass,
+        connection,
+        msg["id"],
+        entity_ids,
+        data[DATA_ENTITY_FILTER],
+        msg["significant_changes_only"],
+    )
+    connection.subscriptions[msg["id"]] = stream.async_cancel
+    if end_time is None:
+        stream.async_subscribe()
+    connection.send_result(msg["id"])
+
+    try:
+        await hass.async_add_executor_job(
+            stream.stream_history,
+            start_time,
+            end_time,
+            data[DATA_FILTERS],
+            msg["include_start_time_state"],
+        )
+    except Exception:
+        stream.async_cancel()
+        raise
+    stream.async_history_done()
+
+
+class HistoryStream:
+    """Stream history and then live state changes to a websocket connection.
+
+    State changes that happen while the history is read are held back
+    and only sent when they are newer than the streamed history, so
+    there are no gaps or duplicates between the history and the live
+    states.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        connection: websocket_api.ActiveConnection,
+        msg_id: int,
+        entity_ids: list[str] | None,
+        entity_filter: Callable[[str], bool] | None,
+        significant_changes_only: bool,
+    ) -> None:
+        """Initialize the stream."""
+        self.hass = hass
+        self.connection = connection
+        self.msg_id = msg_id
+        self.entity_ids = entity_ids
+        self._entity_id_set = set(entity_ids) if entity_ids is not None else None
+        self.converter = history.CompactStatesConverter()
+        self._entity_filter = entity_filter
+        self._significant_changes_only = significant_changes_only
+        # Live states received while the history is streamed,
+        # None once the history has been sent
+        self._pending: list[State] | None = []
+        self._cancelled = False
+        self._unsub: Callable[[], None] | None = None
+
+    @callback
+    def async_subscribe(self) -> None:
+        """Start collecting the live state changes."""
+        if self.entity_ids is not None:
+            states = [self.hass.states.get(entity_id) for entity_id in self.entity_ids]
+        else:
+            states = self.hass.states.async_all()
+        assert self._pending is not None
+        self._pending.extend(
+            state
+            for state in states
+            if state is not None and self._async_include_state(state)
+        )
+        if self.entity_ids is not None:
+            # Only the state changes of the streamed entities are dispatched
+            self._unsub = self.hass.bus.async_listen_keyed(
+                EVENT_STATE_CHANGED,
+                ATTR_ENTITY_ID,
+                self.entity_ids,
+                self._async_state_changed,
+            )
+        else:
+            self._unsub = self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._async_state_changed
+            )
+
+    @callback
+    def async_cancel(self) -> None:
+        """Stop the stream."""
+        self._cancelled = True
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    @callback
+    def _async_include_state(self, state: State) -> bool:
+        """Return if a state belongs to the streamed states."""
+        if self._entity_id_set is not None:
+            if state.entity_id not in self._entity_id_set:
+                return False
+        elif state.domain in history.IGNORE_DOMAINS or (
+            self._entity_filter is not None and not self._entity_filter(state.entity_id)
+        ):
+            return False
+        return (
+            not self._significant_changes_only
+            or state.domain in history.SIGNIFICANT_DOMAINS
+            or state.last_changed == state.last_updated
+        )
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Forward or hold back a state change."""
+        new_state = event.data["new_state"]
+        if new_state is None or not self._async_include_state(new_state):
+            return
+        if self._pending is not None:
+            self._pending.append(new_state)
+            return
+        self._async_send_states(self.converter.states_to_dict([new_state]))
+
+    @callback
+    def _async_send_states(self, states: dict) -> None:
+        """Send compact states to the connection."""
+        self.connection.send_message(
+            websocket_api.event_message(self.msg_id, {"states": states})
+        )
+
+    def stream_history(
+        self,
+        start_time: dt,
+        end_time: dt | None,
+        filters: Filters | None,
+        include_start_time_state: bool,
+    ) -> None:
+        """Read the history from the database and send it in chunks."""
+        with session_scope(hass=self.hass) as session:
+            for chunk in history.stream_significant_states(
+                self.hass,
+                session,
+                self.converter,
+                start_time,
+                end_time,
+                self.entity_ids,
+                filters,
+                include_start_time_state,
+                self._significant_changes_only,
+            ):
+                if self._cancelled:
+                    return
+                run_callback_threadsafe(
+                    self.hass.loop, self._async_send_states, chunk
+                ).result()
+                # Wait for each chunk to be written to the client
+                # so the database is not read faster than it is sent
+                try:
+                    asyncio.run_coroutine_threadsafe(
+                        self.connection.async_wait_sent(), self.hass.loop
+                    ).result()
+                except CancelledError:
+                    # The connection was closed
+                    return
+
+    @callback
+    def async_history_done(self) -> None:
+        """Send the held back live states after the history."""
+        if self._cancelled:
+            return
+        pending, self._pending = self._pending, None
+        self.connection.send_message(
+            websocket_api.event_message(self.msg_id, {STREAM_END_OF_HISTORY: True})
+        )
+        assert pending is not None
+        last_updated = self.converter.last_updated
+        states = [
+            state
+            for state in pending
+            if (timestamp := last_updated(state.entity_id)) is None
+            or state.last_updated.timestamp() > timestamp
+        ]
+        if states:
+            self._async_send_states(self.converter.states_to_dict(states))
+
+
 class HistoryPeriodView(HomeAssistantView):
     """Handle history period requests."""
 
@@ -206,6 +457,7 @@ class HistoryPeriodView(HomeAssistantView):
         )
 
         minimal_response = "minimal_response" in request.query
+        compact_response = "compact_response" in request.query
 
         hass = request.app["hass"]
 
@@ -214,11 +466,12 @@ class HistoryPeriodView(HomeAssistantView):
             and entity_ids
             and not _entities_may_have_state_changes_after(hass, entity_ids, start_time)
         ):
-            return self.json([])
+            return self.json({} if compact_response else [])
 
         return cast(
             web.Response,
-            await hass.async_add_executor_job(
+            await hass.async_add_pool_executor_job(
+                POOL_INTERACTIVE,
                 self._sorted_significant_states_json,
                 hass,
                 start_time,
@@ -227,6 +480,7 @@ class HistoryPeriodView(HomeAssistantView):
                 include_start_time_state,
                 significant_changes_only,
                 minimal_response,
+                compact_response,
             ),
         )
 
@@ -239,6 +493,7 @@ class HistoryPeriodView(HomeAssistantView):
         include_start_time_state,
         significant_changes_only,
         minimal_response,
+        compact_response,
     ):
         """Fetch significant stats from the database as json."""
         timer_start = time.perf_counter()
@@ -255,9 +510,18 @@ class HistoryPeriodView(HomeAssistantView):
                     include_start_time_state,
                     significant_changes_only,
                     minimal_response,
+                    compact_response,
                 )
             )
 
+        if compact_response:
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                elapsed = time.perf_counter() - timer_start
+                _LOGGER.debug(
+                    "Extracted states of %d entities in %fs", len(result), elapsed
+                )
+            return self.json(self._include_ordered_compact_result(result))
+
         result = list(result.values())
         if _LOGGER.isEnabledFor(logging.DEBUG):
             elapsed = time.perf_counter() - timer_start
@@ -278,6 +542,19 @@ class HistoryPeriodView(HomeAssistantView):
 
         return self.json(result)
 
+    def _include_ordered_compact_result(self, result):
+        """Reorder a compact result by the entities explicitly included."""
+        if not self.filters or not self.use_include_order:
+            return result
+
+        sorted_result = {
+            entity_id: result.pop(entity_id)
+            for entity_id in self.filters.included_entities
+            if entity_id in result
+        }
+        sorted_result.update(result)
+        return sorted_result
+
 
 def sqlalchemy_filter_from_include_exclude_conf(conf):
     """Build a sql filter from config."""
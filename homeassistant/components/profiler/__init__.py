@@ -14,9 +14,10 @@ import objgraph
 from pyprof2calltree import convert
 import voluptuous as vol
 
+from homeassistant.components import websocket_api
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import CONF_SCAN_INTERVAL, CONF_TYPE
-from homeassistant.core import HomeAssistant, ServiceCall
+from homeassistant.core import HomeAssistant, ServiceCall, callback
 import homeassistant.helpers.config_validation as cv
 from homeassistant.helpers.event import async_track_time_interval
 from homeassistant.helpers.service import async_register_admin_service
@@ -30,6 +31,8 @@ SERVICE_STOP_LOG_OBJECTS = "stop_log_objects"
 SERVICE_DUMP_LOG_OBJECTS = "dump_log_objects"
 SERVICE_LOG_THREAD_FRAMES = "log_thread_frames"
 SERVICE_LOG_EVENT_LOOP_SCHEDULED = "log_event_loop_scheduled"
+SERVICE_START_INSTRUMENTATION = "start_instrumentation"
+SERVICE_STOP_INSTRUMENTATION = "stop_instrumentation"
 
 
 SERVICES = (
@@ -40,11 +43,18 @@ SERVICES = (
     SERVICE_DUMP_LOG_OBJECTS,
     SERVICE_LOG_THREAD_FRAMES,
     SERVICE_LOG_EVENT_LOOP_SCHEDULED,
+    SERVICE_START_INSTRUMENTATION,
+    SERVICE_STOP_INSTRUMENTATION,
 )
 
+PLATFORMS = ["sensor"]
+
 DEFAULT_SCAN_INTERVAL = timedelta(seconds=30)
 
 CONF_SECONDS = "seconds"
+CONF_LIMIT = "limit"
+
+DEFAULT_JOB_LIMIT = 25
 
 LOG_INTERVAL_SUB = "log_interval_subscription"
 
@@ -128,6 +138,14 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
             arepr.max_string = original_maxstring
             arepr.max_other = original_maxother
 
+    async def _async_start_instrumentation(call: ServiceCall) -> None:
+        """Start recording the event loop lag and job execution times."""
+        hass.async_start_instrumentation()
+
+    async def _async_stop_instrumentation(call: ServiceCall) -> None:
+        """Stop recording the event loop lag and job execution times."""
+        hass.async_stop_instrumentation()
+
     async_register_admin_service(
         hass,
         DOMAIN,
@@ -191,19 +209,96 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
         _async_dump_scheduled,
     )
 
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_START_INSTRUMENTATION,
+        _async_start_instrumentation,
+    )
+
+    async_register_admin_service(
+        hass,
+        DOMAIN,
+        SERVICE_STOP_INSTRUMENTATION,
+        _async_stop_instrumentation,
+    )
+
+    websocket_api.async_register_command(hass, websocket_instrumentation)
+    websocket_api.async_register_command(hass, websocket_executor_pools)
+    websocket_api.async_register_command(hass, websocket_templates)
+
+    hass.config_entries.async_setup_platforms(entry, PLATFORMS)
+
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
     for service in SERVICES:
         hass.services.async_remove(domain=DOMAIN, service=service)
     if LOG_INTERVAL_SUB in hass.data[DOMAIN]:
         hass.data[DOMAIN][LOG_INTERVAL_SUB]()
+    hass.async_stop_instrumentation()
     hass.data.pop(DOMAIN)
     return True
 
 
+@websocket_api.require_admin
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "profiler/instrumentation",
+        vol.Optional(CONF_LIMIT, default=DEFAULT_JOB_LIMIT): vol.All(
+            int, vol.Range(min=1)
+        ),
+    }
+)
+@callback
+def websocket_instrumentation(
+    hass: HomeAssistant,
+    connection: websocket_api.connection.ActiveConnection,
+    msg: dict,
+) -> None:
+    """Return the event loop lag and the jobs that ran the longest."""
+    instrumentation = hass.instrumentation
+    if instrumentation is None:
+        connection.send_result(msg["id"], {"running": False})
+        return
+    connection.send_result(
+        msg["id"], {"running": True, **instrumentation.as_dict(msg[CONF_LIMIT])}
+    )
+
+
+@websocket_api.require_admin
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): "profiler/templates",
+        vol.Optional(CONF_LIMIT, default=DEFAULT_JOB_LIMIT): vol.All(
+            int, vol.Range(min=1)
+        ),
+    }
+)
+@callback
+def websocket_templates(
+    hass: HomeAssistant,
+    connection: websocket_api.connection.ActiveConnection,
+    msg: dict,
+) -> None:
+    """Return the templates that rendered the longest and their owners."""
+    instrumentation = hass.instrumentation
+    if instrumentation is None:
+        connection.send_result(msg["id"], {"running": False})
+        return
+    connection.send_result(
+        msg["id"],
+        {
+            "running": True,
+            "templates": instrumentation.templates_as_list(msg[CONF_LIMIT]),
+        },
+    )
+
+
 async def _async_generate_profile(hass: HomeAssistant, call: ServiceCall):
     start_time = int(time.time() * 1000000)
     hass.components.persistent_notification.async_create(
@@ -261,3 +356,15 @@ def _write_memory_profile(heap, heap_path):
 
 def _log_objects(*_):
     _LOGGER.critical("Memory Growth: %s", objgraph.growth(limit=100))
+
+
+@websocket_api.require_admin
+@websocket_api.websocket_command({vol.Required("type"): "profiler/executor_pools"})
+@callback
+def websocket_executor_pools(
+    hass: HomeAssistant,
+    connection: websocket_api.connection.ActiveConnection,
+    msg: dict,
+) -> None:
+    """Return the utilization and queue depth of the executor pools."""
+    connection.send_result(msg["id"], hass.executor_pools.stats())
@@ -0,0 +1,105 @@
+"""Sensor of the event loop lag recorded by the profiler."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.sensor import STATE_CLASS_MEASUREMENT, SensorEntity
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import TIME_MILLISECONDS
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .const import DEFAULT_NAME
+
+# The number of slowest jobs in the attributes
+SLOWEST_JOBS = 5
+# The number of slowest templates in the attributes
+SLOWEST_TEMPLATES = 5
+
+
+async def async_setup_entry(
+    hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback
+) -> None:
+    """Set up the event loop lag sensor."""
+    async_add_entities([EventLoopLagSensor(entry), TemplateRenderTimeSensor(entry)])
+
+
+def _ms(seconds: float | None) -> float | None:
+    """Convert seconds to rounded milliseconds."""
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class EventLoopLagSensor(SensorEntity):
+    """The 95th percentile of the event loop lag while instrumentation runs."""
+
+    _attr_icon = "mdi:timer-sand"
+    _attr_name = f"{DEFAULT_NAME} Event Loop Lag"
+    _attr_state_class = STATE_CLASS_MEASUREMENT
+    _attr_unit_of_measurement = TIME_MILLISECONDS
+
+    def __init__(self, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._attr_unique_id = f"{entry.entry_id}_event_loop_lag"
+
+    async def async_update(self) -> None:
+        """Update the sensor from the recorded histograms."""
+        instrumentation = self.hass.instrumentation
+        self._attr_available = instrumentation is not None
+        if instrumentation is None:
+            return
+        loop_lag = instrumentation.loop_lag
+        self._attr_state = _ms(loop_lag.percentile(95))
+        slowest_jobs: dict[str, Any] = {
+            name: {
+                "type": stats.job_type,
+                "count": stats.run.count,
+                "total": _ms(stats.run.total),
+                "max": _ms(stats.run.max),
+            }
+            for name, stats in instrumentation.slowest_jobs(SLOWEST_JOBS)
+        }
+        self._attr_extra_state_attributes = {
+            "max": _ms(loop_lag.max),
+            "mean": _ms(loop_lag.total / loop_lag.count) if loop_lag.count else None,
+            "samples": loop_lag.count,
+            "slowest_jobs": slowest_jobs,
+        }
+
+
+class TemplateRenderTimeSensor(SensorEntity):
+    """The time spent rendering templates while instrumentation runs."""
+
+    _attr_icon = "mdi:code-braces"
+    _attr_name = f"{DEFAULT_NAME} Template Render Time"
+    _attr_state_class = STATE_CLASS_MEASUREMENT
+    _attr_unit_of_measurement = TIME_MILLISECONDS
+
+    def __init__(self, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        self._attr_unique_id = f"{entry.entry_id}_template_render_time"
+
+    async def async_update(self) -> None:
+        """Update the sensor from the recorded template renders."""
+        instrumentation = self.hass.instrumentation
+        self._attr_available = instrumentation is not None
+        if instrumentation is None:
+            return
+        templates = instrumentation.templates_as_list()
+        self._attr_state = _ms(
+            sum(template["render"]["total"] for template in templates)
+        )
+        self._attr_extra_state_attributes = {
+            "templates": len(templates),
+            "renders": sum(template["render"]["count"] for template in templates),
+            "slowest_templates": [
+                {
+                    "template": template["template"],
+                    "owners": template["owners"],
+                    "count": template["render"]["count"],
+                    "total": _ms(template["render"]["total"]),
+                    "p99": _ms(template["p99"]),
+                    "share": round(template["share"] * 100, 1),
+                }
+                for template in templates[:SLOWEST_TEMPLATES]
+            ],
+        }
@@ -49,10 +49,13 @@ from homeassistant.loader import bind_hass
 import homeassistant.util.dt as dt_util
 
 from . import history, migration, purge, statistics
+from .bulk import BulkInsertBuffer, UnresolvedIdsError
 from .const import CONF_DB_INTEGRITY_CHECK, DATA_INSTANCE, DOMAIN, SQLITE_URL_PREFIX
-from .models import Base, Events, RecorderRuns, States
+from .models import Base, Events, RecorderRuns, StateAttributes, States
 from .pool import RecorderPool
+from .snapshots import StateSnapshots
 from .util import (
+    LRU,
     dburl_to_path,
     end_incomplete_runs,
     move_away_broken_database,
@@ -61,6 +64,7 @@ from .util import (
     setup_connection_for_dialect,
     validate_or_move_away_sqlite_database,
 )
+from .writer import BatchWriter
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -103,20 +107,33 @@ DEFAULT_DB_INTEGRITY_CHECK = True
 DEFAULT_DB_MAX_RETRIES = 10
 DEFAULT_DB_RETRY_WAIT = 3
 DEFAULT_COMMIT_INTERVAL = 1
+DEFAULT_BULK_INSERT = False
+DEFAULT_PIPELINED_WRITES = False
+DEFAULT_PURGE_CHUNK_TIME = 1.0
+DEFAULT_HOURLY_STATISTICS_KEEP_DAYS = 365
+DEFAULT_DAILY_STATISTICS_KEEP_DAYS = 5 * 365
 KEEPALIVE_TIME = 30
 
 # Controls how often we clean up
 # States and Events objects
 EXPIRE_AFTER_COMMITS = 120
 
+# The number of attribute ids to cache in memory
+STATE_ATTRIBUTES_ID_CACHE_SIZE = 2048
+
 CONF_AUTO_PURGE = "auto_purge"
 CONF_DB_URL = "db_url"
 CONF_DB_MAX_RETRIES = "db_max_retries"
 CONF_DB_RETRY_WAIT = "db_retry_wait"
 CONF_PURGE_KEEP_DAYS = "purge_keep_days"
 CONF_PURGE_INTERVAL = "purge_interval"
+CONF_PURGE_CHUNK_TIME = "purge_chunk_time"
+CONF_HOURLY_STATISTICS_KEEP_DAYS = "hourly_statistics_keep_days"
+CONF_DAILY_STATISTICS_KEEP_DAYS = "daily_statistics_keep_days"
 CONF_EVENT_TYPES = "event_types"
 CONF_COMMIT_INTERVAL = "commit_interval"
+CONF_BULK_INSERT = "bulk_insert"
+CONF_PIPELINED_WRITES = "pipelined_writes"
 
 INVALIDATED_ERR = "Database connection invalidated"
 CONNECTIVITY_ERR = "Error in database connectivity during commit"
@@ -141,10 +158,30 @@ CONFIG_SCHEMA = vol.Schema(
                         vol.Coerce(int), vol.Range(min=1)
                     ),
                     vol.Optional(CONF_PURGE_INTERVAL, default=1): cv.positive_int,
+                    vol.Optional(
+                        CONF_PURGE_CHUNK_TIME, default=DEFAULT_PURGE_CHUNK_TIME
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0, min_included=False)),
+                    # The daily and monthly statistics are rolled up from
+                    # the hourly and daily statistics of the last day and
+                    # month, the tiers must be kept at least that long
+                    vol.Optional(
+                        CONF_HOURLY_STATISTICS_KEEP_DAYS,
+                        default=DEFAULT_HOURLY_STATISTICS_KEEP_DAYS,
+                    ): vol.All(vol.Coerce(int), vol.Range(min=2)),
+                    vol.Optional(
+                        CONF_DAILY_STATISTICS_KEEP_DAYS,
+                        default=DEFAULT_DAILY_STATISTICS_KEEP_DAYS,
+                    ): vol.All(vol.Coerce(int), vol.Range(min=32)),
                     vol.Optional(CONF_DB_URL): cv.string,
                     vol.Optional(
                         CONF_COMMIT_INTERVAL, default=DEFAULT_COMMIT_INTERVAL
                     ): cv.positive_int,
+                    vol.Optional(
+                        CONF_BULK_INSERT, default=DEFAULT_BULK_INSERT
+                    ): cv.boolean,
+                    vol.Optional(
+                        CONF_PIPELINED_WRITES, default=DEFAULT_PIPELINED_WRITES
+                    ): cv.boolean,
                     vol.Optional(
                         CONF_DB_MAX_RETRIES, default=DEFAULT_DB_MAX_RETRIES
                     ): cv.positive_int,
@@ -221,7 +258,16 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     entity_filter = convert_include_exclude_filter(conf)
     auto_purge = conf[CONF_AUTO_PURGE]
     keep_days = conf[CONF_PURGE_KEEP_DAYS]
+    purge_chunk_time = conf[CONF_PURGE_CHUNK_TIME]
+    # The monthly statistics are kept forever
+    statistics_keep_days = {
+        statistics.PERIOD_HOURLY: conf[CONF_HOURLY_STATISTICS_KEEP_DAYS],
+        statistics.PERIOD_DAILY: conf[CONF_DAILY_STATISTICS_KEEP_DAYS],
+    }
     commit_interval = conf[CONF_COMMIT_INTERVAL]
+    pipelined_writes = conf[CONF_PIPELINED_WRITES]
+    # The writer thread writes bulk insert batches
+    bulk_insert = conf[CONF_BULK_INSERT] or pipelined_writes
     db_max_retries = conf[CONF_DB_MAX_RETRIES]
     db_retry_wait = conf[CONF_DB_RETRY_WAIT]
     db_url = conf.get(CONF_DB_URL) or DEFAULT_URL.format(
@@ -233,7 +279,11 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
         hass=hass,
         auto_purge=auto_purge,
         keep_days=keep_days,
+        purge_chunk_time=purge_chunk_time,
+        statistics_keep_days=statistics_keep_days,
         commit_interval=commit_interval,
+        bulk_insert=bulk_insert,
+        pipelined_writes=pipelined_writes,
         uri=db_url,
         db_max_retries=db_max_retries,
         db_retry_wait=db_retry_wait,
@@ -325,6 +375,11 @@ class StatisticsTask(NamedTuple):
     """An object to insert into the recorder queue to run a statistics task."""
 
     start: datetime.datetime
+    period: str
+
+
+class StateAttributesMigrationTask:
+    """An object to insert into the recorder queue to move legacy state attributes."""
 
 
 class WaitTask:
@@ -339,7 +394,11 @@ class Recorder(threading.Thread):
         hass: HomeAssistant,
         auto_purge: bool,
         keep_days: int,
+        purge_chunk_time: float,
+        statistics_keep_days: dict[str, int],
         commit_interval: int,
+        bulk_insert: bool,
+        pipelined_writes: bool,
         uri: str,
         db_max_retries: int,
         db_retry_wait: int,
@@ -352,7 +411,13 @@ class Recorder(threading.Thread):
         self.hass = hass
         self.auto_purge = auto_purge
         self.keep_days = keep_days
+        self.purge_chunk_time = purge_chunk_time
+        self.statistics_keep_days = statistics_keep_days
+        self.purge_progress: purge.PurgeProgress | None = None
         self.commit_interval = commit_interval
+        self.bulk_insert = bulk_insert
+        self.pipelined_writes = pipelined_writes
+        self.writer: BatchWriter | None = None
         self.queue: Any = queue.SimpleQueue()
         self.recording_start = dt_util.utcnow()
         self.db_url = uri
@@ -372,6 +437,15 @@ class Recorder(threading.Thread):
         self._keepalive_count = 0
         self._old_states = {}
         self._pending_expunge = []
+        # The states of the event session, they are added
+        # to the snapshots once they are committed
+        self._pending_snapshot_states = []
+        self.state_snapshots = StateSnapshots()
+        self._bulk_buffer = BulkInsertBuffer()
+        self.statistics_compiler = statistics.StatisticsCompiler(hass)
+        self._entity_shared_attrs = {}
+        self._state_attributes_ids = LRU(STATE_ATTRIBUTES_ID_CACHE_SIZE)
+        self._pending_state_attributes = {}
         self.event_session = None
         self.get_session = None
         self._completed_first_database_setup = None
@@ -389,7 +463,7 @@ class Recorder(threading.Thread):
     @callback
     def async_initialize(self):
         """Initialize the recorder."""
-        self._event_listener = self.hass.bus.async_listen(
+        self._event_listener = self.hass.bus.async_listen_batch(
             MATCH_ALL, self.event_listener, event_filter=self._async_event_filter
         )
         self._queue_watcher = async_track_time_interval(
@@ -460,10 +534,14 @@ class Recorder(threading.Thread):
 
     def do_adhoc_statistics(self, **kwargs):
         """Trigger an adhoc statistics run."""
+        period = kwargs.get("period", statistics.PERIOD_HOURLY)
         start = kwargs.get("start")
         if not start:
-            start = statistics.get_start_time()
-        self.queue.put(StatisticsTask(start))
+            if period == statistics.PERIOD_HOURLY:
+                start = statistics.get_start_time()
+            else:
+                start = statistics.get_short_term_start_time()
+        self.queue.put(StatisticsTask(start, period))
 
     @callback
     def async_register(self, shutdown_task, hass_started):
@@ -543,10 +621,10 @@ class Recorder(threading.Thread):
             self.queue.put(PerodicCleanupTask())
 
     @callback
-    def async_hourly_statistics(self, now):
-        """Trigger the hourly statistics run."""
-        start = statistics.get_start_time()
-        self.queue.put(StatisticsTask(start))
+    def async_periodic_statistics(self, now):
+        """Trigger the 5-minute statistics run."""
+        start = statistics.get_short_term_start_time()
+        self.queue.put(StatisticsTask(start, statistics.PERIOD_5MINUTE))
 
     def _async_setup_periodic_tasks(self):
         """Prepare periodic tasks."""
@@ -554,9 +632,13 @@ class Recorder(threading.Thread):
         async_track_time_change(
             self.hass, self.async_nightly_tasks, hour=4, minute=12, second=0
         )
-        # Compile hourly statistics every hour at *:12
+        # Compile 5-minute statistics every 5 minutes, the statistics
+        # of the last period ending on a full hour are rolled up hourly
         async_track_time_change(
-            self.hass, self.async_hourly_statistics, minute=12, second=0
+            self.hass,
+            self.async_periodic_statistics,
+            minute=range(0, 60, 5),
+            second=10,
         )
 
     def run(self):
@@ -574,8 +656,10 @@ class Recorder(threading.Thread):
 
         schema_is_current = migration.schema_is_current(current_version)
         if schema_is_current:
+            has_legacy_state_attributes = migration.has_legacy_state_attributes(self)
             self._setup_run()
         else:
+            has_legacy_state_attributes = True
             self.migration_in_progress = True
 
         self.hass.add_job(self.async_connection_success)
@@ -607,7 +691,12 @@ class Recorder(threading.Thread):
                 self._shutdown()
                 return
 
+        if has_legacy_state_attributes:
+            # States recorded before schema version 17 are moved to
+            # the state_attributes table in batches between events
+            self.queue.put(StateAttributesMigrationTask())
         _LOGGER.debug("Recorder processing the queue")
+        self._start_writer()
         self.hass.add_job(self._async_recorder_ready)
         self._run_event_loop()
 
@@ -616,11 +705,12 @@ class Recorder(threading.Thread):
         # Use a session for the event read loop
         # with a commit every time the event time
         # has changed. This reduces the disk io.
-        while event := self.queue.get():
-            try:
-                self._process_one_event_or_recover(event)
-            except Exception as err:  # pylint: disable=broad-except
-                _LOGGER.exception("Error while processing event %s: %s", event, err)
+        while task := self.queue.get():
+            for event in task if isinstance(task, list) else (task,):
+                try:
+                    self._process_one_event_or_recover(event)
+                except Exception as err:  # pylint: disable=broad-except
+                    _LOGGER.exception("Error while processing event %s: %s", event, err)
 
         self._shutdown()
 
@@ -698,6 +788,9 @@ class Recorder(threading.Thread):
 
     def _run_purge(self, keep_days, repack, apply_filter):
         """Purge the database."""
+        # Buffered states may reference attributes that are
+        # unused in the database until they are committed
+        self._commit_event_session_or_retry()
         if purge.purge_old_data(self, keep_days, repack, apply_filter):
             # We always need to do the db cleanups after a purge
             # is finished to ensure the WAL checkpoint and other
@@ -709,17 +802,27 @@ class Recorder(threading.Thread):
 
     def _run_purge_entities(self, entity_filter):
         """Purge entities from the database."""
+        self._commit_event_session_or_retry()
         if purge.purge_entity_data(self, entity_filter):
             return
         # Schedule a new purge task if this one didn't finish
         self.queue.put(PurgeEntitiesTask(entity_filter))
 
-    def _run_statistics(self, start):
+    def _run_statistics(self, start, period):
         """Run statistics task."""
-        if statistics.compile_statistics(self, start):
+        self._commit_event_session_or_retry()
+        if statistics.compile_statistics(self, start, period):
             return
         # Schedule a new statistics task if this one didn't finish
-        self.queue.put(StatisticsTask(start))
+        self.queue.put(StatisticsTask(start, period))
+
+    def _run_state_attributes_migration(self):
+        """Move the attributes of a batch of legacy states."""
+        self._commit_event_session_or_retry()
+        if migration.migrate_state_attributes(self):
+            return
+        # Schedule a new migration task if this one didn't finish
+        self.queue.put(StateAttributesMigrationTask())
 
     def _process_one_event(self, event):
         """Process one event."""
@@ -733,9 +836,15 @@ class Recorder(threading.Thread):
             perodic_db_cleanups(self)
             return
         if isinstance(event, StatisticsTask):
-            self._run_statistics(event.start)
+            self._run_statistics(event.start, event.period)
+            return
+        if isinstance(event, StateAttributesMigrationTask):
+            self._run_state_attributes_migration()
             return
         if isinstance(event, WaitTask):
+            if self.writer:
+                self._hand_off_bulk_buffer()
+                self.writer.wait_idle()
             self._queue_watch.set()
             return
         if event.event_type == EVENT_TIME_CHANGED:
@@ -747,12 +856,27 @@ class Recorder(threading.Thread):
                 self._timechanges_seen += 1
                 if self._timechanges_seen >= self.commit_interval:
                     self._timechanges_seen = 0
-                    self._commit_event_session_or_retry()
+                    self._commit_or_hand_off()
             return
 
         if not self.enabled:
             return
 
+        if event.event_type == EVENT_STATE_CHANGED:
+            self.statistics_compiler.add_state_changed_event(event)
+
+        if self.bulk_insert:
+            self._buffer_event(event)
+        else:
+            self._add_event_to_session(event)
+
+        # If they do not have a commit interval
+        # than we commit right away
+        if not self.commit_interval:
+            self._commit_or_hand_off()
+
+    def _add_event_to_session(self, event):
+        """Add ORM objects for an event to the event session."""
         try:
             if event.event_type == EVENT_STATE_CHANGED:
                 dbevent = Events.from_event(event, event_data="{}")
@@ -766,32 +890,129 @@ class Recorder(threading.Thread):
 
         if event.event_type == EVENT_STATE_CHANGED:
             try:
-                dbstate = States.from_event(event)
-                has_new_state = event.data.get("new_state")
-                if dbstate.entity_id in self._old_states:
-                    old_state = self._old_states.pop(dbstate.entity_id)
-                    if old_state.state_id:
-                        dbstate.old_state_id = old_state.state_id
-                    else:
-                        dbstate.old_state = old_state
-                if not has_new_state:
-                    dbstate.state = None
-                dbstate.event = dbevent
-                dbstate.created = event.time_fired
-                self.event_session.add(dbstate)
-                if has_new_state:
-                    self._old_states[dbstate.entity_id] = dbstate
-                    self._pending_expunge.append(dbstate)
+                shared_attrs = self._shared_attrs_for_event(event)
             except (TypeError, ValueError):
                 _LOGGER.warning(
                     "State is not JSON serializable: %s",
                     event.data.get("new_state"),
                 )
+                return
+            dbstate = States(**States.row_from_event(event))
+            has_new_state = event.data.get("new_state")
+            if dbstate.entity_id in self._old_states:
+                old_state = self._old_states.pop(dbstate.entity_id)
+                if old_state.state_id:
+                    dbstate.old_state_id = old_state.state_id
+                else:
+                    dbstate.old_state = old_state
+            if not has_new_state:
+                dbstate.state = None
+            self._attach_state_attributes(dbstate, shared_attrs)
+            dbstate.event = dbevent
+            dbstate.created = event.time_fired
+            self.event_session.add(dbstate)
+            self._pending_snapshot_states.append(dbstate)
+            if has_new_state:
+                self._old_states[dbstate.entity_id] = dbstate
+                self._pending_expunge.append(dbstate)
+
+    def _attach_state_attributes(self, dbstate, shared_attrs):
+        """Reference existing attributes or add new ones to the event session."""
+        if (pending := self._pending_state_attributes.get(shared_attrs)) is not None:
+            dbstate.state_attributes = pending
+        elif (attributes_id := self._find_attributes_id(shared_attrs)) is not None:
+            dbstate.attributes_id = attributes_id
+        else:
+            pending = StateAttributes.from_shared_attrs(shared_attrs)
+            self._pending_state_attributes[shared_attrs] = pending
+            dbstate.state_attributes = pending
 
-        # If they do not have a commit interval
-        # than we commit right away
-        if not self.commit_interval:
-            self._commit_event_session_or_retry()
+    def _buffer_event(self, event):
+        """Add rows for an event to the bulk insert buffer."""
+        try:
+            if event.event_type == EVENT_STATE_CHANGED:
+                event_row = Events.row_from_event(event, event_data="{}")
+            else:
+                event_row = Events.row_from_event(event)
+        except (TypeError, ValueError):
+            _LOGGER.warning("Event is not JSON serializable: %s", event)
+            return
+        event_row["created"] = event.time_fired
+        event_index = self._bulk_buffer.add_event(event_row)
+
+        if event.event_type != EVENT_STATE_CHANGED:
+            return
+
+        try:
+            shared_attrs = self._shared_attrs_for_event(event)
+        except (TypeError, ValueError):
+            _LOGGER.warning(
+                "State is not JSON serializable: %s",
+                event.data.get("new_state"),
+            )
+            return
+        if shared_attrs in self._bulk_buffer.attributes:
+            attributes_id = None
+        else:
+            attributes_id = self._find_attributes_id(shared_attrs)
+        state_row = States.row_from_event(event)
+        has_new_state = event.data.get("new_state") is not None
+        if not has_new_state:
+            state_row["state"] = None
+        state_row["created"] = event.time_fired
+        self._bulk_buffer.add_state(
+            state_row, event_index, has_new_state, shared_attrs, attributes_id
+        )
+
+    def _shared_attrs_for_event(self, event):
+        """Serialize the attributes of the new state of a state_changed event.
+
+        The JSON is reused when the attributes of the entity did
+        not change since its last recorded state.
+        """
+        entity_id = event.data["entity_id"]
+        state = event.data.get("new_state")
+        if state is None:
+            self._entity_shared_attrs.pop(entity_id, None)
+            return StateAttributes.shared_attrs_from_event(event)
+
+        attributes = state.attributes
+        last = self._entity_shared_attrs.get(entity_id)
+        if last is not None and (last[0] is attributes or last[0] == attributes):
+            return last[1]
+
+        shared_attrs = StateAttributes.shared_attrs_from_event(event)
+        self._entity_shared_attrs[entity_id] = (attributes, shared_attrs)
+        return shared_attrs
+
+    def _find_attributes_id(self, shared_attrs):
+        """Return the id of the committed attributes matching shared_attrs."""
+        attributes_id = self._state_attributes_ids.get(shared_attrs)
+        if attributes_id is not None:
+            return attributes_id
+
+        with self.event_session.no_autoflush:
+            db_attributes = (
+                self.event_session.query(StateAttributes.attributes_id)
+                .filter(
+                    StateAttributes.hash
+                    == StateAttributes.hash_shared_attrs(shared_attrs)
+                )
+                .filter(StateAttributes.shared_attrs == shared_attrs)
+                .first()
+            )
+        if db_attributes is None:
+            return None
+        self._state_attributes_ids[shared_attrs] = db_attributes.attributes_id
+        return db_attributes.attributes_id
+
+    def evict_state_attributes_ids(self, attributes_ids):
+        """Remove purged attributes from the attributes cache."""
+        for shared_attrs, attributes_id in self._state_attributes_ids.items():
+            if attributes_id in attributes_ids:
+                del self._state_attributes_ids[shared_attrs]
+        if self.writer:
+            self.writer.evict_attributes_ids(attributes_ids)
 
     def _handle_database_error(self, err):
         """Handle a database error that may result in moving away the corrupt db."""
@@ -803,9 +1024,52 @@ class Recorder(threading.Thread):
             return True
         return False
 
+    def _start_writer(self):
+        """Start the writer thread if the writes are pipelined."""
+        if not self.pipelined_writes:
+            return
+        if self.db_url == SQLITE_URL_PREFIX or ":memory:" in self.db_url:
+            _LOGGER.warning(
+                "Pipelined writes are not supported with an in-memory database"
+            )
+            return
+        self.writer = BatchWriter(self)
+        self.writer.start()
+
+    def _commit_or_hand_off(self):
+        """Hand off the buffered rows to the writer or commit them."""
+        if self.writer:
+            self._hand_off_bulk_buffer()
+            return
+        self._commit_event_session_or_retry()
+
+    def _hand_off_bulk_buffer(self):
+        """Hand off the buffered rows to the writer thread."""
+        writer = self.writer
+        for shared_attrs, attributes_id in writer.written_attributes_ids().items():
+            self._state_attributes_ids[shared_attrs] = attributes_id
+        if self._bulk_buffer:
+            writer.submit(self._bulk_buffer.detach())
+        # The event session only reads in this mode, end its transaction
+        # so it does not keep an old snapshot of the database open
+        self.event_session.commit()
+
     def _commit_event_session_or_retry(self):
         """Commit the event session if there is work to do."""
-        if not self.event_session.new and not self.event_session.dirty:
+        if self.writer:
+            # Everything must be written when this returns
+            self._hand_off_bulk_buffer()
+            self.writer.wait_idle()
+            for (
+                shared_attrs,
+                attributes_id,
+            ) in self.writer.written_attributes_ids().items():
+                self._state_attributes_ids[shared_attrs] = attributes_id
+        if (
+            not self.event_session.new
+            and not self.event_session.dirty
+            and not self._bulk_buffer
+        ):
             return
         tries = 1
         while tries <= self.db_max_retries:
@@ -828,6 +1092,43 @@ class Recorder(threading.Thread):
     def _commit_event_session(self):
         self._commits_without_expire += 1
 
+        if not self._bulk_buffer:
+            self._flush_and_commit_event_session()
+        else:
+            try:
+                self._write_bulk_buffer()
+                self._flush_and_commit_event_session()
+            except SQLAlchemyError:
+                # Rollback so the buffered rows can be written
+                # again by the next attempt
+                self.event_session.rollback()
+                raise
+
+        state_snapshots = self.state_snapshots
+        for dbstate in self._pending_snapshot_states:
+            state_snapshots.add(
+                dbstate.entity_id, dbstate.state_id, dbstate.last_updated
+            )
+        self._pending_snapshot_states = []
+        for pending in self._bulk_buffer.states:
+            state_snapshots.add(
+                pending.row["entity_id"], pending.state_id, pending.row["last_updated"]
+            )
+        for shared_attrs, attributes_id in self._bulk_buffer.committed().items():
+            self._state_attributes_ids[shared_attrs] = attributes_id
+        for shared_attrs, db_attributes in self._pending_state_attributes.items():
+            self._state_attributes_ids[shared_attrs] = db_attributes.attributes_id
+        self._pending_state_attributes = {}
+
+        # Expire is an expensive operation (frequently more expensive
+        # than the flush and commit itself) so we only
+        # do it after EXPIRE_AFTER_COMMITS commits
+        if self._commits_without_expire == EXPIRE_AFTER_COMMITS:
+            self._commits_without_expire = 0
+            self.event_session.expire_all()
+
+    def _flush_and_commit_event_session(self):
+        """Flush and commit the event session."""
         if self._pending_expunge:
             self.event_session.flush()
             for dbstate in self._pending_expunge:
@@ -838,16 +1139,23 @@ class Recorder(threading.Thread):
             self._pending_expunge = []
         self.event_session.commit()
 
-        # Expire is an expensive operation (frequently more expensive
-        # than the flush and commit itself) so we only
-        # do it after EXPIRE_AFTER_COMMITS commits
-        if self._commits_without_expire == EXPIRE_AFTER_COMMITS:
-            self._commits_without_expire = 0
-            self.event_session.expire_all()
+    def _write_bulk_buffer(self):
+        """Insert the buffered rows, one by one if the bulk insert ids are unknown."""
+        try:
+            self._bulk_buffer.write(self.event_session)
+        except UnresolvedIdsError as err:
+            _LOGGER.warning(
+                "Could not resolve the ids of bulk inserted rows (%s), "
+                "inserting them one by one",
+                err,
+            )
+            self.event_session.rollback()
+            self._bulk_buffer.write(self.event_session, row_by_row=True)
 
     def _handle_sqlite_corruption(self):
         """Handle the sqlite3 database being corrupt."""
         self._close_event_session()
+        self._state_attributes_ids.clear()
         self._close_connection()
         move_away_broken_database(dburl_to_path(self.db_url))
         self._setup_recorder()
@@ -856,6 +1164,9 @@ class Recorder(threading.Thread):
     def _close_event_session(self):
         """Close the event session."""
         self._old_states = {}
+        self._pending_state_attributes = {}
+        self._pending_snapshot_states = []
+        self._bulk_buffer.reset()
 
         if not self.event_session:
             return
@@ -884,9 +1195,12 @@ class Recorder(threading.Thread):
         self.event_session.connection().scalar(select([1]))
 
     @callback
-    def event_listener(self, event):
-        """Listen for new events and put them in the process queue."""
-        self.queue.put(event)
+    def event_listener(self, events):
+        """Listen for new events and put them in the process queue.
+
+        Events that were fired together are queued as one list.
+        """
+        self.queue.put(events[0] if len(events) == 1 else events)
 
     def block_till_done(self):
         """Block till all events processed.
@@ -956,7 +1270,9 @@ class Recorder(threading.Thread):
         with session_scope(session=self.get_session()) as session:
             start = self.recording_start
             end_incomplete_runs(session, start)
+            self.statistics_compiler.load_last_sums(session)
             self.run_info = RecorderRuns(start=start, created=dt_util.utcnow())
+            self.state_snapshots.reset(start)
             session.add(self.run_info)
             session.flush()
             session.expunge(self.run_info)
@@ -981,4 +1297,7 @@ class Recorder(threading.Thread):
         """Save end time for current run."""
         self.hass.add_job(self._async_stop_queue_watcher_and_event_listener)
         self._end_session()
+        if self.writer:
+            self.writer.stop()
+            self.writer = None
         self._close_connection()
@@ -0,0 +1,305 @@
+"""Buffer events and states between commits and write them with bulk inserts."""
+from __future__ import annotations
+
+from typing import Any
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.orm.session import Session
+
+from .models import Events, StateAttributes, States
+
+EVENTS_TABLE = Events.__table__
+STATES_TABLE = States.__table__
+STATE_ATTRIBUTES_TABLE = StateAttributes.__table__
+
+# The maximum number of rows in one multi row INSERT ... RETURNING
+MAX_ROWS_PER_INSERT = 500
+
+UPDATE_OLD_STATE_ID = (
+    STATES_TABLE.update()
+    .where(STATES_TABLE.c.state_id == bindparam("b_state_id"))
+    .values(old_state_id=bindparam("b_old_state_id"))
+)
+
+
+class UnresolvedIdsError(Exception):
+    """The primary keys of bulk inserted rows could not be determined."""
+
+
+class PendingState:
+    """A state row waiting for the next bulk insert."""
+
+    __slots__ = ("row", "event_index", "old_state", "shared_attrs", "state_id")
+
+    def __init__(
+        self,
+        row: dict[str, Any],
+        event_index: int,
+        old_state: PendingState | None,
+        shared_attrs: str | None,
+    ) -> None:
+        """Initialize the pending state."""
+        self.row = row
+        self.event_index = event_index
+        # The previous state of the entity when it is still
+        # part of the same batch and does not have an id yet
+        self.old_state = old_state
+        # The serialized attributes when they are inserted
+        # with the same batch and do not have an id yet
+        self.shared_attrs = shared_attrs
+        self.state_id: int | None = None
+
+
+class BulkInsertBuffer:
+    """Collect event and state rows and insert them with executemany.
+
+    The ORM write path creates one Events and one States object per
+    event and lets the unit of work track the old_state relationship.
+    This buffer keeps plain column dicts instead and resolves event_id
+    and old_state_id from the primary keys the database assigned once
+    the rows have been inserted.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the buffer."""
+        self.events: list[dict[str, Any]] = []
+        self.states: list[PendingState] = []
+        # shared_attrs -> state_attributes row for attributes
+        # that are not in the database yet
+        self.attributes: dict[str, dict[str, Any]] = {}
+        self.attributes_ids: dict[str, int] = {}
+        # entity_id -> the state_id of the last committed state or
+        # the PendingState if the last state is still in the buffer
+        self._last_states: dict[str, int | PendingState] = {}
+
+    def __len__(self) -> int:
+        """Return the number of buffered events."""
+        return len(self.events)
+
+    def add_event(self, row: dict[str, Any]) -> int:
+        """Buffer an event row and return its index in the batch."""
+        self.events.append(row)
+        return len(self.events) - 1
+
+    def add_state(
+        self,
+        row: dict[str, Any],
+        event_index: int,
+        has_new_state: bool,
+        shared_attrs: str,
+        attributes_id: int | None,
+    ) -> None:
+        """Buffer a state row that belongs to the event at event_index.
+
+        If attributes_id is None the attributes are inserted
+        with the batch.
+        """
+        entity_id = row["entity_id"]
+        last_state = self._last_states.pop(entity_id, None)
+        old_state = None
+        row["old_state_id"] = None
+        if isinstance(last_state, PendingState):
+            old_state = last_state
+        elif last_state is not None:
+            row["old_state_id"] = last_state
+        row["attributes_id"] = attributes_id
+        if attributes_id is None:
+            if shared_attrs not in self.attributes:
+                self.attributes[shared_attrs] = {
+                    "hash": StateAttributes.hash_shared_attrs(shared_attrs),
+                    "shared_attrs": shared_attrs,
+                }
+        else:
+            shared_attrs = None
+        pending = PendingState(row, event_index, old_state, shared_attrs)
+        self.states.append(pending)
+        if has_new_state:
+            self._last_states[entity_id] = pending
+
+    def write(self, session: Session, row_by_row: bool = False) -> None:
+        """Insert the buffered rows in the session's transaction.
+
+        This may be called again with the same buffer if the commit
+        failed and was rolled back. Raises UnresolvedIdsError if the
+        primary keys of the inserted rows could not be determined, in
+        which case the transaction must be rolled back and the rows
+        written again with row_by_row.
+        """
+        if not self.events:
+            return
+
+        for pending in self.states:
+            pending.state_id = None
+
+        event_ids = _insert_and_resolve_ids(
+            session, EVENTS_TABLE, Events.event_id, self.events, row_by_row
+        )
+        if not self.states:
+            return
+
+        self.attributes_ids = {}
+        if self.attributes:
+            self.attributes_ids = dict(
+                zip(
+                    self.attributes,
+                    _insert_and_resolve_ids(
+                        session,
+                        STATE_ATTRIBUTES_TABLE,
+                        StateAttributes.attributes_id,
+                        list(self.attributes.values()),
+                        row_by_row,
+                    ),
+                )
+            )
+
+        for pending in self.states:
+            pending.row["event_id"] = event_ids[pending.event_index]
+            old_state = pending.old_state
+            if old_state is not None and old_state.state_id is not None:
+                # The old state was written with an earlier batch
+                pending.row["old_state_id"] = old_state.state_id
+                pending.old_state = None
+            if pending.shared_attrs is not None:
+                pending.row["attributes_id"] = self.attributes_ids[pending.shared_attrs]
+
+        state_ids = _insert_and_resolve_ids(
+            session,
+            STATES_TABLE,
+            States.state_id,
+            [state.row for state in self.states],
+            row_by_row,
+        )
+
+        linked_states = []
+        for pending, state_id in zip(self.states, state_ids):
+            pending.state_id = state_id
+            if pending.old_state is not None:
+                linked_states.append(
+                    {
+                        "b_state_id": state_id,
+                        "b_old_state_id": pending.old_state.state_id,
+                    }
+                )
+
+        if linked_states:
+            # States that replaced a state from the same batch
+            # can only be linked after both have an id
+            session.execute(UPDATE_OLD_STATE_ID, linked_states)
+
+    def detach(self) -> BulkInsertBuffer:
+        """Move the buffered rows to a new buffer that can be written later.
+
+        The states that are buffered after this are linked to the
+        states of the detached buffer once it has been written.
+        """
+        batch = BulkInsertBuffer()
+        batch.events = self.events
+        batch.states = self.states
+        batch.attributes = self.attributes
+        self.events = []
+        self.states = []
+        self.attributes = {}
+        return batch
+
+    def resolve_attributes(self, attributes_ids: dict[str, int]) -> None:
+        """Reference attributes that were written since they were buffered."""
+        if not self.attributes:
+            return
+        for pending in self.states:
+            if (
+                pending.shared_attrs is not None
+                and (attributes_id := attributes_ids.get(pending.shared_attrs))
+                is not None
+            ):
+                pending.row["attributes_id"] = attributes_id
+                pending.shared_attrs = None
+        self.attributes = {
+            shared_attrs: row
+            for shared_attrs, row in self.attributes.items()
+            if shared_attrs not in attributes_ids
+        }
+
+    def dropped(self) -> None:
+        """Forget the ids of rows that could not be written."""
+        for pending in self.states:
+            pending.state_id = None
+
+    def committed(self) -> dict[str, int]:
+        """Clear the buffer after the rows have been committed.
+
+        Returns the ids of the attributes that were inserted.
+        """
+        for pending in self.states:
+            # Do not keep the whole chain of old states alive
+            pending.old_state = None
+        attributes_ids = self.attributes_ids
+        last_states: dict[str, int | PendingState] = {}
+        for entity_id, last_state in self._last_states.items():
+            if isinstance(last_state, PendingState):
+                if last_state.state_id is None:
+                    continue
+                last_state = last_state.state_id
+            last_states[entity_id] = last_state
+        self._last_states = last_states
+        self.events = []
+        self.states = []
+        self.attributes = {}
+        self.attributes_ids = {}
+        return attributes_ids
+
+    def reset(self) -> None:
+        """Drop all buffered rows and known old states."""
+        self.events = []
+        self.states = []
+        self.attributes = {}
+        self.attributes_ids = {}
+        self._last_states = {}
+
+
+def _insert_and_resolve_ids(
+    session: Session,
+    table: Any,
+    id_column: Any,
+    rows: list[dict[str, Any]],
+    row_by_row: bool,
+) -> list[int]:
+    """Insert rows and return their primary keys in insertion order."""
+    if row_by_row:
+        return [
+            session.execute(table.insert(), row).inserted_primary_key[0] for row in rows
+        ]
+
+    if session.get_bind().dialect.name == "postgresql":
+        ids = []
+        for start in range(0, len(rows), MAX_ROWS_PER_INSERT):
+            ids.extend(
+                row[0]
+                for row in session.execute(
+                    table.insert()
+                    .values(rows[start : start + MAX_ROWS_PER_INSERT])
+                    .returning(id_column)
+                )
+            )
+        return ids
+
+    # Without RETURNING the keys of an executemany are not reported,
+    # they are the ones above the maximum before the insert as long
+    # as nothing else inserted rows in between
+    max_id = session.execute(select(func.max(id_column))).scalar() or 0
+    session.execute(table.insert(), rows)
+    ids = _select_ids_above(session, id_column, max_id)
+    if len(ids) != len(rows):
+        raise UnresolvedIdsError(
+            f"Expected {len(rows)} new rows in {table.name}, found {len(ids)}"
+        )
+    return ids
+
+
+def _select_ids_above(session: Session, id_column: Any, max_id: int) -> list[int]:
+    """Return the primary keys above max_id in ascending order."""
+    return [
+        row[0]
+        for row in session.execute(
+            select(id_column).where(id_column > max_id).order_by(id_column)
+        )
+    ]
@@ -8,3 +8,6 @@ CONF_DB_INTEGRITY_CHECK = "db_integrity_check"
 
 # The maximum number of rows (events) we purge in one delete statement
 MAX_ROWS_TO_PURGE = 1000
+
+# The maximum number of states we move to the state_attributes table in one batch
+MAX_ROWS_TO_MIGRATE = 1000
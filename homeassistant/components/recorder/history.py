@@ -3,6 +3,7 @@ from __future__ import annotations
 
 from collections import defaultdict
 from itertools import groupby
+import json
 import logging
 import time
 
@@ -11,14 +12,22 @@ from sqlalchemy.ext import baked
 
 from homeassistant.components import recorder
 from homeassistant.components.recorder.models import (
+    StateAttributes,
     States,
+    process_timestamp,
     process_timestamp_to_utc_isoformat,
+    process_timestamp_to_utc_timestamp,
+)
+from homeassistant.components.recorder.util import (
+    execute,
+    session_scope,
+    supports_window_functions,
 )
-from homeassistant.components.recorder.util import execute, session_scope
 from homeassistant.core import split_entity_id
 import homeassistant.util.dt as dt_util
 
 from .models import LazyState
+from .snapshots import SNAPSHOT_MARGIN
 
 # mypy: allow-untyped-defs, no-check-untyped-defs
 
@@ -27,6 +36,15 @@ _LOGGER = logging.getLogger(__name__)
 STATE_KEY = "state"
 LAST_CHANGED_KEY = "last_changed"
 
+COMPACT_STATE_KEY = "s"
+COMPACT_ATTRIBUTES_KEY = "a"
+COMPACT_LAST_UPDATED_KEY = "lu"
+
+STREAM_CHUNK_SIZE = 1000
+
+# The maximum number of state ids in the IN clause of a snapshot lookup
+MAX_STATE_IDS_PER_QUERY = 1000
+
 SIGNIFICANT_DOMAINS = (
     "climate",
     "device_tracker",
@@ -47,7 +65,9 @@ QUERY_STATES = [
     States.domain,
     States.entity_id,
     States.state,
-    States.attributes,
+    # States recorded before the state_attributes table existed
+    # still have their attributes inline
+    func.coalesce(StateAttributes.shared_attrs, States.attributes).label("attributes"),
     States.last_changed,
     States.last_updated,
 ]
@@ -60,6 +80,13 @@ def async_setup(hass):
     hass.data[HISTORY_BAKERY] = baked.bakery()
 
 
+def _query_states(session):
+    """Return a query for QUERY_STATES joined with the shared attributes."""
+    return session.query(*QUERY_STATES).outerjoin(
+        StateAttributes, States.attributes_id == StateAttributes.attributes_id
+    )
+
+
 def get_significant_states(hass, *args, **kwargs):
     """Wrap _get_significant_states with a sql session."""
     with session_scope(hass=hass) as session:
@@ -76,6 +103,7 @@ def _get_significant_states(
     include_start_time_state=True,
     significant_changes_only=True,
     minimal_response=False,
+    compact_response=False,
 ):
     """
     Return states changes during UTC period start_time - end_time.
@@ -83,12 +111,13 @@ def _get_significant_states(
     Significant states are all states where there is a state change,
     as well as all states from certain domains (for instance
     thermostat so that we get current temperature in our graphs).
+
+    With compact_response the states of each entity are returned in
+    the format of _sorted_states_to_compact_dict.
     """
     timer_start = time.perf_counter()
 
-    baked_query = hass.data[HISTORY_BAKERY](
-        lambda session: session.query(*QUERY_STATES)
-    )
+    baked_query = hass.data[HISTORY_BAKERY](_query_states)
 
     if significant_changes_only:
         baked_query += lambda q: q.filter(
@@ -125,6 +154,18 @@ def _get_significant_states(
         elapsed = time.perf_counter() - timer_start
         _LOGGER.debug("get_significant_states took %fs", elapsed)
 
+    if compact_response:
+        return _sorted_states_to_compact_dict(
+            hass,
+            session,
+            states,
+            start_time,
+            entity_ids,
+            filters,
+            include_start_time_state,
+            minimal_response,
+        )
+
     return _sorted_states_to_dict(
         hass,
         session,
@@ -140,9 +181,7 @@ def _get_significant_states(
 def state_changes_during_period(hass, start_time, end_time=None, entity_id=None):
     """Return states changes during UTC period start_time - end_time."""
     with session_scope(hass=hass) as session:
-        baked_query = hass.data[HISTORY_BAKERY](
-            lambda session: session.query(*QUERY_STATES)
-        )
+        baked_query = hass.data[HISTORY_BAKERY](_query_states)
 
         baked_query += lambda q: q.filter(
             (States.last_changed == States.last_updated)
@@ -155,7 +194,9 @@ def state_changes_during_period(hass, start_time, end_time=None, entity_id=None)
             )
 
         if entity_id is not None:
-            baked_query += lambda q: q.filter_by(entity_id=bindparam("entity_id"))
+            baked_query += lambda q: q.filter(
+                States.entity_id == bindparam("entity_id")
+            )
             entity_id = entity_id.lower()
 
         baked_query += lambda q: q.order_by(States.entity_id, States.last_updated)
@@ -176,13 +217,13 @@ def get_last_state_changes(hass, number_of_states, entity_id):
     start_time = dt_util.utcnow()
 
     with session_scope(hass=hass) as session:
-        baked_query = hass.data[HISTORY_BAKERY](
-            lambda session: session.query(*QUERY_STATES)
-        )
+        baked_query = hass.data[HISTORY_BAKERY](_query_states)
         baked_query += lambda q: q.filter(States.last_changed == States.last_updated)
 
         if entity_id is not None:
-            baked_query += lambda q: q.filter_by(entity_id=bindparam("entity_id"))
+            baked_query += lambda q: q.filter(
+                States.entity_id == bindparam("entity_id")
+            )
             entity_id = entity_id.lower()
 
         baked_query += lambda q: q.order_by(
@@ -209,6 +250,71 @@ def get_last_state_changes(hass, number_of_states, entity_id):
         )
 
 
+def get_last_state_changes_for_entities(hass, number_of_states, entity_ids):
+    """Return the last number_of_states of each of entity_ids with one query.
+
+    Uses one query per entity if the database does not support window
+    functions.
+    """
+    start_time = dt_util.utcnow()
+    entity_ids = [entity_id.lower() for entity_id in entity_ids]
+
+    with session_scope(hass=hass) as session:
+        if not supports_window_functions(session):
+            states = []
+            for entity_id in entity_ids:
+                states.extend(
+                    reversed(
+                        execute(
+                            _query_states(session)
+                            .filter(States.last_changed == States.last_updated)
+                            .filter(States.entity_id == entity_id)
+                            .order_by(States.last_updated.desc())
+                            .limit(number_of_states)
+                        )
+                    )
+                )
+            return _sorted_states_to_dict(
+                hass,
+                session,
+                states,
+                start_time,
+                entity_ids,
+                include_start_time_state=False,
+            )
+
+        # Number the state changes of each entity from the newest
+        ranked_states = (
+            session.query(
+                States.state_id,
+                func.row_number()
+                .over(
+                    partition_by=States.entity_id,
+                    order_by=States.last_updated.desc(),
+                )
+                .label("row_number"),
+            )
+            .filter(States.last_changed == States.last_updated)
+            .filter(States.entity_id.in_(entity_ids))
+            .subquery()
+        )
+        states = execute(
+            _query_states(session)
+            .join(ranked_states, States.state_id == ranked_states.c.state_id)
+            .filter(ranked_states.c.row_number <= number_of_states)
+            .order_by(States.entity_id, States.last_updated)
+        )
+
+        return _sorted_states_to_dict(
+            hass,
+            session,
+            states,
+            start_time,
+            entity_ids,
+            include_start_time_state=False,
+        )
+
+
 def get_states(hass, utc_point_in_time, entity_ids=None, run=None, filters=None):
     """Return the states at a specific point in time."""
     if run is None:
@@ -228,8 +334,20 @@ def _get_states_with_session(
     hass, session, utc_point_in_time, entity_ids=None, run=None, filters=None
 ):
     """Return the states at a specific point in time."""
+    return [
+        LazyState(row)
+        for row in _get_state_rows_with_session(
+            hass, session, utc_point_in_time, entity_ids, run, filters
+        )
+    ]
+
+
+def _get_state_rows_with_session(
+    hass, session, utc_point_in_time, entity_ids=None, run=None, filters=None
+):
+    """Return the state rows at a specific point in time."""
     if entity_ids and len(entity_ids) == 1:
-        return _get_single_entity_states_with_session(
+        return _get_single_entity_state_rows_with_session(
             hass, session, utc_point_in_time, entity_ids[0]
         )
 
@@ -240,17 +358,33 @@ def _get_states_with_session(
         if run is None:
             return []
 
+    instance = hass.data[recorder.DATA_INSTANCE]
+    snapshots = instance.state_snapshots
+    if snapshots.run_start == process_timestamp(run.start) and (
+        snapshot := snapshots.get(utc_point_in_time)
+    ):
+        return _get_state_rows_from_snapshot(
+            session, utc_point_in_time, entity_ids, run, filters, *snapshot
+        )
+
     # We have more than one entity to look at (most commonly we want
     # all entities,) so we need to do a search on all states since the
     # last recorder run started.
-    query = session.query(*QUERY_STATES)
+    return execute(
+        _most_recent_states_query(
+            session, run.start, utc_point_in_time, entity_ids, filters
+        )
+    )
+
+
+def _most_recent_states_query(session, start, utc_point_in_time, entity_ids, filters):
+    """Return a query for the last state of each entity updated in a period."""
+    query = _query_states(session)
 
     most_recent_states_by_date = session.query(
         States.entity_id.label("max_entity_id"),
         func.max(States.last_updated).label("max_last_updated"),
-    ).filter(
-        (States.last_updated >= run.start) & (States.last_updated < utc_point_in_time)
-    )
+    ).filter((States.last_updated >= start) & (States.last_updated < utc_point_in_time))
 
     if entity_ids:
         most_recent_states_by_date.filter(States.entity_id.in_(entity_ids))
@@ -278,22 +412,66 @@ def _get_states_with_session(
         States.state_id == most_recent_state_ids.c.max_state_id,
     )
 
+    return _filter_entities(query, entity_ids, filters)
+
+
+def _filter_entities(query, entity_ids, filters):
+    """Filter a states query by entity_ids or the configured filters."""
     if entity_ids is not None:
-        query = query.filter(States.entity_id.in_(entity_ids))
-    else:
-        query = query.filter(~States.domain.in_(IGNORE_DOMAINS))
-        if filters:
-            query = filters.apply(query)
+        return query.filter(States.entity_id.in_(entity_ids))
+    query = query.filter(~States.domain.in_(IGNORE_DOMAINS))
+    if filters:
+        query = filters.apply(query)
+    return query
+
+
+def _get_state_rows_from_snapshot(
+    session, utc_point_in_time, entity_ids, run, filters, boundary, snapshot
+):
+    """Return the state rows at a point in time starting from a snapshot.
 
-    return [LazyState(row) for row in execute(query)]
+    Only the states updated since the snapshot are aggregated. The
+    entities that were not updated since then are looked up by the
+    state ids of the snapshot.
+    """
+    rows = {
+        row.entity_id: row
+        for row in execute(
+            _most_recent_states_query(
+                session,
+                max(boundary - SNAPSHOT_MARGIN, process_timestamp(run.start)),
+                utc_point_in_time,
+                entity_ids,
+                filters,
+            )
+        )
+    }
+    if entity_ids is not None:
+        entity_ids_set = set(entity_ids)
+        snapshot = {
+            entity_id: state_id
+            for entity_id, state_id in snapshot.items()
+            if entity_id in entity_ids_set
+        }
+    state_ids = [
+        state_id for entity_id, state_id in snapshot.items() if entity_id not in rows
+    ]
+    for offset in range(0, len(state_ids), MAX_STATE_IDS_PER_QUERY):
+        query = _query_states(session).filter(
+            States.state_id.in_(state_ids[offset : offset + MAX_STATE_IDS_PER_QUERY]),
+            States.last_updated >= run.start,
+        )
+        for row in execute(_filter_entities(query, entity_ids, filters)):
+            rows[row.entity_id] = row
+    return list(rows.values())
 
 
-def _get_single_entity_states_with_session(hass, session, utc_point_in_time, entity_id):
+def _get_single_entity_state_rows_with_session(
+    hass, session, utc_point_in_time, entity_id
+):
     # Use an entirely different (and extremely fast) query if we only
     # have a single entity id
-    baked_query = hass.data[HISTORY_BAKERY](
-        lambda session: session.query(*QUERY_STATES)
-    )
+    baked_query = hass.data[HISTORY_BAKERY](_query_states)
     baked_query += lambda q: q.filter(
         States.last_updated < bindparam("utc_point_in_time"),
         States.entity_id == bindparam("entity_id"),
@@ -305,7 +483,7 @@ def _get_single_entity_states_with_session(hass, session, utc_point_in_time, ent
         utc_point_in_time=utc_point_in_time, entity_id=entity_id
     )
 
-    return [LazyState(row) for row in execute(query)]
+    return execute(query)
 
 
 def _sorted_states_to_dict(
@@ -397,6 +575,239 @@ def _sorted_states_to_dict(
     return {key: val for key, val in result.items() if val}
 
 
+def _sorted_states_to_compact_dict(
+    hass,
+    session,
+    states,
+    start_time,
+    entity_ids,
+    filters=None,
+    include_start_time_state=True,
+    minimal_response=False,
+):
+    """Convert SQL results into a compact JSON friendly data structure.
+
+    The states of each entity are returned as parallel lists instead of
+    a list of state dicts:
+
+    {'entity_id': {'s': [states], 'lu': [last_updated], 'a': [attributes]}}
+
+    last_updated is a UTC epoch timestamp. The attributes list holds
+    the attributes only where they differ from the previous state and
+    None otherwise. The last_changed of a state is the last_updated of
+    the first of the consecutive states with the same state.
+
+    The rows are converted directly, without creating a LazyState for
+    each of them. States must be sorted by entity_id and last_updated.
+    """
+    result = {}
+    # Set all entity IDs to empty results to maintain the order
+    if entity_ids is not None:
+        for ent_id in entity_ids:
+            result[ent_id] = _compact_entity_result()
+
+    # Called in a tight loop so cache the functions here
+    _process_timestamp_to_utc_timestamp = process_timestamp_to_utc_timestamp
+    _loads_attributes = _compact_attributes
+
+    # The last attributes of each entity as a JSON string
+    prev_attributes = {}
+
+    if include_start_time_state:
+        run = recorder.run_information_from_instance(hass, start_time)
+        start_timestamp = _process_timestamp_to_utc_timestamp(start_time)
+        for row in _get_state_rows_with_session(
+            hass, session, start_time, entity_ids, run=run, filters=filters
+        ):
+            ent_result = result.get(row.entity_id)
+            if ent_result is None:
+                ent_result = result[row.entity_id] = _compact_entity_result()
+            ent_result[COMPACT_STATE_KEY].append(row.state or "")
+            ent_result[COMPACT_LAST_UPDATED_KEY].append(start_timestamp)
+            ent_result[COMPACT_ATTRIBUTES_KEY].append(_loads_attributes(row.attributes))
+            prev_attributes[row.entity_id] = row.attributes
+
+    for ent_id, group in groupby(states, lambda state: state.entity_id):
+        ent_result = result.get(ent_id)
+        if ent_result is None:
+            ent_result = result[ent_id] = _compact_entity_result()
+        ent_states = ent_result[COMPACT_STATE_KEY]
+        ent_last_updated = ent_result[COMPACT_LAST_UPDATED_KEY]
+        ent_attributes = ent_result[COMPACT_ATTRIBUTES_KEY]
+        # With minimal response we only provide the attributes of
+        # the first state and filter out duplicate states
+        skip_attribute_changes = (
+            minimal_response
+            and split_entity_id(ent_id)[0] not in NEED_ATTRIBUTE_DOMAINS
+        )
+        last_attributes = prev_attributes.get(ent_id)
+        last_state = ent_states[-1] if ent_states else None
+
+        for db_state in group:
+            state = db_state.state or ""
+            if skip_attribute_changes and ent_states:
+                if state == last_state:
+                    continue
+                ent_attributes.append(None)
+            elif not ent_states or db_state.attributes != last_attributes:
+                last_attributes = db_state.attributes
+                ent_attributes.append(_loads_attributes(last_attributes))
+            else:
+                ent_attributes.append(None)
+            ent_states.append(state)
+            ent_last_updated.append(
+                _process_timestamp_to_utc_timestamp(db_state.last_updated)
+            )
+            last_state = state
+
+    # Filter out the empty results if some states had 0 results.
+    return {key: val for key, val in result.items() if val[COMPACT_STATE_KEY]}
+
+
+class CompactStatesConverter:
+    """Convert consecutive batches of states to the compact format.
+
+    The attributes of an entity are only included when they differ
+    from the last converted state of the entity, also when it was part
+    of an earlier batch.
+    """
+
+    def __init__(self):
+        """Initialize the converter."""
+        # entity_id -> (attributes as JSON string or None, attributes)
+        self._last_attributes = {}
+        self._last_updated = {}
+
+    def last_updated(self, entity_id):
+        """Return the last converted last_updated timestamp of an entity."""
+        return self._last_updated.get(entity_id)
+
+    def rows_to_dict(self, rows, last_updated=None):
+        """Convert state rows to the compact format.
+
+        If last_updated is passed it is used for all rows instead of
+        the last_updated of the rows.
+        """
+        _process_timestamp_to_utc_timestamp = process_timestamp_to_utc_timestamp
+        last_attributes = self._last_attributes
+        result = {}
+        for row in rows:
+            entity_id = row.entity_id
+            ent_result = result.get(entity_id)
+            if ent_result is None:
+                ent_result = result[entity_id] = _compact_entity_result()
+            timestamp = (
+                _process_timestamp_to_utc_timestamp(row.last_updated)
+                if last_updated is None
+                else last_updated
+            )
+            attributes = None
+            prev = last_attributes.get(entity_id)
+            if prev is None or prev[0] != row.attributes:
+                attributes = _compact_attributes(row.attributes)
+                last_attributes[entity_id] = (row.attributes, attributes)
+            ent_result[COMPACT_STATE_KEY].append(row.state or "")
+            ent_result[COMPACT_LAST_UPDATED_KEY].append(timestamp)
+            ent_result[COMPACT_ATTRIBUTES_KEY].append(attributes)
+            self._last_updated[entity_id] = timestamp
+        return result
+
+    def states_to_dict(self, states):
+        """Convert State objects to the compact format."""
+        last_attributes = self._last_attributes
+        result = {}
+        for state in states:
+            entity_id = state.entity_id
+            ent_result = result.get(entity_id)
+            if ent_result is None:
+                ent_result = result[entity_id] = _compact_entity_result()
+            timestamp = state.last_updated.timestamp()
+            attributes = None
+            prev = last_attributes.get(entity_id)
+            if prev is None or prev[1] != state.attributes:
+                attributes = dict(state.attributes)
+                last_attributes[entity_id] = (None, attributes)
+            ent_result[COMPACT_STATE_KEY].append(state.state)
+            ent_result[COMPACT_LAST_UPDATED_KEY].append(timestamp)
+            ent_result[COMPACT_ATTRIBUTES_KEY].append(attributes)
+            self._last_updated[entity_id] = timestamp
+        return result
+
+
+def stream_significant_states(
+    hass,
+    session,
+    converter,
+    start_time,
+    end_time=None,
+    entity_ids=None,
+    filters=None,
+    include_start_time_state=True,
+    significant_changes_only=True,
+):
+    """Yield the significant states during a period in compact chunks.
+
+    The states at the start time come first, followed by the states of
+    the period ordered by last_updated. The rows are fetched from the
+    database cursor STREAM_CHUNK_SIZE at a time so the whole period is
+    never held in memory.
+    """
+    if include_start_time_state:
+        run = recorder.run_information_from_instance(hass, start_time)
+        rows = _get_state_rows_with_session(
+            hass, session, start_time, entity_ids, run=run, filters=filters
+        )
+        if rows:
+            yield converter.rows_to_dict(
+                rows, process_timestamp_to_utc_timestamp(start_time)
+            )
+
+    query = _query_states(session)
+    if significant_changes_only:
+        query = query.filter(
+            States.domain.in_(SIGNIFICANT_DOMAINS)
+            | (States.last_changed == States.last_updated)
+        )
+    query = query.filter(States.last_updated > start_time)
+    if entity_ids is not None:
+        query = query.filter(States.entity_id.in_(entity_ids))
+    else:
+        query = query.filter(~States.domain.in_(IGNORE_DOMAINS))
+        if filters:
+            query = filters.apply(query)
+    if end_time is not None:
+        query = query.filter(States.last_updated < end_time)
+    chunk_size = STREAM_CHUNK_SIZE
+    query = query.order_by(States.last_updated).yield_per(chunk_size)
+
+    chunk = []
+    for row in query:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield converter.rows_to_dict(chunk)
+            chunk = []
+    if chunk:
+        yield converter.rows_to_dict(chunk)
+
+
+def _compact_entity_result():
+    """Return an empty compact result of an entity."""
+    return {
+        COMPACT_STATE_KEY: [],
+        COMPACT_LAST_UPDATED_KEY: [],
+        COMPACT_ATTRIBUTES_KEY: [],
+    }
+
+
+def _compact_attributes(attributes):
+    """Decode the attributes of a state row."""
+    try:
+        return json.loads(attributes or "{}")
+    except ValueError:
+        _LOGGER.exception("Error converting attributes to dict: %s", attributes)
+        return {}
+
+
 def get_state(hass, utc_point_in_time, entity_id, run=None):
     """Return a state at a specific point in time."""
     states = get_states(hass, utc_point_in_time, (entity_id,), run)
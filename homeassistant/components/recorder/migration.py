@@ -11,7 +11,19 @@ from sqlalchemy.exc import (
 )
 from sqlalchemy.schema import AddConstraint, DropConstraint
 
-from .models import SCHEMA_VERSION, TABLE_STATES, Base, SchemaChanges, Statistics
+from .const import MAX_ROWS_TO_MIGRATE
+from .models import (
+    SCHEMA_VERSION,
+    TABLE_STATES,
+    Base,
+    SchemaChanges,
+    StateAttributes,
+    States,
+    Statistics,
+    StatisticsDaily,
+    StatisticsMonthly,
+    StatisticsShortTerm,
+)
 from .util import session_scope
 
 _LOGGER = logging.getLogger(__name__)
@@ -67,6 +79,81 @@ def migrate_schema(instance, current_version):
             _LOGGER.info("Upgrade to version %s done", new_version)
 
 
+def has_legacy_state_attributes(instance):
+    """Check if there are states that store their attributes inline."""
+    with session_scope(session=instance.get_session()) as session:
+        return (
+            session.query(States.state_id)
+            .filter(States.attributes_id.is_(None))
+            .first()
+            is not None
+        )
+
+
+def migrate_state_attributes(instance):
+    """Move the inline attributes of a batch of states to the state_attributes table.
+
+    States recorded before schema version 17 store their attributes
+    in the states table. Returns True when there are no such states
+    left, False if more batches need to run.
+    """
+    with session_scope(session=instance.get_session()) as session:
+        legacy_states = (
+            session.query(States.state_id, States.attributes)
+            .filter(States.attributes_id.is_(None))
+            .limit(MAX_ROWS_TO_MIGRATE)
+            .all()
+        )
+        if not legacy_states:
+            return True
+
+        state_ids_by_shared_attrs = {}
+        for state in legacy_states:
+            state_ids_by_shared_attrs.setdefault(state.attributes or "{}", []).append(
+                state.state_id
+            )
+        hashes = {
+            StateAttributes.hash_shared_attrs(shared_attrs)
+            for shared_attrs in state_ids_by_shared_attrs
+        }
+        attributes_ids = {
+            db_attributes.shared_attrs: db_attributes.attributes_id
+            for db_attributes in session.query(
+                StateAttributes.attributes_id, StateAttributes.shared_attrs
+            ).filter(StateAttributes.hash.in_(hashes))
+            if db_attributes.shared_attrs in state_ids_by_shared_attrs
+        }
+        new_attributes = [
+            StateAttributes.from_shared_attrs(shared_attrs)
+            for shared_attrs in state_ids_by_shared_attrs
+            if shared_attrs not in attributes_ids
+        ]
+        if new_attributes:
+            session.add_all(new_attributes)
+            session.flush()
+            for db_attributes in new_attributes:
+                attributes_ids[db_attributes.shared_attrs] = db_attributes.attributes_id
+
+        session.execute(
+            States.__table__.update()
+            .where(States.state_id == sqlalchemy.bindparam("b_state_id"))
+            .values(
+                attributes_id=sqlalchemy.bindparam("b_attributes_id"), attributes=None
+            ),
+            [
+                {
+                    "b_state_id": state_id,
+                    "b_attributes_id": attributes_ids[shared_attrs],
+                }
+                for shared_attrs, state_ids in state_ids_by_shared_attrs.items()
+                for state_id in state_ids
+            ],
+        )
+        _LOGGER.debug("Moved the attributes of %s states", len(legacy_states))
+
+    return len(legacy_states) < MAX_ROWS_TO_MIGRATE
+
+
 def _create_index(connection, table_name, index_name):
     """Create an index for the specified table.
 
@@ -340,7 +427,7 @@ def _drop_foreign_key_constraints(connection, engine, table, columns):
             )
 
 
-def _apply_update(engine, session, new_version, old_version):
+def _apply_update(engine, session, new_version, old_version):  # noqa: C901
     """Perform operations to bring schema up to date."""
     connection = session.connection()
     if new_version == 1:
@@ -452,6 +539,19 @@ def _apply_update(engine, session, new_version, old_version):
         _drop_foreign_key_constraints(
             connection, engine, TABLE_STATES, ["old_state_id"]
         )
+    elif new_version == 17:
+        # The state_attributes table is created by create_all, the
+        # attributes of existing states are moved by the recorder
+        # with migrate_state_attributes
+        _add_columns(connection, "states", ["attributes_id INTEGER"])
+        _create_index(connection, "states", "ix_states_attributes_id")
+    elif new_version == 18:
+        if not sqlalchemy.inspect(engine).has_table(StatisticsShortTerm.__tablename__):
+            StatisticsShortTerm.__table__.create(engine)
+    elif new_version == 19:
+        for table in (StatisticsDaily, StatisticsMonthly):
+            if not sqlalchemy.inspect(engine).has_table(table.__tablename__):
+                table.__table__.create(engine)
     else:
         raise ValueError(f"No schema migration defined for version {new_version}")
 
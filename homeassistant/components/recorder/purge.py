@@ -3,16 +3,26 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 import logging
+import time
 from typing import TYPE_CHECKING, Callable
 
+from sqlalchemy import func
 from sqlalchemy.orm.session import Session
 from sqlalchemy.sql.expression import distinct
 
 import homeassistant.util.dt as dt_util
 
 from .const import MAX_ROWS_TO_PURGE
-from .models import Events, RecorderRuns, States
+from .models import (
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    StatisticsShortTerm,
+    process_timestamp,
+)
 from .repack import repack_database
+from .statistics import STATISTICS_TIERS
 from .util import retryable_database_job, session_scope
 
 if TYPE_CHECKING:
@@ -21,28 +31,113 @@ if TYPE_CHECKING:
 _LOGGER = logging.getLogger(__name__)
 
 
+# The smallest time range a purge chunk shrinks to when it is over budget
+MIN_PURGE_WINDOW = timedelta(minutes=1)
+
+# The maximum number of entity ids in the IN clause of a filtered purge
+MAX_ENTITY_IDS_TO_FILTER = 100
+
+
+class PurgeProgress:
+    """Track a purge across the purge tasks it is split into.
+
+    Each task deletes the rows in the time range from the oldest row up
+    to the end of a window, at most MAX_ROWS_TO_PURGE rows per table.
+    The window starts unbounded and is halved whenever a chunk takes
+    longer than the time budget and doubled when it takes less than half
+    of it, so a chunk never holds the database for long.
+    """
+
+    def __init__(self, purge_before: datetime) -> None:
+        """Initialize the progress."""
+        self.purge_before = purge_before
+        self.window: timedelta | None = None
+        self.first_start: datetime | None = None
+        self.chunk_end: datetime | None = None
+        self.chunks = 0
+        self.states = 0
+        self.events = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        """Return the throughput of the purge so far."""
+        if not self.elapsed:
+            return 0.0
+        return (self.states + self.events) / self.elapsed
+
+    @property
+    def fraction_done(self) -> float:
+        """Return how much of the time range to purge has been purged."""
+        if self.first_start is None or self.chunk_end is None:
+            return 0.0
+        total = (self.purge_before - self.first_start).total_seconds()
+        if total <= 0:
+            return 1.0
+        return min(1.0, (self.chunk_end - self.first_start).total_seconds() / total)
+
+    def next_chunk_end(self, start: datetime) -> datetime:
+        """Return the end of the chunk that starts at start."""
+        if self.first_start is None:
+            self.first_start = start
+        chunk_end = self.purge_before
+        if self.window is not None:
+            chunk_end = min(chunk_end, start + self.window)
+        self.chunk_end = chunk_end
+        return chunk_end
+
+    def chunk_done(
+        self,
+        start: datetime,
+        states: int,
+        events: int,
+        elapsed: float,
+        time_budget: float,
+    ) -> None:
+        """Record a purged chunk and resize the window for the next one."""
+        self.chunks += 1
+        self.states += states
+        self.events += events
+        self.elapsed += elapsed
+        assert self.chunk_end is not None
+        if elapsed > time_budget:
+            self.window = max(MIN_PURGE_WINDOW, (self.chunk_end - start) / 2)
+        elif elapsed < time_budget / 2 and self.window is not None:
+            self.window *= 2
+        _LOGGER.debug(
+            "Purged %s states and %s events before %s in %.3fs, "
+            "%.0f%% done at %.0f rows/s",
+            states,
+            events,
+            self.chunk_end.isoformat(sep=" ", timespec="seconds"),
+            elapsed,
+            self.fraction_done * 100,
+            self.rows_per_second,
+        )
+
+
 @retryable_database_job("purge")
 def purge_old_data(
     instance: Recorder, purge_days: int, repack: bool, apply_filter: bool = False
 ) -> bool:
     """Purge events and states older than purge_days ago.
 
-    Cleans up an timeframe of an hour, based on the oldest record.
+    Purges one chunk of the oldest rows per call and returns False
+    until there is nothing left to purge.
     """
     purge_before = dt_util.utcnow() - timedelta(days=purge_days)
     _LOGGER.debug(
         "Purging states and events before target %s",
         purge_before.isoformat(sep=" ", timespec="seconds"),
     )
+    progress = instance.purge_progress
+    if progress is None:
+        progress = instance.purge_progress = PurgeProgress(purge_before)
+    else:
+        progress.purge_before = purge_before
 
     with session_scope(session=instance.get_session()) as session:  # type: ignore
-        # Purge a max of MAX_ROWS_TO_PURGE, based on the oldest states or events record
-        event_ids = _select_event_ids_to_purge(session, purge_before)
-        state_ids = _select_state_ids_to_purge(session, purge_before, event_ids)
-        if state_ids:
-            _purge_state_ids(session, state_ids)
-        if event_ids:
-            _purge_event_ids(session, event_ids)
+        if _purge_chunk(instance, session, progress):
             # If states or events purging isn't processing the purge_before yet,
             # return false, as we are not done yet.
             _LOGGER.debug("Purging hasn't fully completed yet")
@@ -50,12 +145,70 @@ def purge_old_data(
         if apply_filter and _purge_filtered_data(instance, session) is False:
             _LOGGER.debug("Cleanup filtered data hasn't fully completed yet")
             return False
+        _purge_statistics(instance, session, purge_before)
         _purge_old_recorder_runs(instance, session, purge_before)
+    instance.purge_progress = None
+    if progress.chunks:
+        _LOGGER.info(
+            "Purged %s states and %s events in %s chunks in %.1fs (%.0f rows/s)",
+            progress.states,
+            progress.events,
+            progress.chunks,
+            progress.elapsed,
+            progress.rows_per_second,
+        )
     if repack:
         repack_database(instance)
     return True
 
 
+def _purge_chunk(instance: Recorder, session: Session, progress: PurgeProgress) -> bool:
+    """Purge the states and events of the next chunk.
+
+    Returns False if there is nothing older than purge_before left.
+    """
+    start = _oldest_timestamp(session)
+    if start is None or start >= progress.purge_before:
+        return False
+
+    timer_start = time.perf_counter()
+    chunk_end = progress.next_chunk_end(start)
+    event_ids = _select_event_ids_to_purge(session, chunk_end)
+    state_ids, attributes_ids = _select_state_and_attributes_ids_to_purge(
+        session, chunk_end, event_ids
+    )
+    if state_ids:
+        _purge_state_ids(session, state_ids)
+        _purge_unused_attributes_ids(instance, session, attributes_ids)
+    if event_ids:
+        _purge_event_ids(session, event_ids)
+    progress.chunk_done(
+        start,
+        len(state_ids),
+        len(event_ids),
+        time.perf_counter() - timer_start,
+        instance.purge_chunk_time,
+    )
+    return True
+
+
+def _oldest_timestamp(session: Session) -> datetime | None:
+    """Return the time of the oldest state or event.
+
+    Both are read from the end of the last_updated and time_fired
+    indexes and do not scan the tables.
+    """
+    timestamps = [
+        process_timestamp(timestamp)
+        for timestamp in (
+            session.query(func.min(States.last_updated)).scalar(),
+            session.query(func.min(Events.time_fired)).scalar(),
+        )
+        if timestamp is not None
+    ]
+    return min(timestamps) if timestamps else None
+
+
 def _select_event_ids_to_purge(session: Session, purge_before: datetime) -> list[int]:
     """Return a list of event ids to purge."""
     events = (
@@ -68,20 +221,32 @@ def _select_event_ids_to_purge(session: Session, purge_before: datetime) -> list
     return [event.event_id for event in events]
 
 
-def _select_state_ids_to_purge(
+def _select_state_and_attributes_ids_to_purge(
     session: Session, purge_before: datetime, event_ids: list[int]
-) -> list[int]:
-    """Return a list of state ids to purge."""
-    if not event_ids:
-        return []
-    states = (
-        session.query(States.state_id)
+) -> tuple[list[int], set[int]]:
+    """Return a list of state ids and a set of their attributes ids to purge.
+
+    These are the states in the time range and the states that
+    belong to the events that are purged.
+    """
+    states = dict(
+        session.query(States.state_id, States.attributes_id)
         .filter(States.last_updated < purge_before)
-        .filter(States.event_id.in_(event_ids))
+        .limit(MAX_ROWS_TO_PURGE)
         .all()
     )
+    if event_ids:
+        # The states of the purged events must go first
+        # even if they are outside of the time range
+        states.update(
+            session.query(States.state_id, States.attributes_id)
+            .filter(States.event_id.in_(event_ids))
+            .all()
+        )
     _LOGGER.debug("Selected %s state ids to remove", len(states))
-    return [state.state_id for state in states]
+    return list(states), {
+        attributes_id for attributes_id in states.values() if attributes_id is not None
+    }
 
 
 def _purge_state_ids(session: Session, state_ids: list[int]) -> None:
@@ -106,6 +271,30 @@ def _purge_state_ids(session: Session, state_ids: list[int]) -> None:
     _LOGGER.debug("Deleted %s states", deleted_rows)
 
 
+def _purge_unused_attributes_ids(
+    instance: Recorder, session: Session, attributes_ids: set[int]
+) -> None:
+    """Delete the attributes that are no longer referenced by any state."""
+    if not attributes_ids:
+        return
+    still_used = {
+        attributes_id
+        for (attributes_id,) in session.query(distinct(States.attributes_id))
+        .filter(States.attributes_id.in_(attributes_ids))
+        .all()
+    }
+    unused_attributes_ids = attributes_ids - still_used
+    if not unused_attributes_ids:
+        return
+    deleted_rows = (
+        session.query(StateAttributes)
+        .filter(StateAttributes.attributes_id.in_(unused_attributes_ids))
+        .delete(synchronize_session=False)
+    )
+    _LOGGER.debug("Deleted %s attributes", deleted_rows)
+    instance.evict_state_attributes_ids(unused_attributes_ids)
+
+
 def _purge_event_ids(session: Session, event_ids: list[int]) -> None:
     """Delete by event id."""
     deleted_rows = (
@@ -116,6 +305,40 @@ def _purge_event_ids(session: Session, event_ids: list[int]) -> None:
     _LOGGER.debug("Deleted %s events", deleted_rows)
 
 
+def _purge_statistics(
+    instance: Recorder, session: Session, purge_before: datetime
+) -> None:
+    """Delete the statistics that are older than the retention of their tier.
+
+    The short-term statistics are kept as long as the states, the
+    monthly statistics are kept forever. Statistics are only deleted once
+    they were rolled up into the next tier.
+    """
+    purge_befores = {StatisticsShortTerm: purge_before}
+    for period, keep_days in instance.statistics_keep_days.items():
+        table = STATISTICS_TIERS[period][0]
+        purge_befores[table] = dt_util.utcnow() - timedelta(days=keep_days)
+    tables = [table for table, _ in STATISTICS_TIERS.values()]
+    for table, next_tier_table in zip(tables, tables[1:]):
+        if (table_purge_before := purge_befores.get(table)) is None:
+            continue
+        # The tiers are rolled up in order, everything before the start
+        # of the last rolled up period is in the next tier
+        rolled_up_before = session.query(func.max(next_tier_table.start)).scalar()
+        if rolled_up_before is None:
+            _LOGGER.debug("Keeping %s until it is rolled up", table.__tablename__)
+            continue
+        table_purge_before = min(
+            table_purge_before, process_timestamp(rolled_up_before)
+        )
+        deleted_rows = (
+            session.query(table)
+            .filter(table.start < table_purge_before)
+            .delete(synchronize_session=False)
+        )
+        _LOGGER.debug("Deleted %s %s", deleted_rows, table.__tablename__)
+
+
 def _purge_old_recorder_runs(
     instance: Recorder, session: Session, purge_before: datetime
 ) -> None:
@@ -141,7 +364,9 @@ def _purge_filtered_data(instance: Recorder, session: Session) -> bool:
         if not instance.entity_filter(entity_id)
     ]
     if len(excluded_entity_ids) > 0:
-        _purge_filtered_states(session, excluded_entity_ids)
+        _purge_filtered_states(
+            instance, session, excluded_entity_ids[:MAX_ENTITY_IDS_TO_FILTER]
+        )
         return False
 
     # Check if excluded event_types are in database
@@ -151,19 +376,22 @@ def _purge_filtered_data(instance: Recorder, session: Session) -> bool:
         if event_type in instance.exclude_t
     ]
     if len(excluded_event_types) > 0:
-        _purge_filtered_events(session, excluded_event_types)
+        _purge_filtered_events(instance, session, excluded_event_types)
         return False
 
     return True
 
 
-def _purge_filtered_states(session: Session, excluded_entity_ids: list[str]) -> None:
+def _purge_filtered_states(
+    instance: Recorder, session: Session, excluded_entity_ids: list[str]
+) -> None:
     """Remove filtered states and linked events."""
     state_ids: list[int]
     event_ids: list[int | None]
-    state_ids, event_ids = zip(
+    attributes_ids: list[int | None]
+    state_ids, event_ids, attributes_ids = zip(
         *(
-            session.query(States.state_id, States.event_id)
+            session.query(States.state_id, States.event_id, States.attributes_id)
             .filter(States.entity_id.in_(excluded_entity_ids))
             .limit(MAX_ROWS_TO_PURGE)
             .all()
@@ -174,10 +402,15 @@ def _purge_filtered_states(session: Session, excluded_entity_ids: list[str]) ->
         "Selected %s state_ids to remove that should be filtered", len(state_ids)
     )
     _purge_state_ids(session, state_ids)
+    _purge_unused_attributes_ids(
+        instance, session, {id_ for id_ in attributes_ids if id_ is not None}
+    )
     _purge_event_ids(session, event_ids)  # type: ignore  # type of event_ids already narrowed to 'list[int]'
 
 
-def _purge_filtered_events(session: Session, excluded_event_types: list[str]) -> None:
+def _purge_filtered_events(
+    instance: Recorder, session: Session, excluded_event_types: list[str]
+) -> None:
     """Remove filtered events and linked states."""
     events: list[Events] = (
         session.query(Events.event_id)
@@ -190,10 +423,17 @@ def _purge_filtered_events(session: Session, excluded_event_types: list[str]) ->
         "Selected %s event_ids to remove that should be filtered", len(event_ids)
     )
     states: list[States] = (
-        session.query(States.state_id).filter(States.event_id.in_(event_ids)).all()
+        session.query(States.state_id, States.attributes_id)
+        .filter(States.event_id.in_(event_ids))
+        .all()
     )
     state_ids: list[int] = [state.state_id for state in states]
     _purge_state_ids(session, state_ids)
+    _purge_unused_attributes_ids(
+        instance,
+        session,
+        {state.attributes_id for state in states if state.attributes_id is not None},
+    )
     _purge_event_ids(session, event_ids)
 
 
@@ -209,7 +449,9 @@ def purge_entity_data(instance: Recorder, entity_filter: Callable[[str], bool])
         _LOGGER.debug("Purging entity data for %s", selected_entity_ids)
         if len(selected_entity_ids) > 0:
             # Purge a max of MAX_ROWS_TO_PURGE, based on the oldest states or events record
-            _purge_filtered_states(session, selected_entity_ids)
+            _purge_filtered_states(
+                instance, session, selected_entity_ids[:MAX_ENTITY_IDS_TO_FILTER]
+            )
             _LOGGER.debug("Purging entity data hasn't fully completed yet")
             return False
 
@@ -0,0 +1,80 @@
+"""Keep snapshots of the latest state id of every entity."""
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+import threading
+
+from .models import process_timestamp
+
+# How often a snapshot is taken
+SNAPSHOT_INTERVAL = timedelta(hours=1)
+
+# The number of snapshots kept in memory
+MAX_SNAPSHOTS = 48
+
+# States that are committed out of order by less than this
+# are still found by point in time queries that use a snapshot
+SNAPSHOT_MARGIN = timedelta(minutes=1)
+
+
+class StateSnapshots:
+    """Snapshots of the last state id per entity at SNAPSHOT_INTERVAL boundaries.
+
+    A point in time query can start from the snapshot taken before the
+    point in time and only has to search the states recorded since
+    then, instead of aggregating over all states of the recorder run.
+
+    The snapshots are only kept in memory for the current recorder run.
+    They are updated on the recorder thread after each commit and read
+    from the executor.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the snapshots."""
+        self._lock = threading.Lock()
+        self._latest: dict[str, int] = {}
+        self._snapshots: list[tuple[datetime, dict[str, int]]] = []
+        self._next_boundary: datetime | None = None
+        self.run_start: datetime | None = None
+
+    def reset(self, run_start: datetime) -> None:
+        """Drop all snapshots when a new recorder run starts."""
+        with self._lock:
+            self._latest = {}
+            self._snapshots = []
+            self._next_boundary = None
+            self.run_start = process_timestamp(run_start)
+
+    def add(self, entity_id: str, state_id: int, last_updated: datetime) -> None:
+        """Record a committed state.
+
+        States must be added in the order of their last_updated.
+        """
+        last_updated = process_timestamp(last_updated)
+        if self._next_boundary is None:
+            self._next_boundary = _interval_start(last_updated) + SNAPSHOT_INTERVAL
+        elif last_updated >= self._next_boundary:
+            # All states so far were updated before the boundary
+            # of the interval of this state
+            boundary = _interval_start(last_updated)
+            with self._lock:
+                self._snapshots.append((boundary, dict(self._latest)))
+                del self._snapshots[:-MAX_SNAPSHOTS]
+            self._next_boundary = boundary + SNAPSHOT_INTERVAL
+        self._latest[entity_id] = state_id
+
+    def get(
+        self, utc_point_in_time: datetime
+    ) -> tuple[datetime, dict[str, int]] | None:
+        """Return the last snapshot taken at or before a point in time."""
+        utc_point_in_time = process_timestamp(utc_point_in_time)
+        with self._lock:
+            for boundary, snapshot in reversed(self._snapshots):
+                if boundary <= utc_point_in_time:
+                    return boundary, snapshot
+        return None
+
+
+def _interval_start(time: datetime) -> datetime:
+    """Return the start of the snapshot interval of a time."""
+    return time.replace(minute=0, second=0, microsecond=0)
@@ -5,92 +5,522 @@ from collections import defaultdict
 from datetime import datetime, timedelta
 from itertools import groupby
 import logging
-from typing import TYPE_CHECKING
+from statistics import fmean
+from typing import TYPE_CHECKING, Any, Callable, NamedTuple
 
-from sqlalchemy import bindparam
+from sqlalchemy import and_, bindparam, func
 from sqlalchemy.ext import baked
 
+from homeassistant.core import Event, HomeAssistant, split_entity_id
 import homeassistant.util.dt as dt_util
 
 from .const import DOMAIN
-from .models import Statistics, process_timestamp_to_utc_isoformat
-from .util import execute, retryable_database_job, session_scope
+from .models import (
+    Statistics,
+    StatisticsDaily,
+    StatisticsMonthly,
+    StatisticsShortTerm,
+    process_timestamp,
+    process_timestamp_to_utc_isoformat,
+)
+from .util import (
+    execute,
+    retryable_database_job,
+    session_scope,
+    supports_window_functions,
+)
 
 if TYPE_CHECKING:
     from . import Recorder
 
-QUERY_STATISTICS = [
-    Statistics.statistic_id,
-    Statistics.start,
-    Statistics.mean,
-    Statistics.min,
-    Statistics.max,
-    Statistics.last_reset,
-    Statistics.state,
-    Statistics.sum,
-]
+
+def _query_statistics(table) -> list:
+    """Return the columns to query statistics from a statistics table."""
+    return [
+        table.statistic_id,
+        table.start,
+        table.mean,
+        table.min,
+        table.max,
+        table.last_reset,
+        table.state,
+        table.sum,
+    ]
+
+
+QUERY_STATISTICS = _query_statistics(Statistics)
+QUERY_STATISTICS_SHORT_TERM = _query_statistics(StatisticsShortTerm)
+QUERY_STATISTICS_DAILY = _query_statistics(StatisticsDaily)
+QUERY_STATISTICS_MONTHLY = _query_statistics(StatisticsMonthly)
 
 STATISTICS_BAKERY = "recorder_statistics_bakery"
 
+PERIOD_5MINUTE = "5minute"
+PERIOD_HOURLY = "hourly"
+PERIOD_DAILY = "daily"
+PERIOD_MONTHLY = "monthly"
+
+# The statistics tables and their columns by period, from the finest
+# to the coarsest. Each tier is rolled up from the one before it.
+STATISTICS_TIERS = {
+    PERIOD_5MINUTE: (StatisticsShortTerm, QUERY_STATISTICS_SHORT_TERM),
+    PERIOD_HOURLY: (Statistics, QUERY_STATISTICS),
+    PERIOD_DAILY: (StatisticsDaily, QUERY_STATISTICS_DAILY),
+    PERIOD_MONTHLY: (StatisticsMonthly, QUERY_STATISTICS_MONTHLY),
+}
+
+SHORT_TERM_PERIOD = timedelta(minutes=5)
+
 _LOGGER = logging.getLogger(__name__)
 
 
+class StatisticsState(NamedTuple):
+    """The value of a state that statistics are compiled for.
+
+    Recorder platforms return this from get_statistics_state.
+    """
+
+    wanted_statistics: set[str]
+    value: float | None
+    last_reset: datetime | None
+
+
 def async_setup(hass):
     """Set up the history hooks."""
     hass.data[STATISTICS_BAKERY] = baked.bakery()
 
 
-def get_start_time() -> datetime.datetime:
+def get_start_time() -> datetime:
     """Return start time."""
     last_hour = dt_util.utcnow() - timedelta(hours=1)
     start = last_hour.replace(minute=0, second=0, microsecond=0)
     return start
 
 
+def get_short_term_start_time() -> datetime:
+    """Return the start time of the last full 5-minute period."""
+    return _period_start(dt_util.utcnow() - SHORT_TERM_PERIOD)
+
+
+def _period_start(time: datetime) -> datetime:
+    """Return the start of the 5-minute period time is in."""
+    return time.replace(minute=time.minute - time.minute % 5, second=0, microsecond=0)
+
+
+class _StatisticAccumulator:
+    """Time-weighted mean, min and max and the sum of a statistic.
+
+    The accumulator covers one 5-minute period at a time, the value
+    and sum carry over to the next period when a period is closed.
+    """
+
+    __slots__ = (
+        "statistic_id",
+        "wanted_statistics",
+        "expired",
+        "period_start",
+        "time",
+        "value",
+        "weighted_total",
+        "duration",
+        "min",
+        "max",
+        "last_reset",
+        "state",
+        "sum",
+        "sum_start",
+    )
+
+    def __init__(
+        self,
+        statistic_id: str,
+        wanted_statistics: set[str],
+        period_start: datetime,
+        last_sum: dict[str, Any] | None,
+    ) -> None:
+        """Initialize the accumulator."""
+        self.statistic_id = statistic_id
+        self.wanted_statistics = wanted_statistics
+        # The statistic is no longer compiled once the current period is closed
+        self.expired = False
+        self.period_start = period_start
+        # The time since when value is held
+        self.time = period_start
+        self.value: float | None = None
+        self.weighted_total = 0.0
+        self.duration = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+        self.last_reset: datetime | None = None
+        self.state: float | None = None
+        self.sum = 0.0
+        # The state the sum has been accumulated from since the last reset
+        self.sum_start: float | None = None
+        if last_sum is not None:
+            self.last_reset = last_sum["last_reset"]
+            self.state = self.sum_start = last_sum["state"]
+            self.sum = last_sum["sum"]
+
+    def add(
+        self,
+        time: datetime,
+        value: float | None,
+        last_reset: datetime | None,
+        rows: list[dict[str, Any]],
+    ) -> None:
+        """Add a value that is held from time on."""
+        self.close_periods(_period_start(time), rows)
+        self._hold_until(time)
+        self.value = value
+        if value is None:
+            return
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if last_reset is None or "sum" not in self.wanted_statistics:
+            return
+        if last_reset != self.last_reset:
+            # The sensor has been reset, add what was accumulated
+            # since the previous reset to the sum
+            if self.sum_start is not None:
+                self.sum += self.state - self.sum_start
+            self.sum_start = value
+            self.last_reset = last_reset
+        self.state = value
+
+    def close_periods(self, end: datetime, rows: list[dict[str, Any]]) -> None:
+        """Close all periods that end before or at end and append their rows."""
+        while self.period_start + SHORT_TERM_PERIOD <= end:
+            self._close_period(rows)
+
+    def _hold_until(self, time: datetime) -> None:
+        """Account for the current value being held until time."""
+        if time <= self.time:
+            return
+        if self.value is not None:
+            seconds = (time - self.time).total_seconds()
+            self.weighted_total += self.value * seconds
+            self.duration += seconds
+        self.time = time
+
+    def _close_period(self, rows: list[dict[str, Any]]) -> None:
+        """Close the current period, append its row and start the next one."""
+        end = self.period_start + SHORT_TERM_PERIOD
+        self._hold_until(end)
+        row: dict[str, Any] = {
+            "source": DOMAIN,
+            "statistic_id": self.statistic_id,
+            "start": self.period_start,
+            "mean": None,
+            "min": None,
+            "max": None,
+            "last_reset": None,
+            "state": None,
+            "sum": None,
+        }
+        if self.duration:
+            if "mean" in self.wanted_statistics:
+                row["mean"] = self.weighted_total / self.duration
+            if "min" in self.wanted_statistics:
+                row["min"] = self.min
+            if "max" in self.wanted_statistics:
+                row["max"] = self.max
+        if "sum" in self.wanted_statistics and self.sum_start is not None:
+            self.sum += self.state - self.sum_start
+            self.sum_start = self.state
+            row["last_reset"] = self.last_reset
+            row["state"] = self.state
+            row["sum"] = self.sum
+        if any(row[key] is not None for key in ("mean", "min", "max", "sum")):
+            rows.append(row)
+
+        self.period_start = end
+        self.weighted_total = 0.0
+        self.duration = 0.0
+        self.min = self.max = self.value
+
+
+class StatisticsCompiler:
+    """Compile 5-minute statistics from state changes as they are recorded.
+
+    Instead of reading back the history of all sensors when the
+    statistics are compiled, the recorder feeds every recorded
+    state_changed event to an accumulator for its statistic.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the compiler."""
+        self.hass = hass
+        self._accumulators: dict[str, _StatisticAccumulator] = {}
+        # statistic_id -> the last_reset, state and sum of the
+        # last compiled statistics that have a sum
+        self._last_sums: dict[str, dict[str, Any]] = {}
+        # The rows of the closed periods that are not written yet
+        self._rows: list[dict[str, Any]] = []
+
+    def load_last_sums(self, session) -> None:
+        """Load the last sums to continue from after a restart."""
+        last_sums = _get_last_sums(session, Statistics)
+        last_sums.update(_get_last_sums(session, StatisticsShortTerm))
+        self._last_sums = last_sums
+
+    def add_state_changed_event(self, event: Event) -> None:
+        """Feed a recorded state_changed event to its accumulator."""
+        entity_id = event.data["entity_id"]
+        statistics_state = None
+        if (new_state := event.data.get("new_state")) is not None:
+            platform = self.hass.data[DOMAIN].get(split_entity_id(entity_id)[0])
+            if platform is not None and hasattr(platform, "get_statistics_state"):
+                statistics_state = platform.get_statistics_state(new_state)
+
+        accumulator = self._accumulators.get(entity_id)
+        if statistics_state is None:
+            if accumulator is not None:
+                accumulator.add(event.time_fired, None, None, self._rows)
+                accumulator.expired = True
+            return
+
+        time = new_state.last_updated
+        if accumulator is None:
+            accumulator = self._accumulators[entity_id] = _StatisticAccumulator(
+                entity_id,
+                statistics_state.wanted_statistics,
+                _period_start(time),
+                self._last_sums.pop(entity_id, None),
+            )
+        accumulator.wanted_statistics = statistics_state.wanted_statistics
+        accumulator.expired = False
+        accumulator.add(
+            time, statistics_state.value, statistics_state.last_reset, self._rows
+        )
+
+    def compile(self, end: datetime) -> list[dict[str, Any]]:
+        """Close the periods that end before or at end and return their rows.
+
+        The rows stay pending until written is called.
+        """
+        for statistic_id, accumulator in list(self._accumulators.items()):
+            accumulator.close_periods(end, self._rows)
+            if accumulator.expired:
+                del self._accumulators[statistic_id]
+        return [row for row in self._rows if row["start"] < end]
+
+    def written(self, end: datetime) -> None:
+        """Drop the pending rows that start before end."""
+        self._rows = [row for row in self._rows if row["start"] >= end]
+
+
+def _get_last_sums(session, table) -> dict[str, dict[str, Any]]:
+    """Return the last_reset, state and sum of the last statistics with a sum."""
+    last_starts = (
+        session.query(table.statistic_id, func.max(table.start).label("max_start"))
+        .filter(table.sum.isnot(None))
+        .group_by(table.statistic_id)
+        .subquery()
+    )
+    return {
+        row.statistic_id: {
+            "last_reset": process_timestamp(row.last_reset),
+            "state": row.state,
+            "sum": row.sum,
+        }
+        for row in session.query(
+            table.statistic_id, table.last_reset, table.state, table.sum
+        ).join(
+            last_starts,
+            and_(
+                table.statistic_id == last_starts.c.statistic_id,
+                table.start == last_starts.c.max_start,
+            ),
+        )
+    }
+
+
 @retryable_database_job("statistics")
-def compile_statistics(instance: Recorder, start: datetime.datetime) -> bool:
-    """Compile statistics."""
+def compile_statistics(
+    instance: Recorder, start: datetime, period: str = PERIOD_5MINUTE
+) -> bool:
+    """Compile statistics.
+
+    Writes the 5-minute statistics of all periods that end before or
+    at the end of the period. Hourly statistics are rolled up from the
+    5-minute statistics for an hourly period, or when a 5-minute period
+    ends on a full hour. Daily and monthly statistics are rolled up for
+    the local days and months that ended since the last roll up.
+    """
     start = dt_util.as_utc(start)
-    end = start + timedelta(hours=1)
-    _LOGGER.debug(
-        "Compiling statistics for %s-%s",
-        start,
+    hour_start = None
+    if period == PERIOD_HOURLY:
+        end = start + timedelta(hours=1)
+        hour_start = start
+    else:
+        end = start + SHORT_TERM_PERIOD
+        if end.minute == 0:
+            hour_start = end - timedelta(hours=1)
+    _LOGGER.debug("Compiling statistics for %s-%s", start, end)
+
+    rows = instance.statistics_compiler.compile(end)
+    with session_scope(session=instance.get_session()) as session:  # type: ignore
+        if rows:
+            session.execute(StatisticsShortTerm.__table__.insert(), rows)
+        if hour_start is not None:
+            hour_end = hour_start + timedelta(hours=1)
+            _roll_up_statistics(
+                session, StatisticsShortTerm, Statistics, hour_start, hour_end
+            )
+            _compile_daily_and_monthly_statistics(session, hour_end)
+    instance.statistics_compiler.written(end)
+
+    return True
+
+
+def _compile_daily_and_monthly_statistics(session, end: datetime) -> None:
+    """Roll up the statistics of the local days and months that ended by end.
+
+    Every day and month after the last one rolled up is rolled up, so a
+    missed run or a time zone with an offset that is not a whole number of
+    hours does not lose a roll up. Hourly statistics count for the local
+    day their period starts in.
+    """
+    _roll_up_ended_periods(
+        session, Statistics, StatisticsDaily, end, _local_day_start, _next_local_day
+    )
+    _roll_up_ended_periods(
+        session,
+        StatisticsDaily,
+        StatisticsMonthly,
         end,
+        _local_month_start,
+        _next_local_month,
     )
-    platform_stats = []
-    for domain, platform in instance.hass.data[DOMAIN].items():
-        if not hasattr(platform, "compile_statistics"):
-            continue
-        platform_stats.append(platform.compile_statistics(instance.hass, start, end))
-        _LOGGER.debug(
-            "Statistics for %s during %s-%s: %s", domain, start, end, platform_stats[-1]
+
+
+def _local_day_start(time: datetime) -> datetime:
+    """Return the start of the local day of a time."""
+    return dt_util.start_of_local_day(dt_util.as_local(time))
+
+
+def _next_local_day(start: datetime) -> datetime:
+    """Return the start of the local day after the day that starts at start."""
+    return dt_util.start_of_local_day(start.date() + timedelta(days=1))
+
+
+def _local_month_start(time: datetime) -> datetime:
+    """Return the start of the local month of a time."""
+    return dt_util.start_of_local_day(dt_util.as_local(time).date().replace(day=1))
+
+
+def _next_local_month(start: datetime) -> datetime:
+    """Return the start of the local month after the month that starts at start."""
+    return _local_month_start(start + timedelta(days=31))
+
+
+def _roll_up_ended_periods(
+    session,
+    source,
+    target,
+    end: datetime,
+    period_start: Callable[[datetime], datetime],
+    next_period: Callable[[datetime], datetime],
+) -> None:
+    """Roll up the periods after the last one in target that ended by end.
+
+    Periods without source statistics are skipped by starting at the
+    first source statistics that were not rolled up yet.
+    """
+    first_start_query = session.query(func.min(source.start))
+    last_start = session.query(func.max(target.start)).scalar()
+    if last_start is not None:
+        first_start_query = first_start_query.filter(
+            source.start
+            >= dt_util.as_utc(next_period(period_start(process_timestamp(last_start))))
         )
+    if (first_start := first_start_query.scalar()) is None:
+        return
 
-    with session_scope(session=instance.get_session()) as session:  # type: ignore
-        for stats in platform_stats:
-            for entity_id, stat in stats.items():
-                session.add(Statistics.from_stats(DOMAIN, entity_id, start, stat))
+    start = period_start(process_timestamp(first_start))
+    while (period_end := next_period(start)) <= end:
+        _roll_up_statistics(
+            session, source, target, dt_util.as_utc(start), dt_util.as_utc(period_end)
+        )
+        start = period_end
+
+
+def _roll_up_statistics(
+    session, source, target, start: datetime, end: datetime
+) -> None:
+    """Roll up the statistics of a period into one row per statistic.
+
+    The mean is the mean of the means of the source periods, the sum is
+    the sum at the end of the last source period.
+    """
+    source_stats = execute(
+        session.query(*_query_statistics(source))
+        .filter(source.start >= start)
+        .filter(source.start < end)
+        .order_by(source.statistic_id, source.start)
+    )
 
-    return True
+    rows = []
+    for statistic_id, group in groupby(source_stats, lambda row: row.statistic_id):
+        stats = list(group)
+        row = {
+            "source": DOMAIN,
+            "statistic_id": statistic_id,
+            "start": start,
+            "mean": None,
+            "min": None,
+            "max": None,
+            "last_reset": None,
+            "state": None,
+            "sum": None,
+        }
+        if means := [stat.mean for stat in stats if stat.mean is not None]:
+            row["mean"] = fmean(means)
+        if mins := [stat.min for stat in stats if stat.min is not None]:
+            row["min"] = min(mins)
+        if maxes := [stat.max for stat in stats if stat.max is not None]:
+            row["max"] = max(maxes)
+        if sums := [stat for stat in stats if stat.sum is not None]:
+            row["last_reset"] = sums[-1].last_reset
+            row["state"] = sums[-1].state
+            row["sum"] = sums[-1].sum
+        rows.append(row)
 
+    _LOGGER.debug(
+        "Compiled %s statistics for %s statistics", target.__tablename__, len(rows)
+    )
+    if rows:
+        session.execute(target.__table__.insert(), rows)
+
+
+def statistics_during_period(
+    hass, start_time, end_time=None, statistic_id=None, period=PERIOD_HOURLY
+):
+    """Return states changes during UTC period start_time - end_time.
+
+    The statistics are read from the tier of the period, a year of
+    monthly statistics is 12 rows per statistic instead of 8760.
+    """
+    table, columns = STATISTICS_TIERS[period]
 
-def statistics_during_period(hass, start_time, end_time=None, statistic_id=None):
-    """Return states changes during UTC period start_time - end_time."""
     with session_scope(hass=hass) as session:
+        # The table is part of the cache key of the baked query
         baked_query = hass.data[STATISTICS_BAKERY](
-            lambda session: session.query(*QUERY_STATISTICS)
+            lambda session: session.query(*columns), table
         )
 
-        baked_query += lambda q: q.filter(Statistics.start >= bindparam("start_time"))
+        baked_query += lambda q: q.filter(table.start >= bindparam("start_time"))
 
         if end_time is not None:
-            baked_query += lambda q: q.filter(Statistics.start < bindparam("end_time"))
+            baked_query += lambda q: q.filter(table.start < bindparam("end_time"))
 
         if statistic_id is not None:
             baked_query += lambda q: q.filter_by(statistic_id=bindparam("statistic_id"))
             statistic_id = statistic_id.lower()
 
-        baked_query += lambda q: q.order_by(Statistics.statistic_id, Statistics.start)
+        baked_query += lambda q: q.order_by(table.statistic_id, table.start)
 
         stats = execute(
             baked_query(session).params(
@@ -130,6 +560,51 @@ def get_last_statistics(hass, number_of_stats, statistic_id=None):
         return _sorted_statistics_to_dict(stats, statistic_ids)
 
 
+def get_last_statistics_for_ids(hass, number_of_stats, statistic_ids):
+    """Return the last number_of_stats statistics of each of statistic_ids.
+
+    The statistics of all ids are fetched with one query, or with one
+    query per id if the database does not support window functions.
+    """
+    statistic_ids = [statistic_id.lower() for statistic_id in statistic_ids]
+    with session_scope(hass=hass) as session:
+        if not supports_window_functions(session):
+            stats = []
+            for statistic_id in statistic_ids:
+                stats.extend(
+                    execute(
+                        session.query(*QUERY_STATISTICS)
+                        .filter(Statistics.statistic_id == statistic_id)
+                        .order_by(Statistics.start.desc())
+                        .limit(number_of_stats)
+                    )
+                )
+            return _sorted_statistics_to_dict(stats, statistic_ids)
+
+        # Number the statistics of each statistic_id from the newest
+        ranked_stats = (
+            session.query(
+                Statistics.id,
+                func.row_number()
+                .over(
+                    partition_by=Statistics.statistic_id,
+                    order_by=Statistics.start.desc(),
+                )
+                .label("row_number"),
+            )
+            .filter(Statistics.statistic_id.in_(statistic_ids))
+            .subquery()
+        )
+        stats = execute(
+            session.query(*QUERY_STATISTICS)
+            .join(ranked_stats, Statistics.id == ranked_stats.c.id)
+            .filter(ranked_stats.c.row_number <= number_of_stats)
+            .order_by(Statistics.statistic_id, Statistics.start.desc())
+        )
+
+        return _sorted_statistics_to_dict(stats, statistic_ids)
+
+
 def _sorted_statistics_to_dict(
     stats,
     statistic_ids,
@@ -1,6 +1,7 @@
 """SQLAlchemy util functions."""
 from __future__ import annotations
 
+from collections import OrderedDict
 from collections.abc import Generator
 from contextlib import contextmanager
 from datetime import timedelta
@@ -8,7 +9,7 @@ import functools
 import logging
 import os
 import time
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 from sqlalchemy.exc import OperationalError, SQLAlchemyError
 from sqlalchemy.orm.session import Session
@@ -21,7 +22,9 @@ from .models import (
     ALL_TABLES,
     TABLE_RECORDER_RUNS,
     TABLE_SCHEMA_CHANGES,
+    TABLE_STATE_ATTRIBUTES,
     TABLE_STATISTICS,
+    TABLE_STATISTICS_SHORT_TERM,
     RecorderRuns,
     process_timestamp,
 )
@@ -47,6 +50,49 @@ RETRYABLE_MYSQL_ERRORS = (1205, 1206, 1213)
 # 1213: Deadlock found when trying to get lock; try restarting transaction
 
 
+class LRU:
+    """A mapping that evicts the least recently used key beyond max_size."""
+
+    def __init__(self, max_size: int) -> None:
+        """Initialize the LRU."""
+        self._max_size = max_size
+        self._data: OrderedDict[Any, Any] = OrderedDict()
+
+    def __contains__(self, key: Any) -> bool:
+        """Return if key is in the LRU."""
+        return key in self._data
+
+    def __len__(self) -> int:
+        """Return the number of keys."""
+        return len(self._data)
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        """Set key to value and evict the least recently used key if full."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self._max_size:
+            self._data.popitem(last=False)
+
+    def __delitem__(self, key: Any) -> None:
+        """Remove key."""
+        del self._data[key]
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        """Return the value for key and mark it as recently used."""
+        if key not in self._data:
+            return default
+        self._data.move_to_end(key)
+        return self._data[key]
+
+    def items(self) -> list[tuple[Any, Any]]:
+        """Return a copy of the items from least to most recently used."""
+        return list(self._data.items())
+
+    def clear(self) -> None:
+        """Remove all keys."""
+        self._data.clear()
+
+
 @contextmanager
 def session_scope(
     *, hass: HomeAssistant | None = None, session: Session | None = None
@@ -135,6 +181,20 @@ def execute(qry, to_native=False, validate_entity_ids=True):
             time.sleep(QUERY_RETRY_WAIT)
 
 
+def supports_window_functions(session: Session) -> bool:
+    """Return if the database supports window functions like ROW_NUMBER() OVER.
+
+    They need MySQL 8.0, MariaDB 10.2 or SQLite 3.25 or newer.
+    """
+    dialect = session.get_bind().dialect
+    version = tuple(dialect.server_version_info or ())[:2]
+    if dialect.name == "mysql":
+        return version >= ((10, 2) if dialect.is_mariadb else (8, 0))
+    if dialect.name == "sqlite":
+        return version >= (3, 25)
+    return True
+
+
 def validate_or_move_away_sqlite_database(dburl: str) -> bool:
     """Ensure that the database is valid or move it away."""
     dbpath = dburl_to_path(dburl)
@@ -179,7 +239,11 @@ def basic_sanity_check(cursor):
     """Check tables to make sure select does not fail."""
 
     for table in ALL_TABLES:
-        if table == TABLE_STATISTICS:
+        if table in (
+            TABLE_STATISTICS,
+            TABLE_STATISTICS_SHORT_TERM,
+            TABLE_STATE_ATTRIBUTES,
+        ):
             continue
         if table in (TABLE_RECORDER_RUNS, TABLE_SCHEMA_CHANGES):
             cursor.execute(f"SELECT * FROM {table};")  # nosec # not injection
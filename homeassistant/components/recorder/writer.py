@@ -0,0 +1,191 @@
+"""Write bulk insert batches on a separate thread."""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from sqlalchemy import exc
+
+from .bulk import BulkInsertBuffer, UnresolvedIdsError
+from .util import LRU
+
+if TYPE_CHECKING:
+    from . import Recorder
+
+_LOGGER = logging.getLogger(__name__)
+
+# The number of batches that may wait for the writer before
+# the recorder thread blocks when it hands off the next one
+MAX_PENDING_BATCHES = 4
+
+# The number of attribute ids the writer remembers to avoid inserting
+# attributes again that were buffered before they were written
+WRITTEN_ATTRIBUTES_ID_CACHE_SIZE = 2048
+
+
+class WriterStats:
+    """Throughput and backpressure of the writer thread."""
+
+    def __init__(self) -> None:
+        """Initialize the stats."""
+        self.batches = 0
+        self.rows = 0
+        self.dropped_batches = 0
+        self.write_time = 0.0
+        # How often and how long the recorder thread waited
+        # because MAX_PENDING_BATCHES batches were pending
+        self.blocked = 0
+        self.blocked_time = 0.0
+        self.max_pending = 0
+
+    def as_dict(self) -> dict[str, float]:
+        """Return the stats as a dict."""
+        return {
+            "batches": self.batches,
+            "rows": self.rows,
+            "dropped_batches": self.dropped_batches,
+            "write_time": self.write_time,
+            "rows_per_second": self.rows / self.write_time if self.write_time else 0,
+            "blocked": self.blocked,
+            "blocked_time": self.blocked_time,
+            "max_pending": self.max_pending,
+        }
+
+
+class BatchWriter(threading.Thread):
+    """A thread that writes the bulk insert batches of the recorder.
+
+    The recorder thread keeps processing events and serializing the
+    rows of the next batch while this thread inserts and commits the
+    previous one with its own session. Batches are written in the order
+    they were handed off, so states can reference the states of earlier
+    batches.
+    """
+
+    def __init__(self, recorder: Recorder) -> None:
+        """Initialize the writer."""
+        threading.Thread.__init__(self, name="Recorder writer")
+        self.recorder = recorder
+        self.stats = WriterStats()
+        self._queue: queue.Queue[BulkInsertBuffer | None] = queue.Queue(
+            MAX_PENDING_BATCHES
+        )
+        # The ids of the attributes written since the last call
+        # to written_attributes_ids, read by the recorder thread
+        self._written_attributes_ids: queue.SimpleQueue[
+            dict[str, int]
+        ] = queue.SimpleQueue()
+        self._attributes_ids = LRU(WRITTEN_ATTRIBUTES_ID_CACHE_SIZE)
+
+    def submit(self, batch: BulkInsertBuffer) -> None:
+        """Hand off a batch, block while too many batches are pending."""
+        stats = self.stats
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put(batch)
+            blocked_time = time.perf_counter() - start
+            stats.blocked += 1
+            stats.blocked_time += blocked_time
+            _LOGGER.debug(
+                "Waited %fs for the writer, %s batches were pending",
+                blocked_time,
+                MAX_PENDING_BATCHES,
+            )
+        stats.max_pending = max(stats.max_pending, self._queue.qsize())
+
+    def wait_idle(self) -> None:
+        """Block until all handed off batches are written."""
+        self._queue.join()
+
+    def stop(self) -> None:
+        """Write the pending batches and stop the thread."""
+        self._queue.put(None)
+        self.join()
+
+    def written_attributes_ids(self) -> dict[str, int]:
+        """Return the attribute ids written since the last call."""
+        attributes_ids: dict[str, int] = {}
+        while True:
+            try:
+                attributes_ids.update(self._written_attributes_ids.get_nowait())
+            except queue.Empty:
+                return attributes_ids
+
+    def evict_attributes_ids(self, attributes_ids: set[int]) -> None:
+        """Forget purged attributes, only call this while the writer is idle."""
+        for shared_attrs, attributes_id in self._attributes_ids.items():
+            if attributes_id in attributes_ids:
+                del self._attributes_ids[shared_attrs]
+
+    def run(self) -> None:
+        """Write batches until stopped."""
+        session = self.recorder.get_session()
+        while (batch := self._queue.get()) is not None:
+            try:
+                self._write_or_retry(session, batch)
+            except Exception as err:  # pylint: disable=broad-except
+                _LOGGER.exception("Error writing %s events: %s", len(batch), err)
+                self.stats.dropped_batches += 1
+                batch.dropped()
+                session.rollback()
+            finally:
+                self._queue.task_done()
+        self._queue.task_done()
+        session.close()
+
+    def _write_or_retry(self, session, batch: BulkInsertBuffer) -> None:
+        """Write a batch, retry when the connection failed."""
+        batch.resolve_attributes(self._attributes_ids)
+        tries = 1
+        start = time.perf_counter()
+        while True:
+            try:
+                self._write(session, batch)
+                break
+            except (exc.InternalError, exc.OperationalError) as err:
+                session.rollback()
+                _LOGGER.error(
+                    "Error writing to the database: %s. (retrying in %s seconds)",
+                    err,
+                    self.recorder.db_retry_wait,
+                )
+                if tries >= self.recorder.db_max_retries:
+                    raise
+                tries += 1
+                time.sleep(self.recorder.db_retry_wait)
+
+        stats = self.stats
+        stats.write_time += time.perf_counter() - start
+        stats.batches += 1
+        stats.rows += len(batch) + len(batch.states)
+
+        state_snapshots = self.recorder.state_snapshots
+        for pending in batch.states:
+            state_snapshots.add(
+                pending.row["entity_id"], pending.state_id, pending.row["last_updated"]
+            )
+        attributes_ids = batch.committed()
+        for shared_attrs, attributes_id in attributes_ids.items():
+            self._attributes_ids[shared_attrs] = attributes_id
+        if attributes_ids:
+            self._written_attributes_ids.put(attributes_ids)
+
+    @staticmethod
+    def _write(session, batch: BulkInsertBuffer) -> None:
+        """Insert and commit a batch."""
+        try:
+            batch.write(session)
+        except UnresolvedIdsError as err:
+            _LOGGER.warning(
+                "Could not resolve the ids of bulk inserted rows (%s), "
+                "inserting them one by one",
+                err,
+            )
+            session.rollback()
+            batch.write(session, row_by_row=True)
+        session.commit()
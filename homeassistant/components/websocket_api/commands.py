@@ -3,7 +3,9 @@ from __future__ import annotations
 
 import asyncio
 from collections.abc import Callable
+import fnmatch
 import json
+import re
 from typing import Any
 
 import voluptuous as vol
@@ -26,7 +28,7 @@ from homeassistant.helpers.event import (
     TrackTemplateResult,
     async_track_template_result,
 )
-from homeassistant.helpers.json import ExtendedJSONEncoder
+from homeassistant.helpers.json import ExtendedJSONEncoder, json_bytes_states
 from homeassistant.helpers.service import async_get_all_descriptions
 from homeassistant.loader import IntegrationNotFound, async_get_integration
 from homeassistant.setup import DATA_SETUP_TIME, async_get_loaded_integrations
@@ -53,8 +55,10 @@ def async_register_commands(
     async_reg(hass, handle_ping)
     async_reg(hass, handle_render_template)
     async_reg(hass, handle_subscribe_bootstrap_integrations)
+    async_reg(hass, handle_subscribe_entities)
     async_reg(hass, handle_subscribe_events)
     async_reg(hass, handle_subscribe_trigger)
+    async_reg(hass, handle_supported_features)
     async_reg(hass, handle_test_condition)
     async_reg(hass, handle_unsubscribe_events)
 
@@ -64,6 +68,21 @@ def pong_message(iden: int) -> dict[str, Any]:
     return {"id": iden, "type": "pong"}
 
 
+@callback
+@decorators.websocket_command(
+    {
+        vol.Required("type"): "supported_features",
+        vol.Required("features"): {str: int},
+    }
+)
+def handle_supported_features(
+    hass: HomeAssistant, connection: ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle setting the features the client supports."""
+    connection.supported_features = msg["features"]
+    connection.send_result(msg["id"])
+
+
 @callback
 @decorators.websocket_command(
     {
@@ -87,14 +106,23 @@ def handle_subscribe_events(
     if event_type == EVENT_STATE_CHANGED:
 
         @callback
-        def forward_events(event: Event) -> None:
+        def forward_state_changes(events: list[Event]) -> None:
             """Forward state changed events to websocket."""
-            if not connection.user.permissions.check_entity(
-                event.data["entity_id"], POLICY_READ
-            ):
-                return
+            check_entity = connection.user.permissions.check_entity
+            for event in events:
+                entity_id = event.data["entity_id"]
+                if not check_entity(entity_id, POLICY_READ):
+                    continue
+
+                # A client that is behind only receives the latest state change
+                connection.send_coalesced_message(
+                    (msg["id"], entity_id),
+                    messages.cached_event_message(msg["id"], event),
+                )
 
-            connection.send_message(messages.cached_event_message(msg["id"], event))
+        connection.subscriptions[msg["id"]] = hass.bus.async_listen_batch(
+            event_type, forward_state_changes
+        )
 
     else:
 
@@ -106,11 +134,81 @@ def handle_subscribe_events(
 
             connection.send_message(messages.cached_event_message(msg["id"], event))
 
-    connection.subscriptions[msg["id"]] = hass.bus.async_listen(
-        event_type, forward_events
-    )
+        connection.subscriptions[msg["id"]] = hass.bus.async_listen(
+            event_type, forward_events
+        )
+
+    connection.send_message(messages.result_message(msg["id"]))
+
 
+@callback
+@decorators.websocket_command(
+    {
+        vol.Required("type"): "subscribe_entities",
+        vol.Optional("entity_ids"): cv.entity_ids,
+        vol.Optional("entity_id_glob"): str,
+        vol.Optional(
+            "fields",
+            default=[
+                messages.STATE_FIELD_STATE,
+                messages.STATE_FIELD_ATTRIBUTES,
+                messages.STATE_FIELD_LAST_CHANGED,
+            ],
+        ): vol.All(cv.ensure_list, [vol.In(messages.STATE_FIELDS)]),
+    }
+)
+def handle_subscribe_entities(
+    hass: HomeAssistant, connection: ActiveConnection, msg: dict[str, Any]
+) -> None:
+    """Handle subscribe entities command.
+
+    Sends the matching states and then only what changed: the fields
+    of added states, the changed fields and attributes of updated
+    states and the ids of removed entities. Entities are matched by
+    entity_ids or entity_id_glob, all readable entities if neither is set.
+    """
+    entity_ids = set(msg.get("entity_ids", []))
+    glob_match = None
+    if "entity_id_glob" in msg:
+        glob_match = re.compile(fnmatch.translate(msg["entity_id_glob"])).match
+    fields = tuple(sorted(set(msg["fields"])))
+    entity_perm = connection.user.permissions.check_entity
+
+    @callback
+    def entity_matches(entity_id: str) -> bool:
+        """Return if the subscription matches an entity."""
+        if (entity_ids or glob_match) and not (
+            entity_id in entity_ids or (glob_match and glob_match(entity_id))
+        ):
+            return False
+        return entity_perm(entity_id, POLICY_READ)
+
+    @callback
+    def forward_entity_changes(events: list[Event]) -> None:
+        """Forward the changes of the matching entities to websocket."""
+        for event in events:
+            if not entity_matches(event.data["entity_id"]):
+                continue
+            message = messages.cached_state_diff_message(msg["id"], event, fields)
+            if message is not None:
+                connection.send_message(message)
+
+    connection.subscriptions[msg["id"]] = hass.bus.async_listen_batch(
+        EVENT_STATE_CHANGED, forward_entity_changes
+    )
     connection.send_message(messages.result_message(msg["id"]))
+    connection.send_message(
+        messages.event_message(
+            msg["id"],
+            {
+                messages.ENTITY_EVENT_ADD: {
+                    state.entity_id: messages.compressed_state(state, fields)
+                    for state in hass.states.async_all()
+                    if entity_matches(state.entity_id)
+                }
+            },
+        )
+    )
 
 
 @callback
@@ -238,7 +336,16 @@ def handle_get_states(
             if entity_perm(state.entity_id, "read")
         ]
 
-    connection.send_message(messages.result_message(msg["id"], states))
+    try:
+        response = messages.construct_result_message(
+            msg["id"], json_bytes_states(states)
+        )
+    except (ValueError, TypeError):
+        # Let message_to_json report the states that can not be serialized
+        connection.send_message(messages.result_message(msg["id"], states))
+        return
+
+    connection.send_message(response)
 
 
 @decorators.websocket_command({vol.Required("type"): "get_services"})
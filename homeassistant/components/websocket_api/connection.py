@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import asyncio
-from collections.abc import Hashable
+from collections.abc import Awaitable, Hashable
 from typing import TYPE_CHECKING, Any, Callable
 
 import voluptuous as vol
@@ -24,18 +24,22 @@ class ActiveConnection:
         self,
         logger: WebSocketAdapter,
         hass: HomeAssistant,
-        send_message: Callable[[str | dict[str, Any]], None],
+        send_message: Callable[..., None],
         user: User,
         refresh_token: RefreshToken,
+        wait_sent: Callable[[], Awaitable[None]] | None = None,
     ) -> None:
         """Initialize an active connection."""
         self.logger = logger
         self.hass = hass
         self.send_message = send_message
+        self._wait_sent = wait_sent
         self.user = user
         self.refresh_token_id = refresh_token.id
         self.subscriptions: dict[Hashable, Callable[[], Any]] = {}
         self.last_id = 0
+        # The features the client negotiated with supported_features
+        self.supported_features: dict[str, float] = {}
 
     def context(self, msg: dict[str, Any]) -> Context:
         """Return a context."""
@@ -53,6 +57,25 @@ class ActiveConnection:
         )
         self.send_message(content)
 
+    async def async_wait_sent(self) -> None:
+        """Wait until the messages sent so far were written to the client.
+
+        Lets a command that sends a lot of data wait for a slow client.
+        Raises asyncio.CancelledError if the connection is closed first.
+        """
+        if self._wait_sent is not None:
+            await self._wait_sent()
+
+    @callback
+    def send_coalesced_message(self, key: Hashable, message: str) -> None:
+        """Send a message that replaces a pending message with the same key.
+
+        Use this for updates that supersede the earlier ones. A client
+        that supports coalesced messages and is behind on the messages
+        then only receives the latest update.
+        """
+        self.send_message(message, key)
+
     @callback
     def send_error(self, msg_id: int, code: str, message: str) -> None:
         """Send a error message."""
@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 import asyncio
-from collections.abc import Callable
+from collections.abc import Callable, Hashable
 from contextlib import suppress
 import datetime as dt
 import logging
@@ -17,9 +17,11 @@ from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers.event import async_call_later
 
 from .auth import AuthPhase, auth_required_message
+from .connection import ActiveConnection
 from .const import (
     CANCELLATION_ERRORS,
     DATA_CONNECTIONS,
+    FEATURE_COALESCE_MESSAGES,
     MAX_PENDING_MSG,
     PENDING_MSG_PEAK,
     PENDING_MSG_PEAK_TIME,
@@ -53,6 +55,17 @@ class WebSocketAdapter(logging.LoggerAdapter):
         return f'[{self.extra["connid"]}] {msg}', kwargs
 
 
+class _CoalescedMessage:
+    """A pending message that is replaced by newer messages with the same key."""
+
+    __slots__ = ("key", "message")
+
+    def __init__(self, key: Hashable, message: str) -> None:
+        """Initialize the message."""
+        self.key = key
+        self.message = message
+
+
 class WebSocketHandler:
     """Handle an active websocket client connection."""
 
@@ -66,29 +79,84 @@ class WebSocketHandler:
         self._writer_task: asyncio.Task | None = None
         self._logger = WebSocketAdapter(_WS_LOGGER, {"connid": id(self)})
         self._peak_checker_unsub: Callable[[], None] | None = None
+        self._connection: ActiveConnection | None = None
+        # The pending messages that newer messages with the same key replace
+        self._coalesced: dict[Hashable, _CoalescedMessage] = {}
 
     async def _writer(self) -> None:
-        """Write outgoing messages."""
+        """Write outgoing messages.
+
+        Everything that is pending is written at once, as one frame with
+        a JSON array of the messages if the client supports it.
+        """
         # Exceptions if Socket disconnected or cancelled by connection handler
         assert self.wsock is not None
+        to_write = self._to_write
+        # The futures of _async_wait_sent for the messages being sent
+        waiting: list[asyncio.Future] = []
+        unsent: list[str | _CoalescedMessage | asyncio.Future | None] = []
         with suppress(RuntimeError, ConnectionResetError, *CANCELLATION_ERRORS):
             while not self.wsock.closed:
-                message = await self._to_write.get()
-                if message is None:
+                stop = False
+                messages: list[str] = []
+                pending = [await to_write.get()]
+                while not to_write.empty():
+                    pending.append(to_write.get_nowait())
+                for index, message in enumerate(pending):
+                    if message is None:
+                        stop = True
+                        unsent = pending[index + 1 :]
+                        break
+                    if isinstance(message, asyncio.Future):
+                        waiting.append(message)
+                        continue
+                    if isinstance(message, _CoalescedMessage):
+                        if self._coalesced.get(message.key) is message:
+                            del self._coalesced[message.key]
+                        message = message.message
+                    messages.append(message)
+
+                if len(messages) > 1 and self._supports(FEATURE_COALESCE_MESSAGES):
+                    messages = [f'[{",".join(messages)}]']
+                for message in messages:
+                    self._logger.debug("Sending %s", message)
+                    await self.wsock.send_str(message)
+                for future in waiting:
+                    if not future.done():
+                        future.set_result(None)
+                waiting.clear()
+                if stop:
                     break
 
-                self._logger.debug("Sending %s", message)
-                await self.wsock.send_str(message)
+        # Nothing is sent anymore to the ones still waiting
+        while not to_write.empty():
+            unsent.append(to_write.get_nowait())
+        for future in (*waiting, *unsent):
+            if isinstance(future, asyncio.Future):
+                future.cancel()
 
         # Clean up the peaker checker when we shut down the writer
         if self._peak_checker_unsub is not None:
             self._peak_checker_unsub()
             self._peak_checker_unsub = None
 
+    def _supports(self, feature: str) -> bool:
+        """Return if the client negotiated a feature."""
+        return (
+            self._connection is not None
+            and feature in self._connection.supported_features
+        )
+
     @callback
-    def _send_message(self, message: str | dict[str, Any]) -> None:
+    def _send_message(
+        self, message: str | dict[str, Any], coalesce_key: Hashable | None = None
+    ) -> None:
         """Send a message to the client.
 
+        A message with a coalesce_key replaces the pending message with
+        the same key while the client is behind on the messages, if it
+        supports receiving coalesced messages.
+
         Closes connection if the client is not reading the messages.
 
         Async friendly.
@@ -96,12 +164,30 @@ class WebSocketHandler:
         if not isinstance(message, str):
             message = message_to_json(message)
 
+        if coalesce_key is not None:
+            if self._to_write.qsize() < PENDING_MSG_PEAK or not self._supports(
+                FEATURE_COALESCE_MESSAGES
+            ):
+                # Every message is sent while the client keeps up, the
+                # pending one is no longer replaced so it stays in order
+                self._coalesced.pop(coalesce_key, None)
+                coalesce_key = None
+            elif (coalesced := self._coalesced.get(coalesce_key)) is not None:
+                coalesced.message = message
+                return
+            else:
+                coalesced = self._coalesced[coalesce_key] = _CoalescedMessage(
+                    coalesce_key, message
+                )
+
         try:
-            self._to_write.put_nowait(message)
+            self._to_write.put_nowait(message if coalesce_key is None else coalesced)
         except asyncio.QueueFull:
             self._logger.error(
                 "Client exceeded max pending messages [2]: %s", MAX_PENDING_MSG
             )
+            if coalesce_key is not None:
+                del self._coalesced[coalesce_key]
 
             self._cancel()
 
@@ -116,6 +202,24 @@ class WebSocketHandler:
                 self.hass, PENDING_MSG_PEAK_TIME, self._check_write_peak
             )
 
+    async def _async_wait_sent(self) -> None:
+        """Wait until the messages sent so far were written to the client.
+
+        Raises asyncio.CancelledError if the connection is closed first.
+        """
+        if self._writer_task is None or self._writer_task.done():
+            raise asyncio.CancelledError
+        future = self.hass.loop.create_future()
+        try:
+            self._to_write.put_nowait(future)
+        except asyncio.QueueFull:
+            self._logger.error(
+                "Client exceeded max pending messages [2]: %s", MAX_PENDING_MSG
+            )
+            self._cancel()
+            raise asyncio.CancelledError from None
+        await future
+
     @callback
     def _check_write_peak(self, _utc_time: dt.datetime) -> None:
         """Check that we are no longer above the write peak."""
@@ -160,7 +264,9 @@ class WebSocketHandler:
         # event we do not want to block for websocket responses
         self._writer_task = asyncio.create_task(self._writer())
 
-        auth = AuthPhase(self._logger, self.hass, self._send_message, request)
+        auth = AuthPhase(
+            self._logger, self.hass, self._send_message, self._async_wait_sent, request
+        )
         connection = None
         disconnect_warn = None
 
@@ -189,7 +295,7 @@ class WebSocketHandler:
                 raise Disconnect from err
 
             self._logger.debug("Received %s", msg_data)
-            connection = await auth.async_handle(msg_data)
+            connection = self._connection = await auth.async_handle(msg_data)
             self.hass.data[DATA_CONNECTIONS] = (
                 self.hass.data.get(DATA_CONNECTIONS, 0) + 1
             )
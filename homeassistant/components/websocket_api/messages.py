@@ -7,8 +7,10 @@ from typing import Any, Final
 
 import voluptuous as vol
 
-from homeassistant.core import Event
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, State
 from homeassistant.helpers import config_validation as cv
+from homeassistant.helpers.json import json_bytes
 from homeassistant.util.json import (
     find_paths_unserializable_data,
     format_unserializable_data,
@@ -31,12 +33,43 @@ BASE_COMMAND_MESSAGE_SCHEMA: Final = vol.Schema({vol.Required("id"): cv.positive
 IDEN_TEMPLATE: Final = "__IDEN__"
 IDEN_JSON_TEMPLATE: Final = '"__IDEN__"'
 
+# The fields of a state that an entity subscription can send
+STATE_FIELD_STATE: Final = "state"
+STATE_FIELD_ATTRIBUTES: Final = "attributes"
+STATE_FIELD_LAST_CHANGED: Final = "last_changed"
+STATE_FIELD_LAST_UPDATED: Final = "last_updated"
+STATE_FIELD_CONTEXT: Final = "context"
+STATE_FIELDS: Final = (
+    STATE_FIELD_STATE,
+    STATE_FIELD_ATTRIBUTES,
+    STATE_FIELD_LAST_CHANGED,
+    STATE_FIELD_LAST_UPDATED,
+    STATE_FIELD_CONTEXT,
+)
+
+# The keys of the compressed states and diffs of entity subscriptions
+COMPRESSED_STATE_STATE: Final = "s"
+COMPRESSED_STATE_ATTRIBUTES: Final = "a"
+COMPRESSED_STATE_LAST_CHANGED: Final = "lc"
+COMPRESSED_STATE_LAST_UPDATED: Final = "lu"
+COMPRESSED_STATE_CONTEXT: Final = "c"
+ENTITY_EVENT_ADD: Final = "a"
+ENTITY_EVENT_CHANGE: Final = "c"
+ENTITY_EVENT_REMOVE: Final = "r"
+DIFF_ADDITIONS: Final = "+"
+DIFF_REMOVALS: Final = "-"
+
 
 def result_message(iden: int, result: Any = None) -> dict[str, Any]:
     """Return a success result message."""
     return {"id": iden, "type": const.TYPE_RESULT, "success": True, "result": result}
 
 
+def construct_result_message(iden: int, result_json: bytes) -> str:
+    """Return a success result message with an already serialized result."""
+    return f'{{"id":{iden},"type":"result","success":true,"result":{result_json.decode()}}}'
+
+
 def error_message(iden: int | None, code: str, message: str) -> dict[str, Any]:
     """Return an error result message."""
     return {
@@ -71,9 +104,143 @@ def _cached_event_message(event: Event) -> str:
     The IDEN_TEMPLATE is used which will be replaced
     with the actual iden in cached_event_message
     """
+    if event.event_type == EVENT_STATE_CHANGED:
+        try:
+            event_json = _state_changed_event_json(event)
+        except (ValueError, TypeError):
+            event_json = None
+        if event_json is not None:
+            return f'{{"id":{IDEN_JSON_TEMPLATE},"type":"event","event":{event_json.decode()}}}'
     return message_to_json(event_message(IDEN_TEMPLATE, event))
 
 
+def _state_changed_event_json(event: Event) -> bytes | None:
+    """Serialize a state_changed event with the cached JSON of its states.
+
+    Returns None if the event data is not a plain state change.
+    """
+    data = event.data
+    if data.keys() != {"entity_id", "old_state", "new_state"}:
+        return None
+    old_state = data["old_state"]
+    new_state = data["new_state"]
+    if not (old_state is None or isinstance(old_state, State)) or not (
+        new_state is None or isinstance(new_state, State)
+    ):
+        return None
+    return b"".join(
+        (
+            b'{"event_type":"state_changed","data":{"entity_id":',
+            json_bytes(data["entity_id"]),
+            b',"old_state":',
+            b"null" if old_state is None else old_state.as_dict_json,
+            b',"new_state":',
+            b"null" if new_state is None else new_state.as_dict_json,
+            b'},"origin":',
+            json_bytes(event.origin.value),
+            b',"time_fired":',
+            json_bytes(event.time_fired),
+            b',"context":',
+            json_bytes(event.context.as_dict()),
+            b"}",
+        )
+    )
+
+
+def compressed_state(state: State, fields: tuple[str, ...]) -> dict[str, Any]:
+    """Return the fields of a state in the compressed format."""
+    compressed: dict[str, Any] = {}
+    if STATE_FIELD_STATE in fields:
+        compressed[COMPRESSED_STATE_STATE] = state.state
+    if STATE_FIELD_ATTRIBUTES in fields:
+        compressed[COMPRESSED_STATE_ATTRIBUTES] = dict(state.attributes)
+    if STATE_FIELD_LAST_CHANGED in fields:
+        compressed[COMPRESSED_STATE_LAST_CHANGED] = state.last_changed.timestamp()
+    if STATE_FIELD_LAST_UPDATED in fields:
+        compressed[COMPRESSED_STATE_LAST_UPDATED] = state.last_updated.timestamp()
+    if STATE_FIELD_CONTEXT in fields:
+        compressed[COMPRESSED_STATE_CONTEXT] = state.context.id
+    return compressed
+
+
+def cached_state_diff_message(
+    iden: int, event: Event, fields: tuple[str, ...]
+) -> str | None:
+    """Return an entity subscription message for a state_changed event.
+
+    Returns None if none of the fields changed. The message is serialized
+    once per event and fields for all subscriptions, like the messages of
+    cached_event_message.
+    """
+    message = _cached_state_diff_message(event, fields)
+    if message is None:
+        return None
+    return message.replace(IDEN_JSON_TEMPLATE, str(iden), 1)
+
+
+@lru_cache(maxsize=128)
+def _cached_state_diff_message(event: Event, fields: tuple[str, ...]) -> str | None:
+    """Cache and serialize the entity subscription message of an event."""
+    entity_event = _state_diff_event(event, fields)
+    if entity_event is None:
+        return None
+    return message_to_json(event_message(IDEN_TEMPLATE, entity_event))
+
+
+def _state_diff_event(event: Event, fields: tuple[str, ...]) -> dict | None:
+    """Return the added, changed or removed entity of a state_changed event."""
+    entity_id = event.data["entity_id"]
+    if (new_state := event.data["new_state"]) is None:
+        return {ENTITY_EVENT_REMOVE: [entity_id]}
+    if (old_state := event.data["old_state"]) is None:
+        return {ENTITY_EVENT_ADD: {entity_id: compressed_state(new_state, fields)}}
+    diff = _state_diff(old_state, new_state, fields)
+    if not diff:
+        return None
+    return {ENTITY_EVENT_CHANGE: {entity_id: diff}}
+
+
+def _state_diff(
+    old_state: State, new_state: State, fields: tuple[str, ...]
+) -> dict[str, Any]:
+    """Return the fields that changed between two states.
+
+    Only the attributes that were added or changed are sent, the keys
+    of removed attributes are listed separately.
+    """
+    additions: dict[str, Any] = {}
+    diff: dict[str, Any] = {}
+    if STATE_FIELD_STATE in fields and old_state.state != new_state.state:
+        additions[COMPRESSED_STATE_STATE] = new_state.state
+    if (
+        STATE_FIELD_LAST_CHANGED in fields
+        and old_state.last_changed != new_state.last_changed
+    ):
+        additions[COMPRESSED_STATE_LAST_CHANGED] = new_state.last_changed.timestamp()
+    if (
+        STATE_FIELD_LAST_UPDATED in fields
+        and old_state.last_updated != new_state.last_updated
+    ):
+        additions[COMPRESSED_STATE_LAST_UPDATED] = new_state.last_updated.timestamp()
+    if STATE_FIELD_CONTEXT in fields and old_state.context != new_state.context:
+        additions[COMPRESSED_STATE_CONTEXT] = new_state.context.id
+    if STATE_FIELD_ATTRIBUTES in fields:
+        old_attributes = old_state.attributes
+        new_attributes = new_state.attributes
+        if old_attributes is not new_attributes and old_attributes != new_attributes:
+            if changed := {
+                key: value
+                for key, value in new_attributes.items()
+                if key not in old_attributes or old_attributes[key] != value
+            }:
+                additions[COMPRESSED_STATE_ATTRIBUTES] = changed
+            if removed := [key for key in old_attributes if key not in new_attributes]:
+                diff[DIFF_REMOVALS] = {COMPRESSED_STATE_ATTRIBUTES: removed}
+    if additions:
+        diff[DIFF_ADDITIONS] = additions
+    return diff
+
+
 def message_to_json(message: dict[str, Any]) -> str:
     """Serialize a websocket message to json."""
     try:
@@ -61,6 +61,7 @@ from homeassistant.requirements import (
     RequirementsNotFound,
     async_get_integration_with_requirements,
 )
+from homeassistant.util.executor import POOL_INTERACTIVE
 from homeassistant.util.package import is_docker_env
 from homeassistant.util.unit_system import IMPERIAL_SYSTEM, METRIC_SYSTEM
 from homeassistant.util.yaml import SECRET_YAML, Secrets, load_yaml
@@ -332,9 +333,9 @@ async def async_hass_config_yaml(hass: HomeAssistant) -> dict:
     else:
         secrets = Secrets(Path(hass.config.config_dir))
 
-    # Not using async_add_executor_job because this is an internal method.
+    # Not using async_add_pool_executor_job because this is an internal method.
     config = await hass.loop.run_in_executor(
-        None,
+        hass.executor_pools.get(POOL_INTERACTIVE),
         load_yaml_config_file,
         hass.config.path(YAML_CONFIG_FILE),
         secrets,
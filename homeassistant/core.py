@@ -7,7 +7,15 @@ of entities and react to changes.
 from __future__ import annotations
 
 import asyncio
-from collections.abc import Awaitable, Collection, Coroutine, Iterable, Mapping
+from collections.abc import (
+    Awaitable,
+    Collection,
+    Coroutine,
+    Iterable,
+    Iterator,
+    Mapping,
+)
+from contextlib import contextmanager
 import datetime
 import enum
 import functools
@@ -20,7 +28,6 @@ from time import monotonic
 from types import MappingProxyType
 from typing import TYPE_CHECKING, Any, Callable, Optional, TypeVar, cast
 
-import attr
 import voluptuous as vol
 import yarl
 
@@ -66,9 +73,11 @@ from homeassistant.util.async_ import (
     shutdown_run_callback_threadsafe,
 )
 import homeassistant.util.dt as dt_util
+from homeassistant.util.executor import ExecutorPools
+from homeassistant.util.instrumentation import Instrumentation
 from homeassistant.util.timeout import TimeoutManager
+import homeassistant.util.ulid as ulid_util
 from homeassistant.util.unit_system import IMPERIAL_SYSTEM, METRIC_SYSTEM, UnitSystem
-import homeassistant.util.uuid as uuid_util
 
 # Typing imports that create a circular dependency
 if TYPE_CHECKING:
@@ -232,6 +241,10 @@ class HomeAssistant:
         self._stopped: asyncio.Event | None = None
         # Timeout handler for Core/Helper namespace
         self.timeout: TimeoutManager = TimeoutManager()
+        # Records how long jobs run while set, see async_start_instrumentation
+        self.instrumentation: Instrumentation | None = None
+        # Named executor pools besides the default executor of the loop
+        self.executor_pools = ExecutorPools()
 
     @property
     def is_running(self) -> bool:
@@ -243,6 +256,21 @@ class HomeAssistant:
         """Return if Home Assistant is stopping."""
         return self.state in (CoreState.stopping, CoreState.final_write)
 
+    @callback
+    def async_start_instrumentation(self) -> Instrumentation:
+        """Start recording the event loop lag and how long jobs run."""
+        if self.instrumentation is None:
+            self.instrumentation = Instrumentation()
+            self.instrumentation.async_start(self.loop)
+        return self.instrumentation
+
+    @callback
+    def async_stop_instrumentation(self) -> None:
+        """Stop recording the event loop lag and how long jobs run."""
+        if self.instrumentation is not None:
+            self.instrumentation.async_stop()
+            self.instrumentation = None
+
     def start(self) -> int:
         """Start Home Assistant.
 
@@ -358,15 +386,30 @@ class HomeAssistant:
         hassjob: HassJob to call.
         args: parameters for method to call.
         """
+        instrumentation = self.instrumentation
         if hassjob.job_type == HassJobType.Coroutinefunction:
-            task = self.loop.create_task(hassjob.target(*args))
+            if instrumentation is None:
+                task = self.loop.create_task(hassjob.target(*args))
+            else:
+                task = self.loop.create_task(
+                    instrumentation.wrap_coroutine(
+                        hassjob.target, hassjob.target(*args)
+                    )
+                )
         elif hassjob.job_type == HassJobType.Callback:
-            self.loop.call_soon(hassjob.target, *args)
+            if instrumentation is None:
+                self.loop.call_soon(hassjob.target, *args)
+            else:
+                self.loop.call_soon(instrumentation.run_callback, hassjob.target, *args)
             return None
-        else:
+        elif instrumentation is None:
             task = self.loop.run_in_executor(  # type: ignore
                 None, hassjob.target, *args
             )
+        else:
+            task = self.loop.run_in_executor(  # type: ignore
+                None, instrumentation.wrap_executor_job(hassjob.target), *args
+            )
 
         # If a task is scheduled
         if self._track_task:
@@ -401,6 +444,8 @@ class HomeAssistant:
         self, target: Callable[..., T], *args: Any
     ) -> Awaitable[T]:
         """Add an executor job from within the event loop."""
+        if self.instrumentation is not None:
+            target = self.instrumentation.wrap_executor_job(target)
         task = self.loop.run_in_executor(None, target, *args)
 
         # If a task is scheduled
@@ -409,6 +454,26 @@ class HomeAssistant:
 
         return task
 
+    @callback
+    def async_add_pool_executor_job(
+        self, pool: str, target: Callable[..., T], *args: Any
+    ) -> Awaitable[T]:
+        """Add an executor job to a named executor pool.
+
+        Jobs of a pool do not wait for the jobs of the default executor
+        or the other pools, see homeassistant.util.executor for the pools.
+        """
+        executor_pool = self.executor_pools.get(pool)
+        if self.instrumentation is not None and not executor_pool.processes:
+            target = self.instrumentation.wrap_executor_job(target)
+        task = self.loop.run_in_executor(executor_pool, target, *args)
+
+        # If a task is scheduled
+        if self._track_task:
+            self._pending_tasks.append(task)
+
+        return task
+
     @callback
     def async_track_tasks(self) -> None:
         """Track tasks so you can wait for all tasks to be done."""
@@ -429,7 +494,10 @@ class HomeAssistant:
         args: parameters for method to call.
         """
         if hassjob.job_type == HassJobType.Callback:
-            hassjob.target(*args)
+            if self.instrumentation is None:
+                hassjob.target(*args)
+            else:
+                self.instrumentation.run_callback(hassjob.target, *args)
             return None
 
         return self.async_add_hass_job(hassjob, *args)
@@ -567,6 +635,8 @@ class HomeAssistant:
                 "Timed out waiting for shutdown stage 3 to complete, the shutdown will continue"
             )
 
+        await self.loop.run_in_executor(None, self.executor_pools.shutdown)
+
         self.exit_code = exit_code
         self.state = CoreState.stopped
 
@@ -574,13 +644,51 @@ class HomeAssistant:
             self._stopped.set()
 
 
-@attr.s(slots=True, frozen=True)
+# Default of the context id to generate a new one
+_GENERATE_ID: Any = object()
+
+
 class Context:
-    """The context that triggered something."""
+    """The context that triggered something.
+
+    A context is created for every state write, so this is a plain
+    slotted class with a time ordered id instead of an attrs class.
+    """
+
+    __slots__ = ("user_id", "parent_id", "id")
 
-    user_id: str = attr.ib(default=None)
-    parent_id: str | None = attr.ib(default=None)
-    id: str = attr.ib(factory=uuid_util.random_uuid_hex)
+    def __init__(
+        self,
+        user_id: str | None = None,
+        parent_id: str | None = None,
+        id: Any = _GENERATE_ID,  # pylint: disable=redefined-builtin
+    ) -> None:
+        """Init the context, pass id=None for a context without id."""
+        if id is _GENERATE_ID:
+            id = ulid_util.ulid_hex()
+        self.id: str = id
+        self.user_id = user_id
+        self.parent_id = parent_id
+
+    def __eq__(self, other: Any) -> bool:
+        """Compare contexts."""
+        return bool(
+            self.__class__ == other.__class__
+            and self.id == other.id
+            and self.user_id == other.user_id
+            and self.parent_id == other.parent_id
+        )
+
+    def __hash__(self) -> int:
+        """Hash the context by its id."""
+        return hash(self.id)
+
+    def __repr__(self) -> str:
+        """Return the representation of the context."""
+        return (
+            f"Context(user_id={self.user_id!r}, "
+            f"parent_id={self.parent_id!r}, id={self.id!r})"
+        )
 
     def as_dict(self) -> dict[str, str | None]:
         """Return a dictionary representation of the context."""
@@ -661,6 +769,10 @@ class EventBus:
     def __init__(self, hass: HomeAssistant) -> None:
         """Initialize a new event bus."""
         self._listeners: dict[str, list[tuple[HassJob, Callable | None]]] = {}
+        # event_type -> data key -> data value -> jobs
+        self._keyed_listeners: dict[str, dict[str, dict[Any, list[HassJob]]]] = {}
+        # Listeners that receive the list of events fired at once
+        self._batch_listeners: dict[str, list[tuple[HassJob, Callable | None]]] = {}
         self._hass = hass
 
     @callback
@@ -669,7 +781,20 @@ class EventBus:
 
         This method must be run in the event loop.
         """
-        return {key: len(self._listeners[key]) for key in self._listeners}
+        listeners = {key: len(self._listeners[key]) for key in self._listeners}
+        for event_type, keyed_listeners in self._keyed_listeners.items():
+            # A keyed listener is indexed once for each of its values
+            listeners[event_type] = listeners.get(event_type, 0) + len(
+                {
+                    job.target
+                    for value_jobs in keyed_listeners.values()
+                    for jobs in value_jobs.values()
+                    for job in jobs
+                }
+            )
+        for event_type, batch_listeners in self._batch_listeners.items():
+            listeners[event_type] = listeners.get(event_type, 0) + len(batch_listeners)
+        return listeners
 
     @property
     def listeners(self) -> dict[str, int]:
@@ -706,30 +831,103 @@ class EventBus:
                 event_type, "event_type", MAX_LENGTH_EVENT_EVENT_TYPE
             )
 
-        listeners = self._listeners.get(event_type, [])
+        event = Event(event_type, event_data, origin, time_fired, context)
+        self._async_dispatch(event)
+        if self._batch_listeners:
+            self._async_dispatch_batch(event_type, [event])
+
+    @callback
+    def async_fire_events(self, event_type: str, events: list[Event]) -> None:
+        """Fire events of one type that happened at once.
 
-        # EVENT_HOMEASSISTANT_CLOSE should go only to his listeners
-        match_all_listeners = self._listeners.get(MATCH_ALL)
-        if match_all_listeners is not None and event_type != EVENT_HOMEASSISTANT_CLOSE:
-            listeners = match_all_listeners + listeners
+        Listeners receive the events one by one like with async_fire,
+        batch listeners receive them in a single call.
 
-        event = Event(event_type, event_data, origin, time_fired, context)
+        This method must be run in the event loop.
+        """
+        if len(event_type) > MAX_LENGTH_EVENT_EVENT_TYPE:
+            raise MaxLengthExceeded(
+                event_type, "event_type", MAX_LENGTH_EVENT_EVENT_TYPE
+            )
+
+        for event in events:
+            self._async_dispatch(event)
+        if self._batch_listeners:
+            self._async_dispatch_batch(event_type, events)
+
+    @callback
+    def _async_dispatch(self, event: Event) -> None:
+        """Run the listeners of an event.
+
+        This method must be run in the event loop.
+        """
+        event_type = event.event_type
+        listeners = self._listeners.get(event_type)
+        keyed_listeners = self._keyed_listeners.get(event_type)
+
+        # EVENT_HOMEASSISTANT_CLOSE should go only to his listeners
+        match_all_listeners = None
+        if event_type != EVENT_HOMEASSISTANT_CLOSE:
+            match_all_listeners = self._listeners.get(MATCH_ALL)
 
         if event_type != EVENT_TIME_CHANGED:
             _LOGGER.debug("Bus:Handling %s", event)
 
-        if not listeners:
+        for filterable_jobs in (match_all_listeners, listeners):
+            if not filterable_jobs:
+                continue
+            for job, event_filter in filterable_jobs:
+                if event_filter is not None:
+                    try:
+                        if not event_filter(event):
+                            continue
+                    except Exception:  # pylint: disable=broad-except
+                        _LOGGER.exception("Error in event filter")
+                        continue
+                self._hass.async_add_hass_job(job, event)
+
+        if not keyed_listeners or not event.data:
             return
 
-        for job, event_filter in listeners:
-            if event_filter is not None:
-                try:
-                    if not event_filter(event):
+        for data_key, value_jobs in keyed_listeners.items():
+            try:
+                jobs = value_jobs.get(event.data.get(data_key))
+            except TypeError:
+                # The value is not hashable so no listener can match it
+                continue
+            if jobs:
+                for job in jobs:
+                    self._hass.async_add_hass_job(job, event)
+
+    @callback
+    def _async_dispatch_batch(self, event_type: str, events: list[Event]) -> None:
+        """Run the batch listeners of events of the same type.
+
+        This method must be run in the event loop.
+        """
+        match_all_listeners = None
+        if event_type != EVENT_HOMEASSISTANT_CLOSE:
+            match_all_listeners = self._batch_listeners.get(MATCH_ALL)
+
+        for filterable_jobs in (
+            match_all_listeners,
+            self._batch_listeners.get(event_type),
+        ):
+            if not filterable_jobs:
+                continue
+            for job, event_filter in filterable_jobs:
+                batch = events
+                if event_filter is not None:
+                    batch = []
+                    for event in events:
+                        try:
+                            if event_filter(event):
+                                batch.append(event)
+                        except Exception:  # pylint: disable=broad-except
+                            _LOGGER.exception("Error in event filter")
+                    if not batch:
                         continue
-                except Exception:  # pylint: disable=broad-except
-                    _LOGGER.exception("Error in event filter")
-                    continue
-            self._hass.async_add_hass_job(job, event)
+                self._hass.async_add_hass_job(job, batch)
 
     def listen(self, event_type: str, listener: Callable) -> CALLBACK_TYPE:
         """Listen for all events or events of a specific type.
@@ -783,6 +981,98 @@ class EventBus:
 
         return remove_listener
 
+    @callback
+    def async_listen_batch(
+        self,
+        event_type: str,
+        listener: Callable[[list[Event]], Any],
+        event_filter: Callable | None = None,
+    ) -> CALLBACK_TYPE:
+        """Listen for lists of events of a specific type or all events.
+
+        The listener is called once with all events that passed the
+        optional event_filter when events are fired together with
+        async_fire_events, for example the state changes of a
+        StateMachine.async_batch, and with a single event otherwise.
+
+        This method must be run in the event loop.
+        """
+        if event_filter is not None and not is_callback(event_filter):
+            raise HomeAssistantError(f"Event filter {event_filter} is not a callback")
+        filterable_job = (HassJob(listener), event_filter)
+        self._batch_listeners.setdefault(event_type, []).append(filterable_job)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the listener."""
+            try:
+                self._batch_listeners[event_type].remove(filterable_job)
+            except (KeyError, ValueError):
+                _LOGGER.exception(
+                    "Unable to remove unknown batch job listener %s", filterable_job
+                )
+                return
+            if not self._batch_listeners[event_type]:
+                del self._batch_listeners[event_type]
+
+        return remove_listener
+
+    @callback
+    def async_listen_keyed(
+        self,
+        event_type: str,
+        data_key: str,
+        values: Iterable[Any],
+        listener: Callable,
+    ) -> CALLBACK_TYPE:
+        """Listen for events of a type whose data_key has one of the values.
+
+        The listeners are indexed by the value of data_key, for example
+        all state_changed events of a few entity ids, so firing an event
+        only runs the listeners that are interested in its value instead
+        of an event_filter for every listener.
+
+        This method must be run in the event loop.
+        """
+        job = HassJob(listener)
+        values = set(values)
+        value_jobs = self._keyed_listeners.setdefault(event_type, {}).setdefault(
+            data_key, {}
+        )
+        for value in values:
+            value_jobs.setdefault(value, []).append(job)
+
+        @callback
+        def remove_listener() -> None:
+            """Remove the listener."""
+            self._async_remove_keyed_listener(event_type, data_key, values, job)
+
+        return remove_listener
+
+    @callback
+    def _async_remove_keyed_listener(
+        self, event_type: str, data_key: str, values: set[Any], job: HassJob
+    ) -> None:
+        """Remove a keyed listener.
+
+        This method must be run in the event loop.
+        """
+        try:
+            keyed_listeners = self._keyed_listeners[event_type]
+            value_jobs = keyed_listeners[data_key]
+            for value in values:
+                value_jobs[value].remove(job)
+                if not value_jobs[value]:
+                    del value_jobs[value]
+        except (KeyError, ValueError):
+            _LOGGER.exception("Unable to remove unknown keyed job listener %s", job)
+            return
+
+        if not value_jobs:
+            del keyed_listeners[data_key]
+        if not keyed_listeners:
+            del self._keyed_listeners[event_type]
+
     def listen_once(
         self, event_type: str, listener: Callable[[Event], None]
     ) -> CALLBACK_TYPE:
@@ -881,6 +1171,7 @@ class State:
         "domain",
         "object_id",
         "_as_dict",
+        "_as_dict_json",
     ]
 
     def __init__(
@@ -910,12 +1201,17 @@ class State:
 
         self.entity_id = entity_id.lower()
         self.state = state
-        self.attributes = MappingProxyType(attributes or {})
+        if isinstance(attributes, MappingProxyType):
+            # Share the read only attributes of a previous state
+            self.attributes = attributes
+        else:
+            self.attributes = MappingProxyType(attributes or {})
         self.last_updated = last_updated or dt_util.utcnow()
         self.last_changed = last_changed or self.last_updated
         self.context = context or Context()
         self.domain, self.object_id = split_entity_id(self.entity_id)
         self._as_dict: dict[str, Collection[Any]] | None = None
+        self._as_dict_json: bytes | None = None
 
     @property
     def name(self) -> str:
@@ -948,6 +1244,21 @@ class State:
             }
         return self._as_dict
 
+    @property
+    def as_dict_json(self) -> bytes:
+        """Return the JSON of the dict representation of the State.
+
+        The JSON is serialized once and cached, so messages that contain
+        many states can splice it in instead of encoding the states again.
+        Raises TypeError if the attributes can not be serialized.
+        """
+        if self._as_dict_json is None:
+            # pylint: disable=import-outside-toplevel
+            from homeassistant.helpers.json import json_bytes
+
+            self._as_dict_json = json_bytes(self.as_dict())
+        return self._as_dict_json
+
     @classmethod
     def from_dict(cls, json_dict: dict) -> Any:
         """Initialize a state from a dict.
@@ -1011,6 +1322,8 @@ class StateMachine:
         self._reservations: set[str] = set()
         self._bus = bus
         self._loop = loop
+        # The state_changed events of an async_batch
+        self._batch_events: list[Event] | None = None
 
     def entity_ids(self, domain_filter: str | None = None) -> list[str]:
         """List of entity ids that are being tracked."""
@@ -1120,11 +1433,10 @@ class StateMachine:
         if old_state is None:
             return False
 
-        self._bus.async_fire(
-            EVENT_STATE_CHANGED,
+        self._async_fire_state_changed(
             {"entity_id": entity_id, "old_state": old_state, "new_state": None},
-            EventOrigin.local,
-            context=context,
+            context,
+            None,
         )
         return True
 
@@ -1192,6 +1504,8 @@ class StateMachine:
         If you just update the attributes and not the state, last changed will
         not be affected.
 
+        Passing the attributes of the current state skips comparing them.
+
         This method must be run in the event loop.
         """
         entity_id = entity_id.lower()
@@ -1204,12 +1518,17 @@ class StateMachine:
             last_changed = None
         else:
             same_state = old_state.state == new_state and not force_update
-            same_attr = old_state.attributes == MappingProxyType(attributes)
+            old_attributes = old_state.attributes
+            same_attr = attributes is old_attributes or old_attributes == attributes
             last_changed = old_state.last_changed if same_state else None
 
         if same_state and same_attr:
             return
 
+        if same_attr:
+            assert old_state is not None
+            attributes = old_state.attributes
+
         if context is None:
             context = Context()
 
@@ -1225,12 +1544,75 @@ class StateMachine:
             old_state is None,
         )
         self._states[entity_id] = state
-        self._bus.async_fire(
-            EVENT_STATE_CHANGED,
+        self._async_fire_state_changed(
             {"entity_id": entity_id, "old_state": old_state, "new_state": state},
-            EventOrigin.local,
             context,
-            time_fired=now,
+            now,
+        )
+
+    @callback
+    def async_set_many(
+        self,
+        states: Iterable[tuple[str, str, Mapping[str, Any] | None]],
+        force_update: bool = False,
+        context: Context | None = None,
+    ) -> None:
+        """Set the states and attributes of many entities at once.
+
+        The state_changed events are fired together after all states
+        were set, see async_batch.
+
+        This method must be run in the event loop.
+        """
+        with self.async_batch():
+            for entity_id, new_state, attributes in states:
+                self.async_set(entity_id, new_state, attributes, force_update, context)
+
+    @contextmanager
+    def async_batch(self) -> Iterator[None]:
+        """Fire the state changes made inside the block together.
+
+        The states are set immediately, their state_changed events are
+        fired in order with EventBus.async_fire_events when the outermost
+        block exits, so batch listeners handle them in a single call.
+
+        This method must be run in the event loop.
+        """
+        if self._batch_events is not None:
+            # Nested blocks fire with the outermost one
+            yield
+            return
+
+        self._batch_events = []
+        try:
+            yield
+        finally:
+            events = self._batch_events
+            self._batch_events = None
+            if events:
+                self._bus.async_fire_events(EVENT_STATE_CHANGED, events)
+
+    @callback
+    def _async_fire_state_changed(
+        self,
+        event_data: dict[str, Any],
+        context: Context | None,
+        time_fired: datetime.datetime | None,
+    ) -> None:
+        """Fire a state_changed event or add it to the current batch."""
+        if self._batch_events is None:
+            self._bus.async_fire(
+                EVENT_STATE_CHANGED,
+                event_data,
+                EventOrigin.local,
+                context,
+                time_fired=time_fired,
+            )
+            return
+        self._batch_events.append(
+            Event(
+                EVENT_STATE_CHANGED, event_data, EventOrigin.local, time_fired, context
+            )
         )
 
 
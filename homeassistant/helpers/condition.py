@@ -4,7 +4,7 @@ from __future__ import annotations
 import asyncio
 from collections import deque
 from collections.abc import Container, Generator
-from contextlib import contextmanager
+from contextlib import AbstractContextManager, contextmanager, nullcontext
 from datetime import datetime, timedelta
 import functools as ft
 import logging
@@ -58,6 +58,7 @@ import homeassistant.util.dt as dt_util
 from .trace import (
     TraceElement,
     trace_append_element,
+    trace_cv,
     trace_path,
     trace_path_get,
     trace_stack_cv,
@@ -77,6 +78,9 @@ INPUT_ENTITY_ID = re.compile(
 
 ConditionCheckerType = Callable[[HomeAssistant, TemplateVarsType], bool]
 
+# Entered instead of the trace context managers when no trace is recorded
+_NO_TRACE = nullcontext()
+
 
 def condition_trace_append(variables: TemplateVarsType, path: str) -> TraceElement:
     """Append a TraceElement to trace[path]."""
@@ -130,12 +134,32 @@ def trace_condition(variables: TemplateVarsType) -> Generator:
             trace_stack_pop(trace_stack_cv)
 
 
+def _trace_condition(variables: TemplateVarsType) -> AbstractContextManager:
+    """Trace condition evaluation if a trace is recorded."""
+    if trace_cv.get() is None:
+        return _NO_TRACE
+    return trace_condition(variables)
+
+
+def _trace_path(suffix: list[str]) -> AbstractContextManager:
+    """Go deeper in the config tree if a trace is recorded."""
+    if trace_cv.get() is None:
+        return _NO_TRACE
+    return trace_path(suffix)
+
+
 def trace_condition_function(condition: ConditionCheckerType) -> ConditionCheckerType:
-    """Wrap a condition function to enable basic tracing."""
+    """Wrap a condition function to enable basic tracing.
+
+    The condition is called directly if no trace is recorded, which
+    avoids creating trace elements nobody will look at.
+    """
 
     @ft.wraps(condition)
     def wrapper(hass: HomeAssistant, variables: TemplateVarsType = None) -> bool:
         """Trace condition."""
+        if trace_cv.get() is None:
+            return condition(hass, variables)
         with trace_condition(variables):
             result = condition(hass, variables)
             condition_trace_update_result(result=result)
@@ -200,7 +224,7 @@ async def async_and_from_config(
         errors = []
         for index, check in enumerate(checks):
             try:
-                with trace_path(["conditions", str(index)]):
+                with _trace_path(["conditions", str(index)]):
                     if not check(hass, variables):
                         return False
             except ConditionError as ex:
@@ -235,7 +259,7 @@ async def async_or_from_config(
         errors = []
         for index, check in enumerate(checks):
             try:
-                with trace_path(["conditions", str(index)]):
+                with _trace_path(["conditions", str(index)]):
                     if check(hass, variables):
                         return True
             except ConditionError as ex:
@@ -270,7 +294,7 @@ async def async_not_from_config(
         errors = []
         for index, check in enumerate(checks):
             try:
-                with trace_path(["conditions", str(index)]):
+                with _trace_path(["conditions", str(index)]):
                     if check(hass, variables):
                         return False
             except ConditionError as ex:
@@ -449,7 +473,9 @@ def async_numeric_state_from_config(
         errors = []
         for index, entity_id in enumerate(entity_ids):
             try:
-                with trace_path(["entity_id", str(index)]), trace_condition(variables):
+                with _trace_path(["entity_id", str(index)]), _trace_condition(
+                    variables
+                ):
                     if not async_numeric_state(
                         hass,
                         entity_id,
@@ -561,7 +587,9 @@ def state_from_config(
         errors = []
         for index, entity_id in enumerate(entity_ids):
             try:
-                with trace_path(["entity_id", str(index)]), trace_condition(variables):
+                with _trace_path(["entity_id", str(index)]), _trace_condition(
+                    variables
+                ):
                     if not state(hass, entity_id, req_states, for_period, attribute):
                         return False
             except ConditionError as ex:
@@ -684,14 +712,21 @@ def async_template(
     trace_result: bool = True,
 ) -> bool:
     """Test if template condition matches."""
+    # The entities the template used are only collected for the trace
+    trace_entities = trace_result and trace_cv.get() is not None
     try:
-        info = value_template.async_render_to_info(variables, parse_result=False)
-        value = info.result()
+        # Static templates are not rendered, but the result of
+        # async_render_to_info is the stripped template
+        if trace_entities or value_template.is_static:
+            info = value_template.async_render_to_info(variables, parse_result=False)
+            value = info.result()
+        else:
+            value = value_template.async_render(variables, parse_result=False)
     except TemplateError as ex:
         raise ConditionErrorMessage("template", str(ex)) from ex
 
     result = value.lower() == "true"
-    if trace_result:
+    if trace_entities:
         condition_trace_set_result(result, entities=list(info.entities))
     return result
 
@@ -704,6 +739,25 @@ def async_template_from_config(
         config = cv.TEMPLATE_CONDITION_SCHEMA(config)
     value_template = cast(Template, config.get(CONF_VALUE_TEMPLATE))
 
+    if value_template.is_static:
+        # A template without expressions always has the same result
+        static_result: list[bool] = []
+
+        @trace_condition_function
+        def static_template_if(
+            hass: HomeAssistant, variables: TemplateVarsType = None
+        ) -> bool:
+            """Return the result of a static template, testing it once."""
+            if not static_result:
+                value_template.hass = hass
+                static_result.append(
+                    async_template(hass, value_template, variables, False)
+                )
+            condition_trace_set_result(static_result[0], entities=[])
+            return static_result[0]
+
+        return static_template_if
+
     @trace_condition_function
     def template_if(hass: HomeAssistant, variables: TemplateVarsType = None) -> bool:
         """Validate template based if-condition."""
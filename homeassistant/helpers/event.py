@@ -36,14 +36,23 @@ from homeassistant.exceptions import TemplateError
 from homeassistant.helpers.entity_registry import EVENT_ENTITY_REGISTRY_UPDATED
 from homeassistant.helpers.ratelimit import KeyedRateLimit
 from homeassistant.helpers.sun import get_astral_event_next
-from homeassistant.helpers.template import RenderInfo, Template, result_as_boolean
+from homeassistant.helpers.template import (
+    RenderInfo,
+    StateAggregate,
+    Template,
+    async_get_state_aggregate,
+    render_trigger_cv,
+    result_as_boolean,
+)
 from homeassistant.helpers.typing import TemplateVarsType
 from homeassistant.loader import bind_hass
 from homeassistant.util import dt as dt_util
 from homeassistant.util.async_ import run_callback_threadsafe
+from homeassistant.util.instrumentation import job_name
 
 TRACK_STATE_CHANGE_CALLBACKS = "track_state_change_callbacks"
 TRACK_STATE_CHANGE_LISTENER = "track_state_change_listener"
+TRACK_STATE_CHANGE_KEYED_LISTENERS = "track_state_change_keyed_listeners"
 
 TRACK_STATE_ADDED_DOMAIN_CALLBACKS = "track_state_added_domain_callbacks"
 TRACK_STATE_ADDED_DOMAIN_LISTENER = "track_state_added_domain_listener"
@@ -243,8 +252,9 @@ def async_track_state_change_event(
     In order to avoid having to iterate a long list
     of EVENT_STATE_CHANGED and fire and create a job
     for each one, we keep a dict of entity ids that
-    care about the state change events so we can
-    do a fast dict lookup to route events.
+    care about the state change events. The event bus
+    only dispatches the events of those entity ids
+    with a fast dict lookup.
     """
     entity_ids = _async_string_to_lower_list(entity_ids)
     if not entity_ids:
@@ -254,11 +264,6 @@ def async_track_state_change_event(
 
     if TRACK_STATE_CHANGE_LISTENER not in hass.data:
 
-        @callback
-        def _async_state_change_filter(event: Event) -> bool:
-            """Filter state changes by entity_id."""
-            return event.data.get("entity_id") in entity_callbacks
-
         @callback
         def _async_state_change_dispatcher(event: Event) -> None:
             """Dispatch state changes by entity_id."""
@@ -275,27 +280,28 @@ def async_track_state_change_event(
                         "Error while processing state change for %s", entity_id
                     )
 
-        hass.data[TRACK_STATE_CHANGE_LISTENER] = hass.bus.async_listen(
-            EVENT_STATE_CHANGED,
-            _async_state_change_dispatcher,
-            event_filter=_async_state_change_filter,
-        )
+        hass.data[TRACK_STATE_CHANGE_LISTENER] = _async_state_change_dispatcher
 
+    # The event bus only runs the dispatcher for the tracked entity ids
+    dispatcher = hass.data[TRACK_STATE_CHANGE_LISTENER]
+    keyed_listeners = hass.data.setdefault(TRACK_STATE_CHANGE_KEYED_LISTENERS, {})
     job = HassJob(action)
 
     for entity_id in entity_ids:
+        if entity_id not in entity_callbacks:
+            keyed_listeners[entity_id] = hass.bus.async_listen_keyed(
+                EVENT_STATE_CHANGED, ATTR_ENTITY_ID, (entity_id,), dispatcher
+            )
         entity_callbacks.setdefault(entity_id, []).append(job)
 
     @callback
     def remove_listener() -> None:
         """Remove state change listener."""
-        _async_remove_indexed_listeners(
-            hass,
-            TRACK_STATE_CHANGE_CALLBACKS,
-            TRACK_STATE_CHANGE_LISTENER,
-            entity_ids,
-            job,
-        )
+        for entity_id in entity_ids:
+            entity_callbacks[entity_id].remove(job)
+            if not entity_callbacks[entity_id]:
+                del entity_callbacks[entity_id]
+                keyed_listeners.pop(entity_id)()
 
     return remove_listener
 
@@ -518,6 +524,30 @@ def async_track_state_removed_domain(
     return remove_listener
 
 
+@callback
+@bind_hass
+def async_track_state_aggregate(
+    hass: HomeAssistant,
+    domain: str,
+    action: Callable[[StateAggregate], Any],
+    attribute: str | None = None,
+) -> Callable[[], None]:
+    """Track the aggregate of the states or an attribute of a domain.
+
+    The action is called with the aggregate after it was updated for a
+    state change in the domain, without iterating over its states.
+    """
+    aggregate = async_get_state_aggregate(hass, domain.lower(), attribute)
+    job = HassJob(action)
+
+    @callback
+    def _async_aggregate_updated(event: Event) -> None:
+        """Call the action with the updated aggregate."""
+        hass.async_run_hass_job(job, aggregate)
+
+    return aggregate.async_add_listener(_async_aggregate_updated)
+
+
 @callback
 def _async_string_to_lower_list(instr: str | Iterable[str]) -> list[str]:
     if isinstance(instr, str):
@@ -790,14 +820,16 @@ class _TrackTemplateResultInfo:
         self._info: dict[Template, RenderInfo] = {}
         self._track_state_changes: _TrackStateChangeFiltered | None = None
         self._time_listeners: dict[Template, Callable] = {}
+        self._aggregate_listeners: dict[
+            Template, dict[tuple[str, str | None], Callable]
+        ] = {}
 
     def async_setup(self, raise_on_template_error: bool, strict: bool = False) -> None:
         """Activation of template tracking."""
         for track_template_ in self._track_templates:
             template = track_template_.template
-            variables = track_template_.variables
-            self._info[template] = info = template.async_render_to_info(
-                variables, strict=strict
+            self._info[template] = info = self._async_render_to_info(
+                track_template_, "setup", strict=strict
             )
 
             if info.exception:
@@ -813,6 +845,8 @@ class _TrackTemplateResultInfo:
             self.hass, _render_infos_to_track_states(self._info.values()), self._refresh
         )
         self._update_time_listeners()
+        for template, info in self._info.items():
+            self._setup_aggregate_listeners(template, info.aggregates)
         _LOGGER.debug(
             "Template group %s listens for %s",
             self._track_templates,
@@ -847,12 +881,39 @@ class _TrackTemplateResultInfo:
 
         @callback
         def _refresh_from_time(now: datetime) -> None:
-            self._refresh(None, track_templates=track_templates)
+            self._refresh(None, track_templates=track_templates, trigger="time")
 
         self._time_listeners[template] = async_track_utc_time_change(
             self.hass, _refresh_from_time, second=0
         )
 
+    @callback
+    def _setup_aggregate_listeners(
+        self, template: Template, aggregates: Iterable[tuple[str, str | None]]
+    ) -> None:
+        listeners = self._aggregate_listeners.setdefault(template, {})
+        track_templates = [
+            track_template_
+            for track_template_ in self._track_templates
+            if track_template_.template == template
+        ]
+
+        @callback
+        def _refresh_from_aggregate(event: Event) -> None:
+            self._refresh(event, track_templates=track_templates)
+
+        # Listen to new aggregates first so a shared aggregate is not
+        # removed and created again between renders
+        for key in aggregates:
+            if key not in listeners:
+                listeners[key] = async_get_state_aggregate(
+                    self.hass, *key
+                ).async_add_listener(_refresh_from_aggregate)
+
+        for key in set(listeners) - set(aggregates):
+            # The aggregate has left the scope of the template
+            listeners.pop(key)()
+
     @callback
     def _update_time_listeners(self) -> None:
         for template, info in self._info.items():
@@ -866,17 +927,38 @@ class _TrackTemplateResultInfo:
         self._rate_limit.async_remove()
         for template in list(self._time_listeners):
             self._time_listeners.pop(template)()
+        for listeners in self._aggregate_listeners.values():
+            while listeners:
+                listeners.popitem()[1]()
 
     @callback
     def async_refresh(self) -> None:
         """Force recalculate the template."""
         self._refresh(None)
 
+    def _async_render_to_info(
+        self, track_template_: TrackTemplate, trigger: str, strict: bool = False
+    ) -> RenderInfo:
+        """Render a template and account the render to the owner of the tracker."""
+        template = track_template_.template
+        if self.hass.instrumentation is None:
+            return template.async_render_to_info(
+                track_template_.variables, strict=strict
+            )
+        token = render_trigger_cv.set((_template_owner(self._job.target), trigger))
+        try:
+            return template.async_render_to_info(
+                track_template_.variables, strict=strict
+            )
+        finally:
+            render_trigger_cv.reset(token)
+
     def _render_template_if_ready(
         self,
         track_template_: TrackTemplate,
         now: datetime,
         event: Event | None,
+        trigger: str = "refresh",
     ) -> bool | TrackTemplateResult:
         """Re-render the template if conditions match.
 
@@ -916,8 +998,8 @@ class _TrackTemplateResultInfo:
             )
 
         self._rate_limit.async_triggered(template, now)
-        self._info[template] = info = template.async_render_to_info(
-            track_template_.variables
+        self._info[template] = info = self._async_render_to_info(
+            track_template_, event.data["entity_id"] if event else trigger
         )
 
         try:
@@ -942,6 +1024,7 @@ class _TrackTemplateResultInfo:
         event: Event | None,
         track_templates: Iterable[TrackTemplate] | None = None,
         replayed: bool | None = False,
+        trigger: str = "refresh",
     ) -> None:
         """Refresh the template.
 
@@ -954,18 +1037,24 @@ class _TrackTemplateResultInfo:
 
         replayed is True if the event is being replayed because the
         rate limit was hit.
+
+        trigger is recorded as the reason of renders without an event
+        while instrumentation runs.
         """
         updates = []
         info_changed = False
         now = event.time_fired if not replayed and event else dt_util.utcnow()
 
         for track_template_ in track_templates or self._track_templates:
-            update = self._render_template_if_ready(track_template_, now, event)
+            update = self._render_template_if_ready(
+                track_template_, now, event, trigger
+            )
             if not update:
                 continue
 
             template = track_template_.template
             self._setup_time_listener(template, self._info[template].has_time)
+            self._setup_aggregate_listeners(template, self._info[template].aggregates)
 
             info_changed = True
 
@@ -1018,6 +1107,12 @@ TrackTemplateResultListener = Callable[
 """
 
 
+def _template_owner(action: Callable) -> str:
+    """Return the entity or function a template tracker renders for."""
+    entity_id = getattr(getattr(action, "__self__", None), "entity_id", None)
+    return entity_id if isinstance(entity_id, str) else job_name(action)
+
+
 @callback
 @bind_hass
 def async_track_template_result(
@@ -1480,8 +1575,9 @@ def _render_infos_needs_all_listener(render_infos: Iterable[RenderInfo]) -> bool
 
         # Previous call had an exception
         # so we do not know which states
-        # to track
-        if render_info.exception:
+        # to track unless the template
+        # could be analyzed
+        if render_info.exception and not render_info.analyzed:
             return True
 
     return False
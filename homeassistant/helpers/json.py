@@ -1,8 +1,14 @@
 """Helpers to help with encoding Home Assistant objects in JSON."""
+from __future__ import annotations
+
 from datetime import datetime, timedelta
 import json
 from typing import Any
 
+import orjson
+
+from homeassistant.core import Event, State
+
 
 class JSONEncoder(json.JSONEncoder):
     """JSONEncoder that supports Home Assistant objects."""
@@ -36,3 +42,50 @@ class ExtendedJSONEncoder(JSONEncoder):
             return super().default(o)
         except TypeError:
             return {"__type": str(type(o)), "repr": repr(o)}
+
+
+def json_encoder_default(obj: Any) -> Any:
+    """Convert Home Assistant objects that orjson does not serialize natively.
+
+    Datetimes, dicts, lists and the primitive types are handled
+    by orjson itself without calling this hook.
+    """
+    if isinstance(obj, State):
+        return obj.as_dict()
+    if isinstance(obj, Event):
+        # Same as Event.as_dict but lets orjson format time_fired
+        return {
+            "event_type": obj.event_type,
+            "data": dict(obj.data),
+            "origin": obj.origin.value,
+            "time_fired": obj.time_fired,
+            "context": obj.context.as_dict(),
+        }
+    if isinstance(obj, (set, tuple)):
+        return list(obj)
+    if hasattr(obj, "as_dict"):
+        return obj.as_dict()
+    raise TypeError
+
+
+def json_bytes(obj: Any) -> bytes:
+    """Serialize an object to JSON encoded as UTF-8 bytes.
+
+    Unlike JSONEncoder, NaN and infinite floats are serialized as null.
+    """
+    return orjson.dumps(
+        obj, option=orjson.OPT_NON_STR_KEYS, default=json_encoder_default
+    )
+
+
+def json_dumps(obj: Any) -> str:
+    """Serialize an object to a JSON string."""
+    return json_bytes(obj).decode("utf-8")
+
+
+def json_bytes_states(states: list[State]) -> bytes:
+    """Serialize a list of states by splicing their cached JSON.
+
+    Raises TypeError if a state can not be serialized.
+    """
+    return b"[" + b",".join([state.as_dict_json for state in states]) + b"]"
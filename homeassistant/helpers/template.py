@@ -4,11 +4,13 @@ from __future__ import annotations
 from ast import literal_eval
 import asyncio
 import base64
+from collections import OrderedDict
 import collections.abc
 from collections.abc import Generator, Iterable
 from contextlib import suppress
 from contextvars import ContextVar
 from datetime import datetime, timedelta
+from fractions import Fraction
 from functools import partial, wraps
 import json
 import logging
@@ -17,12 +19,14 @@ from operator import attrgetter
 import random
 import re
 import sys
+import threading
+from time import perf_counter
+from types import CodeType
 from typing import Any, Callable, cast
 from urllib.parse import urlencode as urllib_urlencode
-import weakref
 
 import jinja2
-from jinja2 import contextfunction, pass_context
+from jinja2 import contextfunction, meta, nodes, pass_context
 from jinja2.sandbox import ImmutableSandboxedEnvironment
 from jinja2.utils import Namespace
 import voluptuous as vol
@@ -32,10 +36,12 @@ from homeassistant.const import (
     ATTR_LATITUDE,
     ATTR_LONGITUDE,
     ATTR_UNIT_OF_MEASUREMENT,
+    EVENT_STATE_CHANGED,
     LENGTH_METERS,
     STATE_UNKNOWN,
 )
 from homeassistant.core import (
+    Event,
     HomeAssistant,
     State,
     callback,
@@ -57,6 +63,7 @@ _SENTINEL = object()
 DATE_STR_FORMAT = "%Y-%m-%d %H:%M:%S"
 
 _RENDER_INFO = "template.render_info"
+_STATE_AGGREGATES = "template.state_aggregates"
 _ENVIRONMENT = "template.environment"
 _ENVIRONMENT_LIMITED = "template.environment_limited"
 _ENVIRONMENT_STRICT = "template.environment_strict"
@@ -69,6 +76,23 @@ _RESERVED_NAMES = {"contextfunction", "evalcontextfunction", "environmentfunctio
 
 _GROUP_DOMAIN_PREFIX = "group."
 
+# Functions that take an entity id as first argument
+_ENTITY_ID_FUNCTIONS = {"states", "is_state", "state_attr", "is_state_attr"}
+_TIME_FUNCTIONS = {"now", "utcnow"}
+# Functions that take a domain as first argument
+_DOMAIN_FUNCTIONS = {
+    "domain_count",
+    "domain_sum",
+    "domain_min",
+    "domain_max",
+    "domain_entities",
+}
+# Functions and filters that access states the analysis cannot determine
+_DYNAMIC_STATE_FUNCTIONS = {"expand", "closest", "distance", "device_entities"}
+
+# The number of compiled templates kept by the shared compiled code cache
+COMPILED_CODE_CACHE_SIZE = 10000
+
 _COLLECTABLE_STATE_ATTRIBUTES = {
     "state",
     "attributes",
@@ -84,6 +108,11 @@ ALL_STATES_RATE_LIMIT = timedelta(minutes=1)
 DOMAIN_STATES_RATE_LIMIT = timedelta(seconds=1)
 
 template_cv: ContextVar[str | None] = ContextVar("template_cv", default=None)
+# The owner and trigger of a render by a template tracker, only set while
+# instrumentation runs to account the render time to them
+render_trigger_cv: ContextVar[tuple[str, str] | None] = ContextVar(
+    "render_trigger_cv", default=None
+)
 
 
 @bind_hass
@@ -221,6 +250,13 @@ class RenderInfo:
         self.entities: collections.abc.Set[str] = set()
         self.rate_limit: timedelta | None = None
         self.has_time = False
+        # The render failed but the entities, domains and time references
+        # of the template could be determined by TemplateAnalysis
+        self.analyzed = False
+        # The (domain, attribute) of the StateAggregates the template reads,
+        # a tracker re-renders when they change instead of for their domains
+        self.aggregates: collections.abc.Set[tuple[str, str | None]] = set()
+        self._aggregate_domains: set[str] = set()
 
     def __repr__(self) -> str:
         """Representation of RenderInfo."""
@@ -232,6 +268,15 @@ class RenderInfo:
             split_entity_id(entity_id)[0] in self.domains or entity_id in self.entities
         )
 
+    def _filter_aggregates_domains_and_entities(self, entity_id: str) -> bool:
+        """Template should re-render if the entity state changes when we match aggregates, specific domains or entities."""
+        domain = split_entity_id(entity_id)[0]
+        return (
+            domain in self._aggregate_domains
+            or domain in self.domains
+            or entity_id in self.entities
+        )
+
     def _filter_entities(self, entity_id: str) -> bool:
         """Template should re-render if the entity state changes when we match specific entities."""
         return entity_id in self.entities
@@ -246,6 +291,16 @@ class RenderInfo:
             raise self.exception
         return cast(str, self._result)
 
+    def _apply_analysis(self, analysis: TemplateAnalysis) -> None:
+        """Add what the template references when the render failed."""
+        if not analysis.complete:
+            return
+        self.analyzed = True
+        self.entities.update(analysis.entities)  # type: ignore[attr-defined]
+        self.domains.update(analysis.domains)  # type: ignore[attr-defined]
+        self.domains_lifecycle.update(analysis.domains)  # type: ignore[attr-defined]
+        self.has_time |= analysis.has_time
+
     def _freeze_static(self) -> None:
         self.is_static = True
         self._freeze_sets()
@@ -255,17 +310,20 @@ class RenderInfo:
         self.entities = frozenset(self.entities)
         self.domains = frozenset(self.domains)
         self.domains_lifecycle = frozenset(self.domains_lifecycle)
+        self.aggregates = frozenset(self.aggregates)
 
     def _freeze(self) -> None:
         self._freeze_sets()
 
+        unknown_states = self.exception is not None and not self.analyzed
+
         if self.rate_limit is None:
-            if self.all_states or self.exception:
+            if self.all_states or unknown_states:
                 self.rate_limit = ALL_STATES_RATE_LIMIT
             elif self.domains or self.domains_lifecycle:
                 self.rate_limit = DOMAIN_STATES_RATE_LIMIT
 
-        if self.exception:
+        if unknown_states:
             return
 
         if not self.all_states_lifecycle:
@@ -277,7 +335,10 @@ class RenderInfo:
         if self.all_states:
             return
 
-        if self.domains:
+        if self.aggregates:
+            self._aggregate_domains = {domain for domain, _ in self.aggregates}
+            self.filter = self._filter_aggregates_domains_and_entities
+        elif self.domains:
             self.filter = self._filter_domains_and_entities
         elif self.entities:
             self.filter = self._filter_entities
@@ -285,6 +346,130 @@ class RenderInfo:
             self.filter = _false
 
 
+class TemplateAnalysis:
+    """The states a template references, found by walking its syntax tree.
+
+    Entity ids and domains are only found when they are constants, like
+    states('sensor.temperature'), states.sensor.temperature or
+    states.light. When a template accesses states in any other way, like
+    iterating over all states, calling expand or using variables that
+    may hold states, the analysis is not complete and only rendering the
+    template can tell which states it depends on.
+    """
+
+    def __init__(self, env: TemplateEnvironment, source: str) -> None:
+        """Analyze a template."""
+        self.entities: set[str] = set()
+        self.domains: set[str] = set()
+        self.has_time = False
+        self.complete = True
+        try:
+            ast = env.parse(source)
+            undeclared = meta.find_undeclared_variables(ast)
+        except jinja2.TemplateError:
+            self.complete = False
+            return
+        if any(name not in env.globals for name in undeclared):
+            self.complete = False
+        self._visit(ast)
+
+    def __repr__(self) -> str:
+        """Representation of TemplateAnalysis."""
+        return f"<TemplateAnalysis entities={self.entities} domains={self.domains} has_time={self.has_time} complete={self.complete}>"
+
+    def _add_entity_id(self, entity_id: Any) -> None:
+        """Add a referenced entity id."""
+        if isinstance(entity_id, str) and valid_entity_id(entity_id):
+            self.entities.add(entity_id)
+        else:
+            self.complete = False
+
+    def _visit(self, node: nodes.Node) -> None:
+        """Collect the references of a node and its children."""
+        if isinstance(node, nodes.Call) and isinstance(node.node, nodes.Name):
+            name = node.node.name
+            if name in _ENTITY_ID_FUNCTIONS:
+                if node.args and isinstance(node.args[0], nodes.Const):
+                    self._add_entity_id(node.args[0].value)
+                else:
+                    self.complete = False
+                for child in node.iter_child_nodes(exclude=("node",)):
+                    self._visit(child)
+                return
+            if name in _DOMAIN_FUNCTIONS:
+                if (
+                    node.args
+                    and isinstance(node.args[0], nodes.Const)
+                    and isinstance(node.args[0].value, str)
+                    and valid_entity_id(f"{node.args[0].value}.entity")
+                ):
+                    self.domains.add(node.args[0].value)
+                else:
+                    self.complete = False
+                for child in node.iter_child_nodes(exclude=("node",)):
+                    self._visit(child)
+                return
+        elif isinstance(node, (nodes.Getattr, nodes.Getitem)):
+            states_path = _states_path(node)
+            if states_path is not None:
+                path, keys = states_path
+                self._visit_states_path(path)
+                for key in keys:
+                    self._visit(key)
+                return
+        elif isinstance(node, nodes.Name):
+            if node.name == "states" or node.name in _DYNAMIC_STATE_FUNCTIONS:
+                self.complete = False
+            elif node.name in _TIME_FUNCTIONS:
+                self.has_time = True
+        elif isinstance(node, nodes.Filter):
+            if node.name in _DYNAMIC_STATE_FUNCTIONS:
+                self.complete = False
+
+        for child in node.iter_child_nodes():
+            self._visit(child)
+
+    def _visit_states_path(self, path: list[Any]) -> None:
+        """Collect the references of states.<domain>.<object_id>..."""
+        first = path[0]
+        if not isinstance(first, str):
+            self.complete = False
+        elif "." in first:
+            self._add_entity_id(first)
+        elif len(path) == 1:
+            if valid_entity_id(f"{first}.entity"):
+                self.domains.add(first)
+            else:
+                self.complete = False
+        elif isinstance(path[1], str):
+            self._add_entity_id(f"{first}.{path[1]}")
+        else:
+            self.complete = False
+
+
+def _states_path(
+    node: nodes.Getattr | nodes.Getitem,
+) -> tuple[list[Any], list[nodes.Node]] | None:
+    """Return the keys of a chain of accesses on states.
+
+    Keys that are not constants are returned as None, the expressions
+    of all item keys are returned as well so they can be visited.
+    """
+    path: list[Any] = []
+    keys: list[nodes.Node] = []
+    while isinstance(node, (nodes.Getattr, nodes.Getitem)):
+        if isinstance(node, nodes.Getattr):
+            path.append(node.attr)
+        else:
+            keys.append(node.arg)
+            path.append(node.arg.value if isinstance(node.arg, nodes.Const) else None)
+        node = node.node
+    if not isinstance(node, nodes.Name) or node.name != "states":
+        return None
+    path.reverse()
+    return path, keys
+
+
 class Template:
     """Class to hold a template and manage caching and rendering."""
 
@@ -298,6 +483,7 @@ class Template:
         "_exc_info",
         "_limited",
         "_strict",
+        "_analysis",
     )
 
     def __init__(self, template, hass=None):
@@ -313,6 +499,7 @@ class Template:
         self._exc_info = None
         self._limited = None
         self._strict = None
+        self._analysis: TemplateAnalysis | None = None
 
     @property
     def _env(self) -> TemplateEnvironment:
@@ -385,10 +572,19 @@ class Template:
         if variables is not None:
             kwargs.update(variables)
 
+        instrumentation = self.hass.instrumentation
+        start = perf_counter()
         try:
             render_result = _render_with_context(self.template, compiled, **kwargs)
         except Exception as err:
             raise TemplateError(err) from err
+        finally:
+            if instrumentation is not None:
+                instrumentation.record_template(
+                    self.template,
+                    perf_counter() - start,
+                    *(render_trigger_cv.get() or ()),
+                )
 
         render_result = render_result.strip()
 
@@ -508,9 +704,21 @@ class Template:
         finally:
             del self.hass.data[_RENDER_INFO]
 
+        if render_info.exception is not None:
+            # Without a result the render did not necessarily reach
+            # all states the template depends on
+            render_info._apply_analysis(self.async_analyze())
+
         render_info._freeze()
         return render_info
 
+    @callback
+    def async_analyze(self) -> TemplateAnalysis:
+        """Find the entities, domains and time references without rendering."""
+        if self._analysis is None:
+            self._analysis = TemplateAnalysis(self._env, self.template)
+        return self._analysis
+
     def render_with_possible_json_value(self, value, error_value=_SENTINEL):
         """Render template with value exposed.
 
@@ -699,6 +907,199 @@ class DomainStates:
         return f"<template DomainStates('{self._domain}')>"
 
 
+class StateAggregate:
+    """The states or an attribute of a domain, aggregated as they change.
+
+    Keeps the number of entities per value, the sum and the extremes of
+    the numeric values, so templates can aggregate a domain without
+    iterating over all of its states on every render.
+
+    The aggregate only listens for state changes while it has listeners
+    of its own, and is removed together with its last listener. Listeners
+    are called after the aggregate was updated for a state change.
+    """
+
+    def __init__(self, hass: HomeAssistant, domain: str, attribute: str | None) -> None:
+        """Initialize the aggregate from the current states."""
+        self.hass = hass
+        self.domain = domain
+        self.attribute = attribute
+        self._prefix = f"{domain}."
+        self._values: dict[str, Any] = {}
+        self._numbers: dict[str, float] = {}
+        self._entity_ids_by_value: dict[Any, set[str]] = {}
+        # An exact sum so values can be removed without rounding errors
+        self._total = Fraction(0)
+        self._min: float | None = None
+        self._max: float | None = None
+        self._extremes_valid = True
+        self._listeners: list[Callable[[Event], None]] = []
+        self._remove_state_listener: Callable[[], None] | None = None
+        for state in hass.states.async_all(domain):
+            self._async_set(state.entity_id, state)
+
+    @callback
+    def async_add_listener(self, update_callback: Callable[[Event], None]) -> Callable:
+        """Listen for changes of the aggregate, returns a function to stop."""
+        if self._remove_state_listener is None:
+            self._async_start()
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+            if not self._listeners:
+                self._async_stop()
+
+        return remove_listener
+
+    @callback
+    def _async_start(self) -> None:
+        """Keep the aggregate up to date and share it while it is listened to."""
+        self.hass.data.setdefault(_STATE_AGGREGATES, {})[
+            (self.domain, self.attribute)
+        ] = self
+        self._remove_state_listener = self.hass.bus.async_listen(
+            EVENT_STATE_CHANGED, self._async_state_changed, self._async_domain_filter
+        )
+
+    @callback
+    def _async_stop(self) -> None:
+        """Stop listening for state changes once the last listener is gone."""
+        assert self._remove_state_listener is not None
+        self._remove_state_listener()
+        self._remove_state_listener = None
+        del self.hass.data[_STATE_AGGREGATES][(self.domain, self.attribute)]
+
+    @callback
+    def _async_domain_filter(self, event: Event) -> bool:
+        """Return if the event changes a state of the domain."""
+        return cast(str, event.data["entity_id"]).startswith(self._prefix)
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Update the aggregate with a changed state."""
+        entity_id = event.data["entity_id"]
+        new_state = event.data.get("new_state")
+        if new_state is None:
+            self._async_remove(entity_id)
+        else:
+            self._async_set(entity_id, new_state)
+        for update_callback in list(self._listeners):
+            # A listener may remove other listeners of the same change
+            if update_callback in self._listeners:
+                update_callback(event)
+
+    def _async_set(self, entity_id: str, state: State) -> None:
+        """Set the value of an entity."""
+        if entity_id in self._values:
+            self._async_remove(entity_id)
+        value = (
+            state.state
+            if self.attribute is None
+            else state.attributes.get(self.attribute)
+        )
+        self._values[entity_id] = value
+        with suppress(TypeError):
+            self._entity_ids_by_value.setdefault(value, set()).add(entity_id)
+        number = _aggregate_number(value)
+        if number is None:
+            return
+        self._numbers[entity_id] = number
+        self._total += Fraction(number)
+        if self._extremes_valid:
+            if self._min is None or number < self._min:
+                self._min = number
+            if self._max is None or number > self._max:
+                self._max = number
+
+    def _async_remove(self, entity_id: str) -> None:
+        """Remove the value of an entity."""
+        if entity_id not in self._values:
+            return
+        value = self._values.pop(entity_id)
+        with suppress(TypeError):
+            entity_ids = self._entity_ids_by_value[value]
+            entity_ids.discard(entity_id)
+            if not entity_ids:
+                del self._entity_ids_by_value[value]
+        number = self._numbers.pop(entity_id, None)
+        if number is None:
+            return
+        self._total -= Fraction(number)
+        if number in (self._min, self._max):
+            # Only look for the new extreme when it is needed
+            self._extremes_valid = False
+
+    def count(self, value: Any = _SENTINEL) -> int:
+        """Return the number of entities, or the number with a value."""
+        if value is _SENTINEL:
+            return len(self._values)
+        try:
+            return len(self._entity_ids_by_value.get(value, ()))
+        except TypeError:
+            return 0
+
+    def sum(self) -> float:
+        """Return the sum of the numeric values."""
+        return float(self._total)
+
+    def _update_extremes(self) -> None:
+        """Find the extremes after one was removed."""
+        if self._extremes_valid:
+            return
+        numbers = self._numbers.values()
+        self._min = min(numbers, default=None)
+        self._max = max(numbers, default=None)
+        self._extremes_valid = True
+
+    def min(self) -> float | None:
+        """Return the smallest numeric value."""
+        self._update_extremes()
+        return self._min
+
+    def max(self) -> float | None:
+        """Return the largest numeric value."""
+        self._update_extremes()
+        return self._max
+
+    def entity_ids(self, value: Any) -> list[str]:
+        """Return the sorted ids of the entities with a value."""
+        try:
+            return sorted(self._entity_ids_by_value.get(value, ()))
+        except TypeError:
+            return []
+
+
+def _aggregate_number(value: Any) -> float | None:
+    """Return a value as a finite float or None."""
+    if isinstance(value, bool):
+        return None
+    try:
+        number = float(value)
+    except (ValueError, TypeError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+@callback
+def async_get_state_aggregate(
+    hass: HomeAssistant, domain: str, attribute: str | None = None
+) -> StateAggregate:
+    """Return the aggregate of the states or an attribute of a domain.
+
+    Returns the shared aggregate while it is listened to. Otherwise a new
+    aggregate is created from the current states, which is only kept up
+    to date once a listener is added to it.
+    """
+    aggregate: StateAggregate | None = hass.data.get(_STATE_AGGREGATES, {}).get(
+        (domain, attribute)
+    )
+    if aggregate is None:
+        aggregate = StateAggregate(hass, domain, attribute)
+    return aggregate
+
+
 class TemplateState(State):
     """Class to represent a state object in a template."""
 
@@ -902,6 +1303,54 @@ def expand(hass: HomeAssistant, *args: Any) -> Iterable[State]:
     return sorted(found.values(), key=lambda a: a.entity_id)
 
 
+def _domain_aggregate(
+    hass: HomeAssistant, domain: str, attribute: str | None
+) -> StateAggregate:
+    """Return the aggregate of a domain and collect the aggregate."""
+    if not isinstance(domain, str) or not valid_entity_id(f"{domain}.entity"):
+        raise TemplateError(f"Invalid domain name '{domain}'")
+    entity_collect = hass.data.get(_RENDER_INFO)
+    if entity_collect is not None:
+        entity_collect.aggregates.add((domain, attribute))
+    return async_get_state_aggregate(hass, domain, attribute)
+
+
+def domain_count(
+    hass: HomeAssistant,
+    domain: str,
+    value: Any = _SENTINEL,
+    attribute: str | None = None,
+) -> int:
+    """Count the entities of a domain, or the ones with a state or attribute value."""
+    return _domain_aggregate(hass, domain, attribute).count(value)
+
+
+def domain_sum(hass: HomeAssistant, domain: str, attribute: str | None = None) -> float:
+    """Sum the numeric states or attribute values of a domain."""
+    return _domain_aggregate(hass, domain, attribute).sum()
+
+
+def domain_min(
+    hass: HomeAssistant, domain: str, attribute: str | None = None
+) -> float | None:
+    """Return the smallest numeric state or attribute value of a domain."""
+    return _domain_aggregate(hass, domain, attribute).min()
+
+
+def domain_max(
+    hass: HomeAssistant, domain: str, attribute: str | None = None
+) -> float | None:
+    """Return the largest numeric state or attribute value of a domain."""
+    return _domain_aggregate(hass, domain, attribute).max()
+
+
+def domain_entities(
+    hass: HomeAssistant, domain: str, value: Any, attribute: str | None = None
+) -> list[str]:
+    """Return the entity ids of a domain with a state or attribute value."""
+    return _domain_aggregate(hass, domain, attribute).entity_ids(value)
+
+
 def device_entities(hass: HomeAssistant, device_id: str) -> Iterable[str]:
     """Get entity ids for entities tied to a device."""
     entity_reg = entity_registry.async_get(hass)
@@ -1408,7 +1857,9 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
             undefined = jinja2.StrictUndefined
         super().__init__(undefined=undefined)
         self.hass = hass
-        self.template_cache = weakref.WeakValueDictionary()
+        # Environments with the same settings compile to the same code,
+        # so they share the entries of the compiled code cache
+        self.compiled_code_key = (hass is None, bool(limited), bool(strict))
         self.filters["round"] = forgiving_round
         self.filters["multiply"] = multiply
         self.filters["log"] = logarithm
@@ -1498,6 +1949,11 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
             hass_globals = [
                 "closest",
                 "distance",
+                "domain_count",
+                "domain_entities",
+                "domain_max",
+                "domain_min",
+                "domain_sum",
                 "expand",
                 "is_state",
                 "is_state_attr",
@@ -1524,6 +1980,11 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
         self.globals["states"] = AllStates(hass)
         self.globals["utcnow"] = hassfunction(utcnow)
         self.globals["now"] = hassfunction(now)
+        self.globals["domain_count"] = hassfunction(domain_count)
+        self.globals["domain_sum"] = hassfunction(domain_sum)
+        self.globals["domain_min"] = hassfunction(domain_min)
+        self.globals["domain_max"] = hassfunction(domain_max)
+        self.globals["domain_entities"] = hassfunction(domain_entities)
 
     def is_safe_callable(self, obj):
         """Test if callback is safe."""
@@ -1552,12 +2013,73 @@ class TemplateEnvironment(ImmutableSandboxedEnvironment):
             # any instance of this.
             return super().compile(source, name, filename, raw, defer_init)
 
-        cached = self.template_cache.get(source)
+        key = (self.compiled_code_key, source)
+        cached = COMPILED_CODE_CACHE.get(key)
 
         if cached is None:
-            cached = self.template_cache[source] = super().compile(source)
+            cached = super().compile(source)
+            COMPILED_CODE_CACHE.set(key, cached)
 
         return cached
 
 
+class CompiledCodeCache:
+    """A bounded cache of compiled templates shared by all environments.
+
+    The same template is often used by many entities and automations
+    and validated again on every reload, so the compiled code is kept
+    for the least recently used max_size templates even after all
+    Template objects of a source are gone.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        """Initialize the cache."""
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._code: OrderedDict[tuple, CodeType] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached templates."""
+        return len(self._code)
+
+    def get(self, key: tuple) -> CodeType | None:
+        """Return the compiled code of a template and count the hit or miss."""
+        with self._lock:
+            code = self._code.get(key)
+            if code is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._code.move_to_end(key)
+            return code
+
+    def set(self, key: tuple, code: CodeType) -> None:
+        """Cache the compiled code of a template."""
+        with self._lock:
+            self._code[key] = code
+            self._code.move_to_end(key)
+            if len(self._code) > self.max_size:
+                self._code.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove all cached templates and reset the counters."""
+        with self._lock:
+            self._code.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def as_dict(self) -> dict[str, int]:
+        """Return the size and hit and miss counters of the cache."""
+        return {
+            "size": len(self._code),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+COMPILED_CODE_CACHE = CompiledCodeCache(COMPILED_CODE_CACHE_SIZE)
+
 _NO_HASS_ENV = TemplateEnvironment(None)  # type: ignore[no-untyped-call]
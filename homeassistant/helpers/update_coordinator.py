@@ -258,8 +258,17 @@ class DataUpdateCoordinator(Generic[T]):
             if not auth_failed and self._listeners and not self.hass.is_stopping:
                 self._schedule_refresh()
 
-        for update_callback in self._listeners:
-            update_callback()
+        self.async_update_listeners()
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update all registered listeners.
+
+        The state changes of the entities are fired together.
+        """
+        with self.hass.states.async_batch():
+            for update_callback in self._listeners:
+                update_callback()
 
     @callback
     def async_set_updated_data(self, data: T) -> None:
@@ -280,8 +289,7 @@ class DataUpdateCoordinator(Generic[T]):
         if self._listeners:
             self._schedule_refresh()
 
-        for update_callback in self._listeners:
-            update_callback()
+        self.async_update_listeners()
 
     @callback
     def _async_stop_refresh(self, _: Event) -> None:
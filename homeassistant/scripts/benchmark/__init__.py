@@ -5,16 +5,19 @@ import argparse
 import asyncio
 import collections
 from contextlib import suppress
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import logging
 from timeit import default_timer as timer
+import tracemalloc
 from typing import Callable, TypeVar
 
 from homeassistant import core
 from homeassistant.components.websocket_api.const import JSON_DUMP
 from homeassistant.const import ATTR_NOW, EVENT_STATE_CHANGED, EVENT_TIME_CHANGED
+from homeassistant.helpers import condition, config_validation as cv, template, trace
 from homeassistant.helpers.entityfilter import convert_include_exclude_filter
+from homeassistant.helpers.event import TrackTemplate, async_track_template_result
 from homeassistant.helpers.json import JSONEncoder
 from homeassistant.util import dt as dt_util
 
@@ -118,6 +121,95 @@ async def fire_events_with_filter(hass):
     return timer() - start
 
 
+@benchmark
+async def fire_events_with_keyed_listeners(hass):
+    """Fire a million events with a thousand keyed listeners for other keys."""
+    count = 0
+    event_name = "benchmark_event"
+    events_to_fire = 10 ** 6
+
+    @core.callback
+    def listener(_):
+        """Handle event."""
+        nonlocal count
+        count += 1
+
+    for idx in range(1000):
+        hass.bus.async_listen_keyed(
+            event_name, "entity_id", [f"light.kitchen_{idx}"], listener
+        )
+
+    event_data = {"entity_id": "light.living_room"}
+    start = timer()
+
+    for _ in range(events_to_fire):
+        hass.bus.async_fire(event_name, event_data)
+
+    await hass.async_block_till_done()
+
+    assert count == 0
+
+    return timer() - start
+
+
+@benchmark
+async def state_machine_memory(hass):
+    """Write 10k entities ten times and report the memory of the states."""
+    entities = 10 ** 4
+
+    tracemalloc.start()
+    start = timer()
+
+    for value in range(10):
+        for idx in range(entities):
+            hass.states.async_set(
+                f"sensor.temperature_{idx}",
+                value,
+                {"friendly_name": "Temperature", "unit_of_measurement": "°C"},
+            )
+
+    runtime = timer() - start
+    await hass.async_block_till_done()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(
+        f"{entities} entities use {current / 1024 ** 2:.1f} MiB, "
+        f"peak {peak / 1024 ** 2:.1f} MiB"
+    )
+    return runtime
+
+
+@benchmark
+async def async_set_unchanged_attributes(hass):
+    """Write a power meter with 15 unchanged attributes 100k times."""
+    entity_id = "sensor.power_meter"
+    attributes = {f"attribute_{idx}": f"value_{idx}" for idx in range(15)}
+    hass.states.async_set(entity_id, 0, attributes)
+
+    start = timer()
+
+    for value in range(1, 10 ** 5):
+        hass.states.async_set(entity_id, value, hass.states.get(entity_id).attributes)
+
+    return timer() - start
+
+
+@benchmark
+async def async_set_equal_attributes(hass):
+    """Write a power meter with 15 equal attributes in new dicts 100k times."""
+    entity_id = "sensor.power_meter"
+    attributes = {f"attribute_{idx}": f"value_{idx}" for idx in range(15)}
+    hass.states.async_set(entity_id, 0, attributes)
+
+    start = timer()
+
+    for value in range(1, 10 ** 5):
+        hass.states.async_set(entity_id, value, dict(attributes))
+
+    return timer() - start
+
+
 @benchmark
 async def time_changed_helper(hass):
     """Run a million events through time changed helper."""
@@ -377,6 +469,153 @@ async def valid_entity_id(hass):
     return timer() - start
 
 
+@benchmark
+async def compile_templates(hass):
+    """Validate 3000 distinct templates again, as a reload does."""
+    template.COMPILED_CODE_CACHE.clear()
+    sources = [
+        f"{{{{ states('sensor.temperature_{idx}') | float * 1.8 + 32 }}}}"
+        for idx in range(3000)
+    ]
+    for source in sources:
+        template.Template(source, hass).ensure_valid()
+
+    start = timer()
+    for source in sources:
+        template.Template(source, hass).ensure_valid()
+    runtime = timer() - start
+    print(template.COMPILED_CODE_CACHE.as_dict())
+    return runtime
+
+
+async def _render_light_count(hass, source):
+    """Track a template through 1000 state changes of 1000 lights."""
+    for idx in range(1000):
+        hass.states.async_set(f"light.light_{idx}", "off")
+    results = []
+
+    @core.callback
+    def _update(event, updates):
+        results.append(updates[-1].result)
+
+    # Without a rate limit so every state change renders the template
+    info = async_track_template_result(
+        hass,
+        [TrackTemplate(template.Template(source, hass), None, timedelta(0))],
+        _update,
+    )
+    await hass.async_block_till_done()
+
+    start = timer()
+    for idx in range(1000):
+        hass.states.async_set(f"light.light_{idx}", "on")
+        await hass.async_block_till_done()
+    runtime = timer() - start
+    info.async_remove()
+    assert results[-1] == 1000
+    return runtime
+
+
+@benchmark
+async def render_domain_aggregate(hass):
+    """Count lights that are on with an aggregate after 1000 state changes."""
+    return await _render_light_count(hass, "{{ domain_count('light', 'on') }}")
+
+
+@benchmark
+async def render_domain_states(hass):
+    """Count lights that are on by iteration for comparison."""
+    return await _render_light_count(
+        hass, "{{ states.light | selectattr('state', 'eq', 'on') | list | count }}"
+    )
+
+
+async def _automation_conditions(hass):
+    """Create the conditions of 50 automations that check their own room."""
+    checks = []
+    for idx in range(50):
+        hass.states.async_set(f"binary_sensor.motion_{idx}", "on")
+        hass.states.async_set(f"sensor.temperature_{idx}", "21.5")
+        hass.states.async_set(f"light.room_{idx}", "off")
+        config = cv.CONDITION_SCHEMA(
+            {
+                "condition": "and",
+                "conditions": [
+                    {
+                        "condition": "state",
+                        "entity_id": f"binary_sensor.motion_{idx}",
+                        "state": "on",
+                    },
+                    {
+                        "condition": "numeric_state",
+                        "entity_id": f"sensor.temperature_{idx}",
+                        "above": 15,
+                        "below": 25,
+                    },
+                    {
+                        "condition": "template",
+                        "value_template": f"{{{{ is_state('light.room_{idx}', 'off') }}}}",
+                    },
+                    {
+                        "condition": "or",
+                        "conditions": [
+                            {
+                                "condition": "state",
+                                "entity_id": f"light.room_{idx}",
+                                "state": ["off", "unavailable"],
+                            },
+                            {"condition": "time", "after": "00:00:00"},
+                        ],
+                    },
+                    {
+                        "condition": "not",
+                        "conditions": [
+                            {
+                                "condition": "state",
+                                "entity_id": f"light.room_{idx}",
+                                "state": "on",
+                            }
+                        ],
+                    },
+                ],
+            }
+        )
+        checks.append(await condition.async_from_config(hass, config, False))
+    return checks
+
+
+@benchmark
+async def evaluate_conditions(hass):
+    """Evaluate the conditions of 50 automations 200 times without a trace."""
+    checks = await _automation_conditions(hass)
+    variables = {"trigger": {"platform": "state"}}
+    trace.trace_cv.set(None)
+
+    start = timer()
+    for _ in range(200):
+        for check in checks:
+            check(hass, variables)
+    runtime = timer() - start
+    print(f"{len(checks) * 200 / runtime:.0f} evaluations/s")
+    return runtime
+
+
+@benchmark
+async def evaluate_traced_conditions(hass):
+    """Evaluate the conditions of 50 automations 200 times with a trace."""
+    checks = await _automation_conditions(hass)
+    variables = {"trigger": {"platform": "state"}}
+
+    start = timer()
+    for _ in range(200):
+        for check in checks:
+            trace.trace_clear()
+            check(hass, variables)
+    runtime = timer() - start
+    print(f"{len(checks) * 200 / runtime:.0f} evaluations/s")
+    return runtime
+
+
 @benchmark
 async def json_serialize_states(hass):
     """Serialize million states with websocket default encoder."""
@@ -390,6 +629,42 @@ async def json_serialize_states(hass):
     return timer() - start
 
 
+@benchmark
+async def json_serialize_states_stdlib(hass):
+    """Serialize million states with the stdlib JSONEncoder for comparison."""
+    states = [
+        core.State("light.kitchen", "on", {"friendly_name": "Kitchen Lights"})
+        for _ in range(10 ** 6)
+    ]
+
+    start = timer()
+    json.dumps(states, cls=JSONEncoder, allow_nan=False)
+    return timer() - start
+
+
+@benchmark
+async def json_serialize_state_changed_events(hass):
+    """Serialize 100k state changed events with websocket default encoder."""
+    old_state = core.State("light.kitchen", "off", {"friendly_name": "Kitchen"})
+    new_state = core.State("light.kitchen", "on", {"friendly_name": "Kitchen"})
+    events = [
+        core.Event(
+            EVENT_STATE_CHANGED,
+            {
+                "entity_id": "light.kitchen",
+                "old_state": old_state,
+                "new_state": new_state,
+            },
+        )
+        for _ in range(10 ** 5)
+    ]
+
+    start = timer()
+    for event in events:
+        JSON_DUMP(event)
+    return timer() - start
+
+
 def _create_state_changed_event_from_old_new(
     entity_id, event_time_fired, old_state, new_state
 ):
@@ -1,14 +1,17 @@
 """Executor util helpers."""
 from __future__ import annotations
 
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
 import contextlib
 import logging
+import multiprocessing
+import os
 import queue
 import sys
-from threading import Thread
+from threading import Lock, Thread
 import time
 import traceback
+from typing import Any, Callable
 
 from homeassistant.util.thread import async_raise
 
@@ -20,6 +23,21 @@ _JOIN_ATTEMPTS = 10
 
 EXECUTOR_SHUTDOWN_TIMEOUT = 10
 
+# Short, latency sensitive jobs like camera images, history queries
+# and loading the configuration, so they do not wait behind slow
+# blocking jobs in the default executor
+POOL_INTERACTIVE = "interactive"
+# CPU bound jobs that run in separate processes so they do not hold
+# the GIL, their targets and arguments must be picklable
+POOL_CPU = "cpu"
+
+# The default number of workers of each pool, ExecutorPools can override them
+POOL_MAX_WORKERS = {
+    POOL_INTERACTIVE: min(32, (os.cpu_count() or 1) + 4),
+    POOL_CPU: max((os.cpu_count() or 1) - 1, 1),
+}
+PROCESS_POOLS = {POOL_CPU}
+
 
 def _log_thread_running_at_shutdown(name: str, ident: int) -> None:
     """Log the stack of a thread that was still running at shutdown."""
@@ -111,3 +129,110 @@ class InterruptibleThreadPoolExecutor(ThreadPoolExecutor):
             )
             if timeout_remaining <= 0:
                 return
+
+
+class ExecutorPool(Executor):
+    """A named executor that keeps track of its pending jobs.
+
+    The threads or processes are only created when the first job is
+    submitted.
+    """
+
+    def __init__(self, name: str, max_workers: int, processes: bool) -> None:
+        """Initialize the pool."""
+        self.name = name
+        self.max_workers = max_workers
+        self.processes = processes
+        self._executor: Executor | None = None
+        self._lock = Lock()
+        self._pending = 0
+        self._submitted = 0
+
+    def _get_executor(self) -> Executor:
+        """Return the executor of the pool, create it on first use."""
+        with self._lock:
+            if self._executor is None:
+                if self.processes:
+                    self._executor = ProcessPoolExecutor(
+                        self.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = InterruptibleThreadPoolExecutor(
+                        thread_name_prefix=f"SyncWorker{self.name.title()}",
+                        max_workers=self.max_workers,
+                    )
+            return self._executor
+
+    def submit(  # type: ignore[override]
+        self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any
+    ) -> Future:
+        """Submit a job to the pool."""
+        future = self._get_executor().submit(fn, *args, **kwargs)
+        with self._lock:
+            self._pending += 1
+            self._submitted += 1
+        future.add_done_callback(self._job_done)
+        return future
+
+    def _job_done(self, _: Future) -> None:
+        """Count a job as done."""
+        with self._lock:
+            self._pending -= 1
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        """Shut down the pool."""
+        if self._executor is None:
+            return
+        if isinstance(self._executor, InterruptibleThreadPoolExecutor):
+            self._executor.logged_shutdown()
+        else:
+            self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def stats(self) -> dict[str, Any]:
+        """Return the utilization and queue depth of the pool."""
+        pending = self._pending
+        running = min(pending, self.max_workers)
+        return {
+            "max_workers": self.max_workers,
+            "processes": self.processes,
+            "running": running,
+            "queued": pending - running,
+            "utilization": running / self.max_workers,
+            "submitted": self._submitted,
+        }
+
+
+class ExecutorPools:
+    """The named executor pools, created when they are first used.
+
+    max_workers overrides the number of workers of POOL_MAX_WORKERS for
+    some of the pools.
+    """
+
+    def __init__(self, max_workers: dict[str, int] | None = None) -> None:
+        """Initialize the pools."""
+        self._max_workers = {**POOL_MAX_WORKERS, **(max_workers or {})}
+        self._pools: dict[str, ExecutorPool] = {}
+        self._shutdown = False
+
+    def get(self, name: str) -> ExecutorPool:
+        """Return a pool, raises KeyError for an unknown pool."""
+        pool = self._pools.get(name)
+        if pool is None:
+            if self._shutdown:
+                raise RuntimeError("Cannot add jobs to executor pools after shutdown")
+            pool = self._pools[name] = ExecutorPool(
+                name, self._max_workers[name], name in PROCESS_POOLS
+            )
+        return pool
+
+    def shutdown(self) -> None:
+        """Shut down all pools."""
+        self._shutdown = True
+        for pool in self._pools.values():
+            pool.shutdown(cancel_futures=True)
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        """Return the stats of the pools that were used."""
+        return {name: pool.stats() for name, pool in self._pools.items()}
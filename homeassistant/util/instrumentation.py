@@ -0,0 +1,345 @@
+"""Histograms of event loop lag and job execution times."""
+from __future__ import annotations
+
+import asyncio
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Coroutine
+import functools
+import threading
+from time import perf_counter
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+# The upper bounds of the histogram buckets in seconds,
+# values above the last bound are counted in an extra bucket
+BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# How often the event loop lag is measured in seconds
+LOOP_LAG_INTERVAL = 0.25
+
+JOB_TYPE_CALLBACK = "callback"
+JOB_TYPE_COROUTINE = "coroutine"
+JOB_TYPE_EXECUTOR = "executor"
+
+# The trigger of renders that are not done by a template tracker
+TRIGGER_RENDER = "render"
+
+
+class Histogram:
+    """Count values in the buckets of BUCKETS."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        """Initialize the histogram."""
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float) -> None:
+        """Add a value."""
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> float | None:
+        """Return the upper bound of the bucket of a percentile.
+
+        The maximum is returned when the percentile is in the
+        bucket above the last bound.
+        """
+        if not self.count:
+            return None
+        rank = self.count * percent / 100
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram as a dict."""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "mean": self.total / self.count if self.count else None,
+            "p95": self.percentile(95),
+            "buckets": list(zip((*BUCKETS, None), self.counts)),
+        }
+
+
+class JobStats:
+    """The execution and executor queue wait times of one job target."""
+
+    __slots__ = ("job_type", "run", "wait")
+
+    def __init__(self, job_type: str) -> None:
+        """Initialize the stats."""
+        self.job_type = job_type
+        self.run = Histogram()
+        self.wait = Histogram() if job_type == JOB_TYPE_EXECUTOR else None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stats as a dict."""
+        return {
+            "job_type": self.job_type,
+            "run": self.run.as_dict(),
+            "wait": self.wait.as_dict() if self.wait is not None else None,
+        }
+
+
+class TemplateStats:
+    """The render times of one template and why it was rendered."""
+
+    __slots__ = ("render", "owners", "triggers")
+
+    def __init__(self) -> None:
+        """Initialize the stats."""
+        self.render = Histogram()
+        self.owners: set[str] = set()
+        self.triggers: Counter[str] = Counter()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the stats as a dict."""
+        return {
+            "render": self.render.as_dict(),
+            "p99": self.render.percentile(99),
+            "owners": sorted(self.owners),
+            "triggers": dict(self.triggers.most_common()),
+        }
+
+
+class Instrumentation:
+    """Record the event loop lag and how long jobs run.
+
+    Callbacks are timed while they run. Coroutines are timed for each
+    step between two awaits, which is the time they block the event
+    loop. Executor jobs are timed while they run in a worker thread and
+    for how long they waited in the queue of the executor. Templates
+    are timed while they render, which is always in the event loop.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the instrumentation."""
+        self.loop_lag = Histogram()
+        self.jobs: dict[str, JobStats] = {}
+        self.templates: dict[str, TemplateStats] = {}
+        # Executor jobs are recorded from the worker threads
+        self._lock = threading.Lock()
+        self._lag_handle: asyncio.TimerHandle | None = None
+
+    def record(
+        self,
+        target: Callable[..., Any],
+        job_type: str,
+        run_time: float,
+        wait_time: float | None = None,
+    ) -> None:
+        """Record a run of a job target."""
+        name = job_name(target)
+        with self._lock:
+            stats = self.jobs.get(name)
+            if stats is None:
+                stats = self.jobs[name] = JobStats(job_type)
+            stats.run.add(run_time)
+            if wait_time is not None and stats.wait is not None:
+                stats.wait.add(wait_time)
+
+    def record_template(
+        self,
+        template: str,
+        run_time: float,
+        owner: str | None = None,
+        trigger: str = TRIGGER_RENDER,
+    ) -> None:
+        """Record a render of a template."""
+        stats = self.templates.get(template)
+        if stats is None:
+            stats = self.templates[template] = TemplateStats()
+        stats.render.add(run_time)
+        if owner is not None:
+            stats.owners.add(owner)
+        stats.triggers[trigger] += 1
+
+    def run_callback(self, target: Callable[..., T], *args: Any) -> T:
+        """Run and time a callback."""
+        start = perf_counter()
+        try:
+            return target(*args)
+        finally:
+            self.record(target, JOB_TYPE_CALLBACK, perf_counter() - start)
+
+    def wrap_coroutine(
+        self, target: Callable[..., Any], coro: Coroutine[Any, Any, T]
+    ) -> Coroutine[Any, Any, T]:
+        """Wrap a coroutine to time the steps it runs in the event loop."""
+        return TimedCoroutine(self, target, coro)
+
+    def wrap_executor_job(self, target: Callable[..., T]) -> Callable[..., T]:
+        """Wrap an executor job to time its queue wait and run time."""
+        submitted = perf_counter()
+
+        @functools.wraps(target)
+        def _timed_job(*args: Any) -> T:
+            start = perf_counter()
+            try:
+                return target(*args)
+            finally:
+                end = perf_counter()
+                self.record(target, JOB_TYPE_EXECUTOR, end - start, start - submitted)
+
+        return _timed_job
+
+    def async_start(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Start measuring the event loop lag."""
+        self._async_schedule_lag_check(loop)
+
+    def async_stop(self) -> None:
+        """Stop measuring the event loop lag."""
+        if self._lag_handle is not None:
+            self._lag_handle.cancel()
+            self._lag_handle = None
+
+    def _async_schedule_lag_check(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Schedule the next event loop lag measurement."""
+        expected = loop.time() + LOOP_LAG_INTERVAL
+        self._lag_handle = loop.call_at(expected, self._async_check_lag, loop, expected)
+
+    def _async_check_lag(
+        self, loop: asyncio.AbstractEventLoop, expected: float
+    ) -> None:
+        """Record how late the lag check ran and schedule the next one."""
+        self.loop_lag.add(max(loop.time() - expected, 0.0))
+        self._async_schedule_lag_check(loop)
+
+    def slowest_jobs(self, limit: int) -> list[tuple[str, JobStats]]:
+        """Return the jobs that ran the longest in total."""
+        with self._lock:
+            jobs = list(self.jobs.items())
+        jobs.sort(key=lambda item: item[1].run.total, reverse=True)
+        return jobs[:limit]
+
+    def slowest_templates(self, limit: int) -> list[tuple[str, TemplateStats]]:
+        """Return the templates that rendered the longest in total."""
+        templates = sorted(
+            self.templates.items(),
+            key=lambda item: item[1].render.total,
+            reverse=True,
+        )
+        return templates[:limit]
+
+    def templates_as_list(self, limit: int | None = None) -> list[dict[str, Any]]:
+        """Return the slowest templates with their share of the render time.
+
+        The cumulative share shows how many templates account for
+        most of the time spent rendering.
+        """
+        total = sum(stats.render.total for stats in self.templates.values())
+        cumulative = 0.0
+        result = []
+        for template, stats in self.slowest_templates(
+            len(self.templates) if limit is None else limit
+        ):
+            cumulative += stats.render.total
+            result.append(
+                {
+                    "template": template,
+                    **stats.as_dict(),
+                    "share": stats.render.total / total if total else 0.0,
+                    "cumulative_share": cumulative / total if total else 0.0,
+                }
+            )
+        return result
+
+    def as_dict(self, limit: int | None = None) -> dict[str, Any]:
+        """Return the recorded histograms as a dict."""
+        return {
+            "loop_lag": self.loop_lag.as_dict(),
+            "jobs": {
+                name: stats.as_dict()
+                for name, stats in self.slowest_jobs(
+                    len(self.jobs) if limit is None else limit
+                )
+            },
+        }
+
+
+class TimedCoroutine(Coroutine):
+    """A coroutine that records the time of each step of another coroutine."""
+
+    __slots__ = ("_instrumentation", "_target", "_coro")
+
+    def __init__(
+        self,
+        instrumentation: Instrumentation,
+        target: Callable[..., Any],
+        coro: Coroutine,
+    ) -> None:
+        """Initialize the timed coroutine."""
+        self._instrumentation = instrumentation
+        self._target = target
+        self._coro = coro
+
+    def send(self, value: Any) -> Any:
+        """Run the next step of the coroutine."""
+        start = perf_counter()
+        try:
+            return self._coro.send(value)
+        finally:
+            self._instrumentation.record(
+                self._target, JOB_TYPE_COROUTINE, perf_counter() - start
+            )
+
+    def throw(self, typ: Any, val: Any = None, tb: Any = None) -> Any:
+        """Raise an exception in the coroutine."""
+        start = perf_counter()
+        try:
+            if val is None and tb is None:
+                return self._coro.throw(typ)
+            return self._coro.throw(typ, val, tb)
+        finally:
+            self._instrumentation.record(
+                self._target, JOB_TYPE_COROUTINE, perf_counter() - start
+            )
+
+    def close(self) -> None:
+        """Close the coroutine."""
+        self._coro.close()
+
+    def __await__(self) -> Any:
+        """Return an iterator to await the coroutine."""
+        return self._coro.__await__()
+
+    def __repr__(self) -> str:
+        """Return the representation of the wrapped coroutine."""
+        return repr(self._coro)
+
+
+def job_name(target: Callable[..., Any]) -> str:
+    """Return the name that jobs of a target are recorded as."""
+    while isinstance(target, functools.partial):
+        target = target.func
+    module = getattr(target, "__module__", None)
+    name = getattr(target, "__qualname__", None) or repr(target)
+    return f"{module}.{name}" if module else name
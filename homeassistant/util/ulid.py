@@ -0,0 +1,17 @@
+"""Helpers to generate time ordered ids."""
+
+from random import getrandbits
+from time import time_ns
+
+
+def ulid_hex() -> str:
+    """Generate a ULID as a 32 character hex string.
+
+    The first 48 bits are the milliseconds since the epoch and the
+    remaining 80 bits are random, so ids generated later sort after
+    earlier ones, which keeps database indexes on them compact.
+
+    This id should not be used for cryptographically secure
+    operations.
+    """
+    return "%032x" % ((time_ns() // 1000000) << 80 | getrandbits(80))
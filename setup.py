@@ -46,6 +46,7 @@ REQUIRES = [
     "PyJWT==1.7.1",
     # PyJWT has loose dependency. We want the latest one.
     "cryptography==3.3.2",
+    "orjson==3.8.3",
     "pip>=8.0.3,<20.3",
     "python-slugify==4.0.1",
     "pyyaml==5.4.1",
@@ -115,7 +115,7 @@ async def test_chain_history(hass, values, missing=False):
         "homeassistant.components.recorder.history.state_changes_during_period",
         return_value=fake_states,
     ), patch(
-        "homeassistant.components.recorder.history.get_last_state_changes",
+        "homeassistant.components.recorder.history.get_last_state_changes_for_entities",
         return_value=fake_states,
     ):
         with assert_setup_component(1, "sensor"):
@@ -203,6 +203,48 @@ async def test_chain_history_missing(hass, values):
     await test_chain_history(hass, values, missing=True)
 
 
+async def test_history_loaded_with_one_query(hass):
+    """Test the history of all filter sensors is loaded with one query."""
+    config = {
+        "sensor": [
+            {
+                "platform": "filter",
+                "name": name,
+                "entity_id": f"sensor.{name}_monitored",
+                "filters": [{"filter": "throttle", "window_size": window_size}],
+            }
+            for name, window_size in (("test1", 1), ("test2", 3))
+        ]
+    }
+    await async_init_recorder_component(hass)
+
+    t_0 = dt_util.utcnow() - timedelta(minutes=1)
+    t_1 = dt_util.utcnow() - timedelta(minutes=2)
+    fake_states = {
+        "sensor.test1_monitored": [
+            ha.State("sensor.test1_monitored", 18.0, last_changed=t_1),
+            ha.State("sensor.test1_monitored", 19.0, last_changed=t_0),
+        ],
+        "sensor.test2_monitored": [
+            ha.State("sensor.test2_monitored", 20.0, last_changed=t_0),
+        ],
+    }
+    with patch(
+        "homeassistant.components.recorder.history.get_last_state_changes_for_entities",
+        return_value=fake_states,
+    ) as get_last_state_changes:
+        with assert_setup_component(2, "sensor"):
+            assert await async_setup_component(hass, "sensor", config)
+            await hass.async_block_till_done()
+
+    assert len(get_last_state_changes.mock_calls) == 1
+    _, number_of_states, entity_ids = get_last_state_changes.mock_calls[0][1]
+    assert number_of_states == 3
+    assert sorted(entity_ids) == ["sensor.test1_monitored", "sensor.test2_monitored"]
+    assert hass.states.get("sensor.test1").state == "19.0"
+    assert hass.states.get("sensor.test2").state == "20.0"
+
+
 async def test_history_time(hass):
     """Test loading from history based on a time window."""
     config = {
@@ -230,7 +272,7 @@ async def test_history_time(hass):
         "homeassistant.components.recorder.history.state_changes_during_period",
         return_value=fake_states,
     ), patch(
-        "homeassistant.components.recorder.history.get_last_state_changes",
+        "homeassistant.components.recorder.history.get_last_state_changes_for_entities",
         return_value=fake_states,
     ):
         with assert_setup_component(1, "sensor"):
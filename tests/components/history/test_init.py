@@ -6,7 +6,7 @@ from unittest.mock import patch, sentinel
 
 import pytest
 
-from homeassistant.components import history, recorder
+from homeassistant.components import history, recorder, websocket_api
 from homeassistant.components.recorder.history import get_significant_states
 from homeassistant.components.recorder.models import process_timestamp
 import homeassistant.core as ha
@@ -73,6 +73,55 @@ def test_get_significant_states_minimal_response(hass_history):
     assert states == hist
 
 
+def test_get_significant_states_compact_response(hass_history):
+    """Test that significant states can be returned as parallel lists.
+
+    Attributes are only included when they differ from the previous
+    state of the entity.
+    """
+    hass = hass_history
+    zero, four, states = record_states(hass)
+    hist = get_significant_states(
+        hass, zero, four, filters=history.Filters(), compact_response=True
+    )
+
+    expected = {}
+    for entity_id, entity_states in states.items():
+        compact = expected[entity_id] = {"s": [], "lu": [], "a": []}
+        prev_attributes = None
+        for state in entity_states:
+            compact["s"].append(state.state)
+            compact["lu"].append(state.last_updated.timestamp())
+            attributes = dict(state.attributes)
+            compact["a"].append(attributes if attributes != prev_attributes else None)
+            prev_attributes = attributes
+
+    assert hist == expected
+
+
+def test_get_significant_states_compact_minimal_response(hass_history):
+    """Test compact responses only have the first attributes when minimal."""
+    hass = hass_history
+    zero, four, states = record_states(hass)
+    hist = get_significant_states(
+        hass,
+        zero,
+        four,
+        filters=history.Filters(),
+        minimal_response=True,
+        compact_response=True,
+    )
+
+    media_player = hist["media_player.test"]
+    assert media_player["s"] == [state.state for state in states["media_player.test"]]
+    assert media_player["a"][0] == dict(states["media_player.test"][0].attributes)
+    assert media_player["a"][1:] == [None] * (len(media_player["a"]) - 1)
+    # Thermostats need their attributes to draw their graphs
+    assert hist["thermostat.test"]["a"][1] == dict(
+        states["thermostat.test"][1].attributes
+    )
+
+
 def test_get_significant_states_with_initial(hass_history):
     """Test that only significant states are returned.
 
@@ -611,6 +660,26 @@ async def test_fetch_period_api_with_minimal_response(hass, hass_client):
     assert response.status == 200
 
 
+async def test_fetch_period_api_with_compact_response(hass, hass_client):
+    """Test the fetch period view for history with compact_response."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    hass.states.async_set("light.kitchen", "on", {"brightness": 255})
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    client = await hass_client()
+    response = await client.get(
+        f"/api/history/period/{(dt_util.utcnow() - timedelta(hours=1)).isoformat()}"
+        "?compact_response"
+    )
+    assert response.status == 200
+    response_json = await response.json()
+    assert response_json["light.kitchen"]["s"] == ["on"]
+    assert response_json["light.kitchen"]["a"] == [{"brightness": 255}]
+
+
 async def test_fetch_period_api_with_no_timestamp(hass, hass_client):
     """Test the fetch period view for history with no timestamp."""
     await hass.async_add_executor_job(init_recorder_component, hass)
@@ -943,3 +1012,119 @@ async def test_statistics_during_period_bad_end_time(hass, hass_ws_client):
     response = await client.receive_json()
     assert not response["success"]
     assert response["error"]["code"] == "invalid_end_time"
+
+
+async def test_stream_history(hass, hass_ws_client):
+    """Test streaming history followed by live state changes."""
+    now = dt_util.utcnow()
+
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    hass.states.async_set("light.kitchen", "on", {"brightness": 255})
+    hass.states.async_set("light.hallway", "on", {})
+    await hass.async_block_till_done()
+    hass.states.async_set("light.kitchen", "off", {})
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_ws_client()
+    with patch(
+        "homeassistant.components.recorder.history.STREAM_CHUNK_SIZE", 1
+    ), patch.object(
+        websocket_api.ActiveConnection,
+        "async_wait_sent",
+        autospec=True,
+        side_effect=websocket_api.ActiveConnection.async_wait_sent,
+    ) as wait_sent:
+        await client.send_json(
+            {
+                "id": 1,
+                "type": "history/stream",
+                "start_time": now.isoformat(),
+                "entity_ids": ["light.kitchen"],
+            }
+        )
+        response = await client.receive_json()
+        assert response["success"]
+
+        response = await client.receive_json()
+        assert response["event"]["states"]["light.kitchen"]["s"] == ["on"]
+        assert response["event"]["states"]["light.kitchen"]["a"] == [
+            {"brightness": 255}
+        ]
+        response = await client.receive_json()
+        assert response["event"]["states"]["light.kitchen"]["s"] == ["off"]
+        assert response["event"]["states"]["light.kitchen"]["a"] == [{}]
+        response = await client.receive_json()
+        assert response["event"] == {"end_of_history": True}
+        # The next chunk is only read once the client received the last one
+        assert wait_sent.call_count == 2
+
+    # The current state was part of the history and is not sent again
+    hass.states.async_set("light.hallway", "off", {})
+    hass.states.async_set("light.kitchen", "on", {})
+    await hass.async_block_till_done()
+    response = await client.receive_json()
+    assert response["id"] == 1
+    assert response["event"]["states"] == {
+        "light.kitchen": {
+            "s": ["on"],
+            "lu": [hass.states.get("light.kitchen").last_updated.timestamp()],
+            "a": [None],
+        }
+    }
+
+    await client.send_json({"id": 2, "type": "unsubscribe_events", "subscription": 1})
+    response = await client.receive_json()
+    assert response["success"]
+
+
+async def test_stream_history_with_end_time(hass, hass_ws_client):
+    """Test streaming a period in the past ends after the history."""
+    now = dt_util.utcnow()
+
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+    hass.states.async_set("light.kitchen", "on", {})
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(trigger_db_commit, hass)
+    await hass.async_block_till_done()
+    await hass.async_add_executor_job(hass.data[recorder.DATA_INSTANCE].block_till_done)
+
+    client = await hass_ws_client()
+    await client.send_json(
+        {
+            "id": 1,
+            "type": "history/stream",
+            "start_time": now.isoformat(),
+            "end_time": dt_util.utcnow().isoformat(),
+        }
+    )
+    response = await client.receive_json()
+    assert response["success"]
+    response = await client.receive_json()
+    assert response["event"]["states"]["light.kitchen"]["s"] == ["on"]
+    response = await client.receive_json()
+    assert response["event"] == {"end_of_history": True}
+
+    hass.states.async_set("light.kitchen", "off", {})
+    await hass.async_block_till_done()
+    await client.send_json({"id": 2, "type": "ping"})
+    response = await client.receive_json()
+    assert response == {"id": 2, "type": "pong"}
+
+
+async def test_stream_history_bad_start_time(hass, hass_ws_client):
+    """Test streaming history with an invalid start time."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    await async_setup_component(hass, "history", {})
+
+    client = await hass_ws_client()
+    await client.send_json({"id": 1, "type": "history/stream", "start_time": "cats"})
+    response = await client.receive_json()
+    assert not response["success"]
+    assert response["error"]["code"] == "invalid_start_time"
@@ -11,7 +11,12 @@ import voluptuous as vol
 from homeassistant.components import logbook, recorder
 from homeassistant.components.alexa.smart_home import EVENT_ALEXA_SMART_HOME
 from homeassistant.components.automation import EVENT_AUTOMATION_TRIGGERED
-from homeassistant.components.recorder.models import process_timestamp_to_utc_isoformat
+from homeassistant.components.recorder.models import (
+    Events,
+    States,
+    process_timestamp_to_utc_isoformat,
+)
+from homeassistant.components.recorder.util import session_scope
 from homeassistant.components.script import EVENT_SCRIPT_STARTED
 from homeassistant.const import (
     ATTR_DOMAIN,
@@ -645,6 +650,54 @@ async def test_logbook_entity_filter_with_automations(hass, hass_client):
     assert json_dict[0]["entity_id"] == entity_id_second
 
 
+async def test_get_events_with_legacy_attributes(hass):
+    """Test logbook events for states recorded with inline attributes."""
+    await hass.async_add_executor_job(init_recorder_component, hass)
+    now = dt_util.utcnow()
+
+    def _add_legacy_states_and_get_events():
+        with session_scope(hass=hass) as session:
+            for entity_id, attributes in (
+                ("switch.test", '{"icon": "mdi:test"}'),
+                ("sensor.bla", '{"unit_of_measurement": "foo"}'),
+            ):
+                old_state_id = None
+                for state in (STATE_OFF, STATE_ON):
+                    event = Events(
+                        event_type=EVENT_STATE_CHANGED,
+                        event_data="{}",
+                        origin="LOCAL",
+                        time_fired=now,
+                    )
+                    session.add(event)
+                    session.flush()
+                    db_state = States(
+                        entity_id=entity_id,
+                        domain=ha.split_entity_id(entity_id)[0],
+                        state=state,
+                        attributes=attributes,
+                        last_changed=now,
+                        last_updated=now,
+                        event_id=event.event_id,
+                        old_state_id=old_state_id,
+                    )
+                    session.add(db_state)
+                    session.flush()
+                    old_state_id = db_state.state_id
+
+        return list(
+            logbook._get_events(
+                hass, now - timedelta(hours=1), now + timedelta(hours=1)
+            )
+        )
+
+    events = await hass.async_add_executor_job(_add_legacy_states_and_get_events)
+    assert len(events) == 1
+    assert events[0]["entity_id"] == "switch.test"
+    assert events[0]["state"] == STATE_ON
+    assert events[0]["icon"] == "mdi:test"
+
+
 async def test_filter_continuous_sensor_values(hass, hass_client):
     """Test remove continuous sensor events from logbook."""
     await hass.async_add_executor_job(init_recorder_component, hass)
@@ -11,12 +11,16 @@ from homeassistant.components.profiler import (
     SERVICE_LOG_THREAD_FRAMES,
     SERVICE_MEMORY,
     SERVICE_START,
+    SERVICE_START_INSTRUMENTATION,
     SERVICE_START_LOG_OBJECTS,
+    SERVICE_STOP_INSTRUMENTATION,
     SERVICE_STOP_LOG_OBJECTS,
 )
 from homeassistant.components.profiler.const import DOMAIN
-from homeassistant.const import CONF_SCAN_INTERVAL, CONF_TYPE
+from homeassistant.const import CONF_SCAN_INTERVAL, CONF_TYPE, STATE_UNAVAILABLE
+from homeassistant.helpers.entity_component import async_update_entity
 import homeassistant.util.dt as dt_util
+from homeassistant.util.executor import POOL_INTERACTIVE, POOL_MAX_WORKERS
 
 from tests.common import MockConfigEntry, async_fire_time_changed
 
@@ -192,3 +196,112 @@ async def test_log_scheduled(hass, caplog):
 
     assert await hass.config_entries.async_unload(entry.entry_id)
     await hass.async_block_till_done()
+
+
+async def test_instrumentation(hass, hass_ws_client):
+    """Test we can record the event loop lag and job execution times."""
+
+    await setup.async_setup_component(hass, "persistent_notification", {})
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    client = await hass_ws_client(hass)
+    await client.send_json({"id": 1, "type": "profiler/instrumentation"})
+    msg = await client.receive_json()
+    assert msg["success"]
+    assert msg["result"] == {"running": False}
+
+    await async_update_entity(hass, "sensor.profiler_event_loop_lag")
+    assert hass.states.get("sensor.profiler_event_loop_lag").state == (
+        STATE_UNAVAILABLE
+    )
+
+    await hass.services.async_call(DOMAIN, SERVICE_START_INSTRUMENTATION, {})
+    await hass.async_block_till_done()
+    assert hass.instrumentation is not None
+
+    def _slow_listener(event):
+        """Listen in the executor."""
+
+    hass.bus.async_listen("test_event", _slow_listener)
+    hass.bus.async_fire("test_event")
+    await hass.async_block_till_done()
+    hass.instrumentation.loop_lag.add(0.02)
+
+    await client.send_json({"id": 2, "type": "profiler/instrumentation", "limit": 50})
+    msg = await client.receive_json()
+    assert msg["success"]
+    result = msg["result"]
+    assert result["running"]
+    assert result["loop_lag"]["count"] == 1
+    job = result["jobs"][
+        "tests.components.profiler.test_init.test_instrumentation.<locals>._slow_listener"
+    ]
+    assert job["job_type"] == "executor"
+    assert job["run"]["count"] == 1
+    assert job["wait"]["count"] == 1
+
+    await async_update_entity(hass, "sensor.profiler_event_loop_lag")
+    state = hass.states.get("sensor.profiler_event_loop_lag")
+    assert state.state == "20.0"
+    assert state.attributes["samples"] == 1
+
+    hass.instrumentation.record_template("{{ 1 }}", 0.004, "sensor.a", "sensor.b")
+    await client.send_json({"id": 3, "type": "profiler/templates"})
+    msg = await client.receive_json()
+    assert msg["success"]
+    assert msg["result"]["running"]
+    template = msg["result"]["templates"][0]
+    assert template["template"] == "{{ 1 }}"
+    assert template["owners"] == ["sensor.a"]
+    assert template["triggers"] == {"sensor.b": 1}
+
+    await async_update_entity(hass, "sensor.profiler_template_render_time")
+    state = hass.states.get("sensor.profiler_template_render_time")
+    assert float(state.state) >= 4.0
+    assert state.attributes["slowest_templates"][0]["template"] == "{{ 1 }}"
+
+    await hass.services.async_call(DOMAIN, SERVICE_STOP_INSTRUMENTATION, {})
+    await hass.async_block_till_done()
+    assert hass.instrumentation is None
+
+    await client.send_json({"id": 4, "type": "profiler/templates"})
+    msg = await client.receive_json()
+    assert msg["result"] == {"running": False}
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
+
+
+async def test_executor_pools(hass, hass_ws_client):
+    """Test we can get the stats of the executor pools."""
+
+    await setup.async_setup_component(hass, "persistent_notification", {})
+    entry = MockConfigEntry(domain=DOMAIN)
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert await hass.async_add_pool_executor_job(POOL_INTERACTIVE, sum, [1, 2]) == 3
+
+    client = await hass_ws_client(hass)
+    await client.send_json({"id": 1, "type": "profiler/executor_pools"})
+    msg = await client.receive_json()
+    assert msg["success"]
+    assert msg["result"] == {
+        POOL_INTERACTIVE: {
+            "max_workers": POOL_MAX_WORKERS[POOL_INTERACTIVE],
+            "processes": False,
+            "running": 0,
+            "queued": 0,
+            "utilization": 0,
+            "submitted": 1,
+        }
+    }
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    await hass.async_block_till_done()
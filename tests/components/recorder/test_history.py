@@ -5,8 +5,12 @@ from datetime import timedelta
 import json
 from unittest.mock import patch, sentinel
 
+import pytest
+
+from homeassistant.components import recorder
 from homeassistant.components.recorder import history
-from homeassistant.components.recorder.models import process_timestamp
+from homeassistant.components.recorder.models import States, process_timestamp
+from homeassistant.components.recorder.util import session_scope
 import homeassistant.core as ha
 from homeassistant.helpers.json import JSONEncoder
 import homeassistant.util.dt as dt_util
@@ -64,6 +68,62 @@ def test_get_states(hass_recorder):
     assert history.get_state(hass, time_before_recorder_ran, "demo.id") is None
 
 
+def test_get_states_from_snapshot(hass_recorder):
+    """Test getting states at a point in time after a state snapshot."""
+    hass = hass_recorder()
+    instance = hass.data[recorder.DATA_INSTANCE]
+    hour = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    states = {}
+    for entity_id, state, timestamp in (
+        ("test.a", "a1", hour + timedelta(hours=1, minutes=10)),
+        ("test.b", "b1", hour + timedelta(hours=1, minutes=20)),
+        ("test.c", "c1", hour + timedelta(hours=2, minutes=5)),
+        ("test.b", "b2", hour + timedelta(hours=2, minutes=20)),
+    ):
+        states[state] = ha.State(
+            entity_id,
+            state,
+            {"state": state},
+            last_changed=timestamp,
+            last_updated=timestamp,
+        )
+        mock_state_change_event(hass, states[state])
+        wait_recording_done(hass)
+
+    boundary, snapshot = instance.state_snapshots.get(
+        hour + timedelta(hours=2, minutes=30)
+    )
+    assert boundary == hour + timedelta(hours=2)
+    assert set(snapshot) == {"test.a", "test.b"}
+    assert instance.state_snapshots.get(hour + timedelta(hours=1, minutes=59)) is None
+
+    def _states_at(point_in_time):
+        return sorted(
+            history.get_states(hass, point_in_time), key=lambda state: state.entity_id
+        )
+
+    assert _states_at(hour + timedelta(hours=2, minutes=30)) == [
+        states["a1"],
+        states["b2"],
+        states["c1"],
+    ]
+    assert _states_at(hour + timedelta(hours=2, minutes=10)) == [
+        states["a1"],
+        states["b1"],
+        states["c1"],
+    ]
+    with session_scope(hass=hass) as session:
+        rows = history._get_state_rows_with_session(
+            hass,
+            session,
+            hour + timedelta(hours=2, minutes=30),
+            ["test.a", "test.c"],
+            run=instance.run_info,
+        )
+        assert sorted(row.state for row in rows) == ["a1", "c1"]
+
+
 def test_state_changes_during_period(hass_recorder):
     """Test state change during period."""
     hass = hass_recorder()
@@ -130,6 +190,43 @@ def test_get_last_state_changes(hass_recorder):
     assert states == hist[entity_id]
 
 
+@pytest.mark.parametrize("window_functions", [True, False])
+def test_get_last_state_changes_for_entities(hass_recorder, window_functions):
+    """Test the last state changes of several entities are returned."""
+    hass = hass_recorder()
+
+    def set_state(entity_id, state):
+        """Set the state."""
+        hass.states.set(entity_id, state)
+        wait_recording_done(hass)
+        return hass.states.get(entity_id)
+
+    start = dt_util.utcnow() - timedelta(minutes=3)
+    states = {"sensor.one": [], "sensor.two": []}
+    for minutes in range(3):
+        with patch(
+            "homeassistant.components.recorder.dt_util.utcnow",
+            return_value=start + timedelta(minutes=minutes),
+        ):
+            states["sensor.one"].append(set_state("sensor.one", str(minutes)))
+            if minutes:
+                states["sensor.two"].append(set_state("sensor.two", str(minutes)))
+            set_state("sensor.three", str(minutes))
+
+    with patch(
+        "homeassistant.components.recorder.history.supports_window_functions",
+        return_value=window_functions,
+    ):
+        hist = history.get_last_state_changes_for_entities(
+            hass, 2, ["sensor.one", "sensor.two", "sensor.four"]
+        )
+
+    assert hist == {
+        "sensor.one": states["sensor.one"][1:],
+        "sensor.two": states["sensor.two"],
+    }
+
+
 def test_ensure_state_can_be_copied(hass_recorder):
     """Ensure a state can pass though copy().
 
@@ -430,3 +527,39 @@ def record_states(hass):
         )
 
     return zero, four, states
+
+
+def test_get_states_with_legacy_attributes(hass_recorder):
+    """Test states recorded with inline attributes are returned with them."""
+    hass = hass_recorder()
+    now = dt_util.utcnow()
+    with session_scope(hass=hass) as session:
+        for entity_id in ("test.legacy", "test.legacy_2"):
+            session.add(
+                States(
+                    entity_id=entity_id,
+                    domain="test",
+                    state="on",
+                    attributes='{"test_attr": 5}',
+                    last_changed=now,
+                    last_updated=now,
+                )
+            )
+    hass.states.set("test.shared", "on", {"test_attr": 6})
+    wait_recording_done(hass)
+
+    future = dt_util.utcnow() + timedelta(seconds=1)
+    states = history.get_states(hass, future)
+    assert {state.entity_id: state.attributes for state in states} == {
+        "test.legacy": {"test_attr": 5},
+        "test.legacy_2": {"test_attr": 5},
+        "test.shared": {"test_attr": 6},
+    }
+    hist = history.get_significant_states(
+        hass, now - timedelta(seconds=1), future, ["test.legacy"]
+    )
+    assert hist["test.legacy"][0].attributes == {"test_attr": 5}
+    hist = history.state_changes_during_period(
+        hass, now - timedelta(seconds=1), future, "test.legacy"
+    )
+    assert hist["test.legacy"][0].attributes == {"test_attr": 5}
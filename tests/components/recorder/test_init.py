@@ -20,12 +20,18 @@ from homeassistant.components.recorder import (
     SERVICE_PURGE_ENTITIES,
     SQLITE_URL_PREFIX,
     Recorder,
+    bulk,
     run_information,
     run_information_from_instance,
     run_information_with_session,
 )
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
+from homeassistant.components.recorder.models import (
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+)
 from homeassistant.components.recorder.util import session_scope
 from homeassistant.const import (
     EVENT_HOMEASSISTANT_FINAL_WRITE,
@@ -43,6 +49,7 @@ from .common import (
     async_wait_recording_done,
     async_wait_recording_done_without_instance,
     corrupt_db_file,
+    trigger_db_commit,
     wait_recording_done,
 )
 from .conftest import SetupRecorderInstanceT
@@ -61,7 +68,11 @@ def _default_recorder(hass):
         hass,
         auto_purge=True,
         keep_days=7,
+        purge_chunk_time=1.0,
+        statistics_keep_days={"hourly": 365, "daily": 5 * 365},
         commit_interval=1,
+        bulk_insert=False,
+        pipelined_writes=False,
         uri="sqlite://",
         db_max_retries=10,
         db_retry_wait=3,
@@ -141,6 +152,26 @@ async def test_saving_state(
     assert state == _state_empty_context(hass, entity_id)
 
 
+async def test_saving_batched_states(
+    hass: HomeAssistant, async_setup_recorder_instance: SetupRecorderInstanceT
+):
+    """Test saving states that were set in one batch."""
+    instance = await async_setup_recorder_instance(hass)
+
+    hass.states.async_set_many(
+        [(f"test.recorder_{idx}", "on", {"test_attr": idx}) for idx in range(3)]
+    )
+    await async_wait_recording_done(hass, instance)
+
+    with session_scope(hass=hass) as session:
+        db_states = list(session.query(States).order_by(States.state_id))
+        assert [state.entity_id for state in db_states] == [
+            "test.recorder_0",
+            "test.recorder_1",
+            "test.recorder_2",
+        ]
+
+
 async def test_saving_many_states(
     hass: HomeAssistant, async_setup_recorder_instance: SetupRecorderInstanceT
 ):
@@ -694,41 +725,41 @@ def test_auto_statistics(hass_recorder):
     tz = dt_util.get_time_zone("Europe/Copenhagen")
     dt_util.set_default_time_zone(tz)
 
-    # Statistics is scheduled to happen at *:12am every hour. Exercise this behavior by
+    # Statistics is scheduled to happen every 5 minutes. Exercise this behavior by
     # firing time changed events and advancing the clock around this time. Pick an
     # arbitrary year in the future to avoid boundary conditions relative to the current
     # date.
     #
-    # The clock is started at 4:15am then advanced forward below
+    # The clock is started at 4:16am then advanced forward below
     now = dt_util.utcnow()
-    test_time = datetime(now.year + 2, 1, 1, 4, 15, 0, tzinfo=tz)
+    test_time = datetime(now.year + 2, 1, 1, 4, 16, 0, tzinfo=tz)
     run_tasks_at_time(hass, test_time)
 
     with patch(
         "homeassistant.components.recorder.statistics.compile_statistics",
         return_value=True,
     ) as compile_statistics:
-        # Advance one hour, and the statistics task should run
-        test_time = test_time + timedelta(hours=1)
+        # Advance 5 minutes, and the statistics task should run
+        test_time = test_time + timedelta(minutes=5)
         run_tasks_at_time(hass, test_time)
         assert len(compile_statistics.mock_calls) == 1
 
         compile_statistics.reset_mock()
 
-        # Advance one hour, and the statistics task should run again
-        test_time = test_time + timedelta(hours=1)
+        # Advance 5 minutes, and the statistics task should run again
+        test_time = test_time + timedelta(minutes=5)
         run_tasks_at_time(hass, test_time)
         assert len(compile_statistics.mock_calls) == 1
 
         compile_statistics.reset_mock()
 
-        # Advance less than one full hour. The task should not run.
-        test_time = test_time + timedelta(minutes=50)
+        # Advance less than 5 minutes. The task should not run.
+        test_time = test_time + timedelta(minutes=3)
         run_tasks_at_time(hass, test_time)
         assert len(compile_statistics.mock_calls) == 0
 
-        # Advance to the next hour, and the statistics task should run again
-        test_time = test_time + timedelta(hours=1)
+        # Advance 5 minutes, and the statistics task should run again
+        test_time = test_time + timedelta(minutes=5)
         run_tasks_at_time(hass, test_time)
         assert len(compile_statistics.mock_calls) == 1
 
@@ -761,6 +792,256 @@ def test_saving_sets_old_state(hass_recorder):
         assert states[3].old_state_id == states[1].state_id
 
 
+def test_bulk_insert_saves_events_and_states(hass_recorder):
+    """Test the bulk insert write mode saves events and states."""
+    hass = hass_recorder({"bulk_insert": True})
+    assert hass.data[DATA_INSTANCE].bulk_insert is True
+
+    hass.bus.fire("EVENT_TEST", {"test_attr": 5})
+    hass.states.set("test.one", "on", {"test_attr": 5})
+    hass.states.set("test.two", "on", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        db_events = list(session.query(Events).filter_by(event_type="EVENT_TEST"))
+        assert len(db_events) == 1
+        assert db_events[0].to_native().data == {"test_attr": 5}
+
+        states = list(session.query(States))
+        assert len(states) == 2
+        assert states[0].to_native() == _state_empty_context(hass, "test.one")
+        for state in states:
+            event = session.query(Events).get(state.event_id)
+            assert event.event_type == "state_changed"
+            assert event.time_fired == state.created
+
+
+def test_bulk_insert_sets_old_state(hass_recorder):
+    """Test the bulk insert write mode links old states within and across commits."""
+    hass = hass_recorder({"bulk_insert": True})
+
+    hass.states.set("test.one", "on", {})
+    hass.states.set("test.two", "on", {})
+    hass.states.set("test.one", "off", {})
+    wait_recording_done(hass)
+    hass.states.set("test.one", "on", {})
+    hass.states.set("test.two", "off", {})
+    hass.states.remove("test.two")
+    wait_recording_done(hass)
+    hass.states.set("test.two", "on", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 7
+
+        assert [state.entity_id for state in states] == [
+            "test.one",
+            "test.two",
+            "test.one",
+            "test.one",
+            "test.two",
+            "test.two",
+            "test.two",
+        ]
+        assert states[0].old_state_id is None
+        assert states[1].old_state_id is None
+        assert states[2].old_state_id == states[0].state_id
+        assert states[3].old_state_id == states[2].state_id
+        assert states[4].old_state_id == states[1].state_id
+        assert states[5].old_state_id == states[4].state_id
+        assert states[5].state is None
+        assert states[6].old_state_id is None
+
+
+def test_pipelined_writes(tmpdir):
+    """Test the writer thread writes the batches and links old states."""
+    test_db_file = tmpdir.mkdir("sqlite").join("test_pipelined.db")
+    dburl = f"{SQLITE_URL_PREFIX}//{test_db_file}"
+
+    hass = get_test_home_assistant()
+    setup_component(
+        hass, DOMAIN, {DOMAIN: {CONF_DB_URL: dburl, "pipelined_writes": True}}
+    )
+    hass.start()
+    wait_recording_done(hass)
+    instance = hass.data[DATA_INSTANCE]
+    assert instance.bulk_insert is True
+    assert instance.writer is not None
+    stats = instance.writer.stats
+    batches = stats.batches
+    rows = stats.rows
+
+    hass.bus.fire("EVENT_TEST", {"test_attr": 5})
+    hass.states.set("test.one", "on", {"test_attr": 5})
+    hass.states.set("test.two", "on", {"test_attr": 5})
+    trigger_db_commit(hass)
+    hass.block_till_done()
+    hass.states.set("test.one", "off", {"test_attr": 5})
+    trigger_db_commit(hass)
+    hass.block_till_done()
+    hass.states.remove("test.two")
+    hass.states.set("test.one", "on", {"test_attr": 6})
+    wait_recording_done(hass)
+
+    assert stats.batches == batches + 3
+    assert stats.rows == rows + 11
+    assert stats.dropped_batches == 0
+
+    with session_scope(hass=hass) as session:
+        db_events = list(session.query(Events).filter_by(event_type="EVENT_TEST"))
+        assert len(db_events) == 1
+        assert db_events[0].to_native().data == {"test_attr": 5}
+
+        states = list(session.query(States))
+        assert [state.entity_id for state in states] == [
+            "test.one",
+            "test.two",
+            "test.one",
+            "test.two",
+            "test.one",
+        ]
+        assert states[0].old_state_id is None
+        assert states[1].old_state_id is None
+        assert states[2].old_state_id == states[0].state_id
+        assert states[3].old_state_id == states[1].state_id
+        assert states[3].state is None
+        assert states[4].old_state_id == states[2].state_id
+        assert states[4].to_native().attributes == {"test_attr": 6}
+        for state in states:
+            event = session.query(Events).get(state.event_id)
+            assert event.event_type == "state_changed"
+
+        assert session.query(StateAttributes).count() == 3
+        assert states[0].attributes_id == states[2].attributes_id
+
+    hass.stop()
+
+
+def test_pipelined_writes_in_memory(hass_recorder, caplog):
+    """Test pipelined writes are synchronous with an in-memory database."""
+    hass = hass_recorder({"pipelined_writes": True})
+    instance = hass.data[DATA_INSTANCE]
+    assert instance.writer is None
+    assert "Pipelined writes are not supported" in caplog.text
+
+    hass.states.set("test.one", "on", {})
+    wait_recording_done(hass)
+    with session_scope(hass=hass) as session:
+        assert session.query(States).count() == 1
+
+
+def test_bulk_insert_with_unresolved_ids(hass_recorder, caplog):
+    """Test the bulk insert write mode falls back to row by row inserts."""
+    hass = hass_recorder({"bulk_insert": True})
+    hass.states.set("test.one", "on", {"test_attr": 5})
+    wait_recording_done(hass)
+
+    select_ids_above = bulk._select_ids_above
+    calls = []
+
+    def _select_ids_missing_one(*args):
+        """Simulate another writer deleting one of the inserted rows."""
+        calls.append(args)
+        ids = select_ids_above(*args)
+        return ids[:-1] if len(calls) == 1 else ids
+
+    with patch.object(bulk, "_select_ids_above", _select_ids_missing_one):
+        hass.bus.fire("EVENT_TEST", {})
+        hass.states.set("test.one", "off", {"test_attr": 5})
+        hass.states.set("test.one", "on", {"test_attr": 6})
+        wait_recording_done(hass)
+
+    assert "Could not resolve the ids of bulk inserted rows" in caplog.text
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States).filter_by(entity_id="test.one"))
+        assert len(states) == 3
+        assert states[1].old_state_id == states[0].state_id
+        assert states[2].old_state_id == states[1].state_id
+        assert states[2].to_native().attributes == {"test_attr": 6}
+        for state in states:
+            event = session.query(Events).get(state.event_id)
+            assert event.event_type == "state_changed"
+        assert session.query(Events).filter_by(event_type="EVENT_TEST").count() == 1
+
+    # The ids are resolved with the bulk insert again for the next batch
+    hass.states.set("test.one", "off", {"test_attr": 6})
+    wait_recording_done(hass)
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States).filter_by(entity_id="test.one"))
+        assert states[3].old_state_id == states[2].state_id
+
+
+def test_bulk_insert_with_serializable_data(hass_recorder, caplog):
+    """Test the bulk insert write mode skips data that cannot be serialized."""
+    hass = hass_recorder({"bulk_insert": True})
+
+    hass.bus.fire("bad_event", {"fail": CannotSerializeMe()})
+    hass.states.set("test.one", "on", {"fail": CannotSerializeMe()})
+    hass.states.set("test.two", "on", {})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 1
+        assert states[0].entity_id == "test.two"
+        assert session.query(Events).filter_by(event_type="bad_event").count() == 0
+
+    assert "Event is not JSON serializable" in caplog.text
+    assert "State is not JSON serializable" in caplog.text
+
+
+def test_saving_states_shares_attributes(hass_recorder):
+    """Test states with the same attributes share a state_attributes row."""
+    hass = hass_recorder()
+
+    hass.states.set("test.one", "on", {"test_attr": 5})
+    hass.states.set("test.two", "on", {"test_attr": 5})
+    hass.states.set("test.three", "on", {"test_attr": 6})
+    wait_recording_done(hass)
+    hass.states.set("test.one", "off", {"test_attr": 5})
+    hass.states.remove("test.three")
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 5
+        assert all(state.attributes is None for state in states)
+        assert states[0].attributes_id == states[1].attributes_id
+        assert states[0].attributes_id == states[3].attributes_id
+        assert states[0].attributes_id != states[2].attributes_id
+        assert states[3].to_native().attributes == {"test_attr": 5}
+        assert states[4].state is None
+        assert session.query(StateAttributes).count() == 3
+        attributes_id = states[0].attributes_id
+
+    instance = hass.data[DATA_INSTANCE]
+    assert instance._state_attributes_ids.get('{"test_attr":5}') == attributes_id
+
+
+def test_bulk_insert_shares_attributes(hass_recorder):
+    """Test the bulk insert write mode shares state_attributes rows."""
+    hass = hass_recorder({"bulk_insert": True})
+
+    hass.states.set("test.one", "on", {"test_attr": 5})
+    hass.states.set("test.two", "on", {"test_attr": 5})
+    hass.states.set("test.three", "on", {"test_attr": 6})
+    wait_recording_done(hass)
+    hass.states.set("test.one", "off", {"test_attr": 5})
+    hass.states.set("test.three", "off", {"test_attr": 7})
+    wait_recording_done(hass)
+
+    with session_scope(hass=hass) as session:
+        states = list(session.query(States))
+        assert len(states) == 5
+        assert all(state.attributes is None for state in states)
+        assert states[0].attributes_id == states[1].attributes_id
+        assert states[0].attributes_id == states[3].attributes_id
+        assert states[2].attributes_id != states[4].attributes_id
+        assert states[4].to_native().attributes == {"test_attr": 7}
+        assert session.query(StateAttributes).count() == 3
+
+
 def test_saving_state_with_serializable_data(hass_recorder, caplog):
     """Test saving data that cannot be serialized does not crash."""
     hass = hass_recorder()
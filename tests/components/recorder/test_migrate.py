@@ -19,7 +19,7 @@ from homeassistant.bootstrap import async_setup_component
 from homeassistant.components import recorder
 from homeassistant.components.recorder import RecorderRuns, migration, models
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import States
+from homeassistant.components.recorder.models import StateAttributes, States
 from homeassistant.components.recorder.util import session_scope
 import homeassistant.util.dt as dt_util
 
@@ -257,6 +257,60 @@ async def test_schema_migrate(hass):
         assert setup_run.called
 
 
+async def test_schema_migrate_moves_state_attributes(hass):
+    """Test states recorded before version 17 share state_attributes rows."""
+    await async_setup_component(hass, "persistent_notification", {})
+
+    def _create_engine_with_legacy_states(*args, **kwargs):
+        engine = create_engine_test(*args, **kwargs)
+        with engine.begin() as connection:
+            for entity_id, attributes in (
+                ("my.one", '{"test_attr": 5}'),
+                ("my.two", '{"test_attr": 5}'),
+                ("my.three", None),
+            ):
+                connection.execute(
+                    models_original.States.__table__.insert(),
+                    {
+                        "entity_id": entity_id,
+                        "domain": "my",
+                        "state": "on",
+                        "attributes": attributes,
+                    },
+                )
+        return engine
+
+    with patch(
+        "homeassistant.components.recorder.create_engine",
+        new=_create_engine_with_legacy_states,
+    ), patch.object(migration, "MAX_ROWS_TO_MIGRATE", 2):
+        await async_setup_component(
+            hass, "recorder", {"recorder": {"db_url": "sqlite://"}}
+        )
+        await hass.data[DATA_INSTANCE].async_recorder_ready.wait()
+        # The second batch is queued when the first one finishes
+        await async_wait_recording_done_without_instance(hass)
+        await async_wait_recording_done_without_instance(hass)
+
+    def _get_states_and_attributes():
+        with session_scope(hass=hass) as session:
+            return [
+                (state.attributes, state.attributes_id)
+                for state in session.query(States)
+                .filter(States.domain == "my")
+                .order_by(States.state_id)
+            ], {
+                attributes.attributes_id: attributes.shared_attrs
+                for attributes in session.query(StateAttributes)
+            }
+
+    states, attributes = await hass.async_add_executor_job(_get_states_and_attributes)
+    assert [state[0] for state in states] == [None, None, None]
+    assert states[0][1] == states[1][1]
+    assert attributes[states[0][1]] == '{"test_attr": 5}'
+    assert attributes[states[2][1]] == "{}"
+
+
 def test_invalid_update():
     """Test that an invalid new version raises an exception."""
     with pytest.raises(ValueError):
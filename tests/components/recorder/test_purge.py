@@ -8,8 +8,17 @@ from sqlalchemy.exc import DatabaseError, OperationalError
 from sqlalchemy.orm.session import Session
 
 from homeassistant.components import recorder
-from homeassistant.components.recorder.models import Events, RecorderRuns, States
-from homeassistant.components.recorder.purge import purge_old_data
+from homeassistant.components.recorder.models import (
+    Events,
+    RecorderRuns,
+    StateAttributes,
+    States,
+    Statistics,
+    StatisticsDaily,
+    StatisticsMonthly,
+    StatisticsShortTerm,
+)
+from homeassistant.components.recorder.purge import PurgeProgress, purge_old_data
 from homeassistant.components.recorder.util import session_scope
 from homeassistant.const import EVENT_STATE_CHANGED
 from homeassistant.core import HomeAssistant
@@ -57,6 +66,105 @@ async def test_purge_old_states(
         assert states.count() == 2
 
 
+async def test_purge_old_states_in_chunks(
+    hass: HomeAssistant, async_setup_recorder_instance: SetupRecorderInstanceT
+):
+    """Test the time range of a purge chunk adapts to the time budget."""
+    instance = await async_setup_recorder_instance(hass)
+
+    await _add_test_states(hass, instance)
+
+    progress = instance.purge_progress = PurgeProgress(dt_util.utcnow())
+    progress.window = timedelta(days=1)
+
+    with session_scope(hass=hass) as session:
+        states = session.query(States)
+
+        finished = purge_old_data(instance, 4, repack=False)
+        assert not finished
+        # Only the first day was purged
+        assert [state.state for state in states] == [
+            "purgeme",
+            "purgeme",
+            "dontpurgeme",
+            "dontpurgeme",
+        ]
+        # The chunk was within the time budget
+        assert progress.window == timedelta(days=2)
+
+        instance.purge_chunk_time = 1e-9
+        finished = purge_old_data(instance, 4, repack=False)
+        assert not finished
+        assert states.count() == 2
+        # The chunk was over the time budget, it covered
+        # the day up to purge_before
+        assert timedelta(hours=11) < progress.window < timedelta(hours=13)
+        assert progress.states == 4
+        assert progress.chunks == 2
+
+        finished = purge_old_data(instance, 4, repack=False)
+        assert finished
+        assert instance.purge_progress is None
+
+
+async def test_purge_old_states_removes_unused_attributes(
+    hass: HomeAssistant, async_setup_recorder_instance: SetupRecorderInstanceT
+):
+    """Test deleting old states removes attributes only they referenced."""
+    instance = await async_setup_recorder_instance(hass)
+    await async_wait_recording_done(hass, instance)
+
+    utcnow = dt_util.utcnow()
+    eleven_days_ago = utcnow - timedelta(days=11)
+    with session_scope(hass=hass) as session:
+        old_attributes = StateAttributes.from_shared_attrs('{"old": 1}')
+        shared_attributes = StateAttributes.from_shared_attrs('{"shared": 1}')
+        session.add_all([old_attributes, shared_attributes])
+        for timestamp, state_attributes in (
+            (eleven_days_ago, old_attributes),
+            (eleven_days_ago, shared_attributes),
+            (utcnow, shared_attributes),
+        ):
+            event = Events(
+                event_type="state_changed",
+                event_data="{}",
+                origin="LOCAL",
+                created=timestamp,
+                time_fired=timestamp,
+            )
+            session.add(event)
+            session.flush()
+            session.add(
+                States(
+                    entity_id="test.recorder2",
+                    domain="sensor",
+                    state="on",
+                    state_attributes=state_attributes,
+                    last_changed=timestamp,
+                    last_updated=timestamp,
+                    created=timestamp,
+                    event_id=event.event_id,
+                )
+            )
+        session.flush()
+        old_attributes_id = old_attributes.attributes_id
+        shared_attributes_id = shared_attributes.attributes_id
+
+    instance._state_attributes_ids['{"old": 1}'] = old_attributes_id
+    instance._state_attributes_ids['{"shared": 1}'] = shared_attributes_id
+
+    with session_scope(hass=hass) as session:
+        finished = purge_old_data(instance, 4, repack=False)
+        assert not finished
+        assert session.query(States).count() == 1
+        assert [
+            attributes.attributes_id for attributes in session.query(StateAttributes)
+        ] == [shared_attributes_id]
+
+    assert '{"old": 1}' not in instance._state_attributes_ids
+    assert instance._state_attributes_ids.get('{"shared": 1}') == shared_attributes_id
+
+
 async def test_purge_old_states_encouters_database_corruption(
     hass: HomeAssistant, async_setup_recorder_instance: SetupRecorderInstanceT
 ):
@@ -195,6 +303,72 @@ async def test_purge_old_recorder_runs(
         assert recorder_runs.count() == 1
 
 
+async def test_purge_old_statistics(
+    hass: HomeAssistant, async_setup_recorder_instance: SetupRecorderInstanceT
+):
+    """Test every statistics tier is purged according to its retention."""
+    instance = await async_setup_recorder_instance(
+        hass, {"hourly_statistics_keep_days": 30, "daily_statistics_keep_days": 400}
+    )
+    await async_wait_recording_done(hass, instance)
+
+    utcnow = dt_util.utcnow()
+    tables = (Statistics, StatisticsDaily, StatisticsMonthly, StatisticsShortTerm)
+    with recorder.session_scope(hass=hass) as session:
+        for table in tables:
+            for days in (1, 20, 100, 1000):
+                session.add(
+                    table.from_stats(
+                        "recorder",
+                        "sensor.test",
+                        utcnow - timedelta(days=days),
+                        {"mean": 1.0},
+                    )
+                )
+
+    with session_scope(hass=hass) as session:
+        finished = purge_old_data(instance, 10, repack=False)
+        assert finished
+        assert [session.query(table).count() for table in tables] == [2, 3, 4, 1]
+
+
+async def test_purge_statistics_not_rolled_up(
+    hass: HomeAssistant, async_setup_recorder_instance: SetupRecorderInstanceT
+):
+    """Test statistics are kept until they are rolled up into the next tier."""
+    instance = await async_setup_recorder_instance(
+        hass, {"hourly_statistics_keep_days": 30}
+    )
+    await async_wait_recording_done(hass, instance)
+
+    utcnow = dt_util.utcnow()
+    with recorder.session_scope(hass=hass) as session:
+        for days in (20, 100, 200):
+            session.add(
+                Statistics.from_stats(
+                    "recorder",
+                    "sensor.test",
+                    utcnow - timedelta(days=days),
+                    {"mean": 1.0},
+                )
+            )
+
+    with session_scope(hass=hass) as session:
+        assert purge_old_data(instance, 10, repack=False)
+        assert session.query(Statistics).count() == 3
+
+    with recorder.session_scope(hass=hass) as session:
+        session.add(
+            StatisticsDaily.from_stats(
+                "recorder", "sensor.test", utcnow - timedelta(days=150), {"mean": 1.0}
+            )
+        )
+
+    with session_scope(hass=hass) as session:
+        assert purge_old_data(instance, 10, repack=False)
+        assert session.query(Statistics).count() == 2
+
+
 async def test_purge_method(
     hass: HomeAssistant,
     async_setup_recorder_instance: SetupRecorderInstanceT,
@@ -3,10 +3,21 @@
 from datetime import timedelta
 from unittest.mock import patch, sentinel
 
+import pytest
+from pytest import approx
+
 from homeassistant.components.recorder import history
 from homeassistant.components.recorder.const import DATA_INSTANCE
-from homeassistant.components.recorder.models import process_timestamp_to_utc_isoformat
-from homeassistant.components.recorder.statistics import statistics_during_period
+from homeassistant.components.recorder.models import (
+    Statistics,
+    StatisticsDaily,
+    process_timestamp_to_utc_isoformat,
+)
+from homeassistant.components.recorder.statistics import (
+    get_last_statistics_for_ids,
+    statistics_during_period,
+)
+from homeassistant.components.recorder.util import session_scope
 from homeassistant.setup import setup_component
 import homeassistant.util.dt as dt_util
 
@@ -30,7 +41,7 @@ def test_compile_hourly_statistics(hass_recorder):
             {
                 "statistic_id": "sensor.test1",
                 "start": process_timestamp_to_utc_isoformat(zero),
-                "mean": 15.0,
+                "mean": approx(178 / 12),
                 "min": 10.0,
                 "max": 20.0,
                 "last_reset": None,
@@ -41,6 +52,209 @@ def test_compile_hourly_statistics(hass_recorder):
     }
 
 
+def test_compile_short_term_statistics(hass_recorder):
+    """Test compiling 5-minute statistics."""
+    hass = hass_recorder()
+    recorder = hass.data[DATA_INSTANCE]
+    setup_component(hass, "sensor", {})
+    zero, four, states = record_states(hass)
+    hist = history.get_significant_states(hass, zero, four)
+    assert dict(states) == dict(hist)
+
+    recorder.do_adhoc_statistics(period="5minute", start=zero + timedelta(minutes=15))
+    wait_recording_done(hass)
+    stats = statistics_during_period(hass, zero, period="5minute")
+    assert stats == {
+        "sensor.test1": [
+            {
+                "statistic_id": "sensor.test1",
+                "start": process_timestamp_to_utc_isoformat(
+                    zero + timedelta(minutes=minutes)
+                ),
+                "mean": approx(mean),
+                "min": min_,
+                "max": max_,
+                "last_reset": None,
+                "state": None,
+                "sum": None,
+            }
+            for minutes, mean, min_, max_ in (
+                (0, 10.0, 10.0, 10.0),
+                (5, 10.0, 10.0, 10.0),
+                (10, 10.0, 10.0, 10.0),
+                (15, 14.0, 10.0, 15.0),
+            )
+        ]
+    }
+    # The hour has not ended yet
+    assert statistics_during_period(hass, zero) == {}
+
+    # The last 5-minute period of the hour rolls up the hourly statistics
+    recorder.do_adhoc_statistics(period="5minute", start=zero + timedelta(minutes=55))
+    wait_recording_done(hass)
+    stats = statistics_during_period(hass, zero, period="5minute")
+    assert len(stats["sensor.test1"]) == 12
+    stats = statistics_during_period(hass, zero)
+    assert stats["sensor.test1"][0]["mean"] == approx(178 / 12)
+
+
+def test_compile_daily_and_monthly_statistics(hass_recorder):
+    """Test the last hour of a month rolls up the daily and monthly statistics."""
+    hass = hass_recorder()
+    recorder = hass.data[DATA_INSTANCE]
+    month_start = dt_util.start_of_local_day(dt_util.as_local(dt_util.utcnow()))
+    month_start = dt_util.start_of_local_day(month_start.date().replace(day=1))
+    next_month_start = dt_util.start_of_local_day(
+        (month_start + timedelta(days=31)).date().replace(day=1)
+    )
+    last_day_start = dt_util.start_of_local_day(
+        next_month_start.date() - timedelta(days=1)
+    )
+    days = (last_day_start - month_start).days
+
+    with session_scope(hass=hass) as session:
+        for day in range(days):
+            session.add(
+                StatisticsDaily.from_stats(
+                    "recorder",
+                    "sensor.test1",
+                    dt_util.as_utc(
+                        dt_util.start_of_local_day(
+                            month_start.date() + timedelta(days=day)
+                        )
+                    ),
+                    {"mean": 10.0, "min": 5.0, "max": 15.0, "sum": float(day)},
+                )
+            )
+        hours = int((next_month_start - last_day_start).total_seconds() // 3600)
+        for hour in range(hours):
+            session.add(
+                Statistics.from_stats(
+                    "recorder",
+                    "sensor.test1",
+                    dt_util.as_utc(last_day_start) + timedelta(hours=hour),
+                    {
+                        "mean": 20.0 if hour % 2 else 10.0,
+                        "min": 0.0,
+                        "max": 30.0,
+                        "sum": float(days + hour),
+                    },
+                )
+            )
+
+    last_hour = dt_util.as_utc(next_month_start) - timedelta(hours=1)
+    recorder.do_adhoc_statistics(period="hourly", start=last_hour)
+    wait_recording_done(hass)
+
+    stats = statistics_during_period(hass, dt_util.as_utc(month_start), period="daily")[
+        "sensor.test1"
+    ]
+    assert len(stats) == days + 1
+    assert stats[-1] == {
+        "statistic_id": "sensor.test1",
+        "start": process_timestamp_to_utc_isoformat(dt_util.as_utc(last_day_start)),
+        "mean": approx(15.0),
+        "min": 0.0,
+        "max": 30.0,
+        "last_reset": None,
+        "state": None,
+        "sum": days + hours - 1,
+    }
+
+    stats = statistics_during_period(
+        hass, dt_util.as_utc(month_start), period="monthly"
+    )
+    assert stats == {
+        "sensor.test1": [
+            {
+                "statistic_id": "sensor.test1",
+                "start": process_timestamp_to_utc_isoformat(
+                    dt_util.as_utc(month_start)
+                ),
+                "mean": approx((10.0 * days + 15.0) / (days + 1)),
+                "min": 0.0,
+                "max": 30.0,
+                "last_reset": None,
+                "state": None,
+                "sum": days + hours - 1,
+            }
+        ]
+    }
+
+
+def test_compile_missed_daily_statistics_half_hour_offset(hass_recorder):
+    """Test days that ended since the last roll up are rolled up in any time zone."""
+    hass = hass_recorder()
+    recorder = hass.data[DATA_INSTANCE]
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Asia/Kolkata"))
+    try:
+        day_start = dt_util.start_of_local_day(
+            dt_util.as_local(dt_util.utcnow()).date() - timedelta(days=3)
+        )
+        with session_scope(hass=hass) as session:
+            for hour in range(48):
+                session.add(
+                    Statistics.from_stats(
+                        "recorder",
+                        "sensor.test1",
+                        # The hourly periods start at half past in local time
+                        dt_util.as_utc(day_start) + timedelta(minutes=30 + hour * 60),
+                        {"mean": 10.0, "min": 0.0, "max": float(hour)},
+                    )
+                )
+
+        # The end of the hour is never a local midnight
+        last_hour = dt_util.as_utc(day_start) + timedelta(hours=48, minutes=30)
+        recorder.do_adhoc_statistics(period="hourly", start=last_hour)
+        wait_recording_done(hass)
+    finally:
+        dt_util.set_default_time_zone(dt_util.get_time_zone(hass.config.time_zone))
+
+    stats = statistics_during_period(hass, dt_util.as_utc(day_start), period="daily")[
+        "sensor.test1"
+    ]
+    assert [(stat["start"], stat["max"]) for stat in stats] == [
+        (process_timestamp_to_utc_isoformat(dt_util.as_utc(day_start)), 23.0),
+        (
+            process_timestamp_to_utc_isoformat(
+                dt_util.as_utc(day_start) + timedelta(days=1)
+            ),
+            47.0,
+        ),
+    ]
+
+
+@pytest.mark.parametrize("window_functions", [True, False])
+def test_get_last_statistics_for_ids(hass_recorder, window_functions):
+    """Test the last statistics of several statistic ids are returned."""
+    hass = hass_recorder()
+    zero = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
+
+    with session_scope(hass=hass) as session:
+        for hours in range(3):
+            for statistic_id in ("sensor.test1", "sensor.test2", "sensor.test3"):
+                session.add(
+                    Statistics.from_stats(
+                        "recorder",
+                        statistic_id,
+                        zero + timedelta(hours=hours),
+                        {"mean": float(hours)},
+                    )
+                )
+
+    with patch(
+        "homeassistant.components.recorder.statistics.supports_window_functions",
+        return_value=window_functions,
+    ):
+        stats = get_last_statistics_for_ids(
+            hass, 2, ["sensor.test1", "sensor.test2", "sensor.test4"]
+        )
+    assert {
+        statistic_id: [stat["mean"] for stat in stat_list]
+        for statistic_id, stat_list in stats.items()
+    } == {"sensor.test1": [2.0, 1.0], "sensor.test2": [2.0, 1.0]}
+
+
 def record_states(hass):
     """Record some test states.
 
@@ -60,7 +274,7 @@ def record_states(hass):
         wait_recording_done(hass)
         return hass.states.get(entity_id)
 
-    zero = dt_util.utcnow()
+    zero = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
     one = zero + timedelta(minutes=1)
     two = one + timedelta(minutes=15)
     three = two + timedelta(minutes=30)
@@ -159,6 +159,28 @@ def test_setup_connection_for_dialect_sqlite():
     assert execute_mock.call_args_list[0][0][0] == "PRAGMA cache_size = -8192"
 
 
+@pytest.mark.parametrize(
+    "dialect_name, is_mariadb, version, supported",
+    [
+        ("mysql", False, (5, 7, 31), False),
+        ("mysql", False, (8, 0, 25), True),
+        ("mysql", True, (10, 1, 48, "MariaDB"), False),
+        ("mysql", True, (10, 2, 0, "MariaDB"), True),
+        ("sqlite", False, (3, 22, 0), False),
+        ("sqlite", False, (3, 25, 0), True),
+        ("postgresql", False, (9, 6), True),
+    ],
+)
+def test_supports_window_functions(dialect_name, is_mariadb, version, supported):
+    """Test window functions are only used on databases that support them."""
+    session = MagicMock()
+    dialect = session.get_bind.return_value.dialect
+    dialect.name = dialect_name
+    dialect.is_mariadb = is_mariadb
+    dialect.server_version_info = version
+    assert util.supports_window_functions(session) is supported
+
+
 def test_basic_sanity_check(hass_recorder):
     """Test the basic sanity checks with a missing table."""
     hass = hass_recorder()
@@ -256,3 +278,25 @@ def test_perodic_db_cleanups(hass_recorder):
     with patch.object(hass.data[DATA_INSTANCE].engine, "execute") as execute_mock:
         util.perodic_db_cleanups(hass.data[DATA_INSTANCE])
     assert execute_mock.call_args[0][0] == "PRAGMA wal_checkpoint(TRUNCATE);"
+
+
+def test_lru():
+    """Test the LRU evicts the least recently used key."""
+    lru = util.LRU(2)
+    lru["a"] = 1
+    lru["b"] = 2
+    assert lru.get("a") == 1
+    lru["c"] = 3
+
+    assert len(lru) == 2
+    assert "b" not in lru
+    assert lru.get("b") is None
+    assert lru.get("b", 0) == 0
+    assert lru.items() == [("a", 1), ("c", 3)]
+
+    lru["a"] = 4
+    assert lru.items() == [("c", 3), ("a", 4)]
+    del lru["c"]
+    assert lru.items() == [("a", 4)]
+    lru.clear()
+    assert len(lru) == 0
@@ -3,6 +3,8 @@
 from datetime import timedelta
 from unittest.mock import patch, sentinel
 
+from pytest import approx
+
 from homeassistant.components.recorder import history
 from homeassistant.components.recorder.const import DATA_INSTANCE
 from homeassistant.components.recorder.models import process_timestamp_to_utc_isoformat
@@ -31,7 +33,7 @@ def test_compile_hourly_statistics(hass_recorder):
             {
                 "statistic_id": "sensor.test1",
                 "start": process_timestamp_to_utc_isoformat(zero),
-                "mean": 15.0,
+                "mean": approx(178 / 12),
                 "min": 10.0,
                 "max": 20.0,
                 "last_reset": None,
@@ -271,7 +273,7 @@ def test_compile_hourly_statistics_partially_unavailable(hass_recorder):
             {
                 "statistic_id": "sensor.test1",
                 "start": process_timestamp_to_utc_isoformat(zero),
-                "mean": 17.5,
+                "mean": approx(202 / 10),
                 "min": 10.0,
                 "max": 25.0,
                 "last_reset": None,
@@ -316,7 +318,7 @@ def record_states(hass):
         wait_recording_done(hass)
         return hass.states.get(entity_id)
 
-    zero = dt_util.utcnow()
+    zero = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
     one = zero + timedelta(minutes=1)
     two = one + timedelta(minutes=15)
     three = two + timedelta(minutes=30)
@@ -363,7 +365,7 @@ def record_energy_states(hass, _sns1_attr, _sns2_attr, _sns3_attr):
         wait_recording_done(hass)
         return hass.states.get(entity_id)
 
-    zero = dt_util.utcnow()
+    zero = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
     one = zero + timedelta(minutes=15)
     two = one + timedelta(minutes=30)
     three = two + timedelta(minutes=15)
@@ -458,7 +460,7 @@ def record_states_partially_unavailable(hass):
         wait_recording_done(hass)
         return hass.states.get(entity_id)
 
-    zero = dt_util.utcnow()
+    zero = dt_util.utcnow().replace(minute=0, second=0, microsecond=0)
     one = zero + timedelta(minutes=1)
     two = one + timedelta(minutes=15)
     three = two + timedelta(minutes=30)
@@ -393,6 +393,107 @@ async def test_subscribe_unsubscribe_events(hass, websocket_client):
     assert sum(hass.bus.async_listeners().values()) == init_count
 
 
+async def test_subscribe_entities(hass, websocket_client, hass_admin_user):
+    """Test subscribe entities sends the matching states and their diffs."""
+    hass_admin_user.groups = []
+    hass_admin_user.mock_policy(
+        {"entities": {"entity_ids": {"light.permitted": True, "light.one": True}}}
+    )
+    hass.states.async_set("light.permitted", "off", {"color": "red", "size": 1})
+    hass.states.async_set("light.not_permitted", "off")
+    hass.states.async_set("switch.permitted", "off")
+    last_changed = hass.states.get("light.permitted").last_changed.timestamp()
+
+    await websocket_client.send_json(
+        {"id": 7, "type": "subscribe_entities", "entity_id_glob": "light.*"}
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 7
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 7
+    assert msg["type"] == "event"
+    assert msg["event"] == {
+        "a": {
+            "light.permitted": {
+                "s": "off",
+                "a": {"color": "red", "size": 1},
+                "lc": last_changed,
+            }
+        }
+    }
+
+    hass.states.async_set("light.not_permitted", "on")
+    hass.states.async_set("switch.permitted", "on")
+    hass.states.async_set("light.permitted", "off", {"color": "blue"})
+    await hass.async_block_till_done()
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 7
+    assert msg["event"] == {
+        "c": {"light.permitted": {"+": {"a": {"color": "blue"}}, "-": {"a": ["size"]}}}
+    }
+
+    hass.states.async_set("light.permitted", "on", {"color": "blue"})
+    await hass.async_block_till_done()
+    msg = await websocket_client.receive_json()
+    last_changed = hass.states.get("light.permitted").last_changed.timestamp()
+    assert msg["event"] == {
+        "c": {"light.permitted": {"+": {"s": "on", "lc": last_changed}}}
+    }
+
+    hass.states.async_set("light.one", "on")
+    hass.states.async_remove("light.permitted")
+    await hass.async_block_till_done()
+    msg = await websocket_client.receive_json()
+    last_changed = hass.states.get("light.one").last_changed.timestamp()
+    assert msg["event"] == {
+        "a": {"light.one": {"s": "on", "a": {}, "lc": last_changed}}
+    }
+    msg = await websocket_client.receive_json()
+    assert msg["event"] == {"r": ["light.permitted"]}
+
+
+async def test_subscribe_entities_fields(hass, websocket_client):
+    """Test subscribe entities only sends the subscribed fields."""
+    hass.states.async_set("light.one", "off", {"color": "red"})
+    hass.states.async_set("light.two", "off")
+
+    await websocket_client.send_json(
+        {
+            "id": 7,
+            "type": "subscribe_entities",
+            "entity_ids": ["light.one"],
+            "fields": ["state"],
+        }
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+    msg = await websocket_client.receive_json()
+    assert msg["event"] == {"a": {"light.one": {"s": "off"}}}
+
+    hass.states.async_set("light.one", "off", {"color": "blue"})
+    hass.states.async_set("light.two", "on")
+    hass.states.async_set("light.one", "on", {"color": "blue"})
+    await hass.async_block_till_done()
+    msg = await websocket_client.receive_json()
+    assert msg["event"] == {"c": {"light.one": {"+": {"s": "on"}}}}
+
+
+async def test_supported_features(hass, websocket_client):
+    """Test the client can set the features it supports."""
+    await websocket_client.send_json(
+        {"id": 7, "type": "supported_features", "features": {"coalesce_messages": 1}}
+    )
+
+    msg = await websocket_client.receive_json()
+    assert msg["id"] == 7
+    assert msg["type"] == const.TYPE_RESULT
+    assert msg["success"]
+
+
 async def test_get_states(hass, websocket_client):
     """Test get_states command."""
     hass.states.async_set("greeting.hello", "world")
@@ -526,15 +627,15 @@ async def test_states_filters_visible(hass, hass_admin_user, websocket_client):
     assert msg["result"][0]["entity_id"] == "test.entity"
 
 
-async def test_get_states_not_allows_nan(hass, websocket_client):
-    """Test get_states command not allows NaN floats."""
+async def test_get_states_nan_as_null(hass, websocket_client):
+    """Test get_states command sends NaN floats as null."""
     hass.states.async_set("greeting.hello", "world", {"hello": float("NaN")})
 
     await websocket_client.send_json({"id": 5, "type": "get_states"})
 
     msg = await websocket_client.receive_json()
-    assert not msg["success"]
-    assert msg["error"]["code"] == const.ERR_UNKNOWN_ERROR
+    assert msg["success"]
+    assert msg["result"][0]["attributes"] == {"hello": None}
 
 
 async def test_subscribe_unsubscribe_events_whitelist(
@@ -1,4 +1,5 @@
 """Test Websocket API http module."""
+import asyncio
 from datetime import timedelta
 from unittest.mock import patch
 
@@ -66,6 +67,36 @@ async def test_pending_msg_peak(hass, mock_low_peak, hass_ws_client, caplog):
     assert "Client unable to keep up with pending messages" in caplog.text
 
 
+async def test_wait_sent(hass, hass_ws_client):
+    """Test waiting until the pending messages were written to the client."""
+    orig_handler = http.WebSocketHandler
+    instance = None
+
+    def instantiate_handler(*args):
+        nonlocal instance
+        instance = orig_handler(*args)
+        return instance
+
+    with patch(
+        "homeassistant.components.websocket_api.http.WebSocketHandler",
+        instantiate_handler,
+    ):
+        websocket_client = await hass_ws_client()
+
+    instance._send_message({"id": 5, "type": "pong"})
+    await instance._async_wait_sent()
+    msg = await websocket_client.receive_json()
+    assert msg == {"id": 5, "type": "pong"}
+
+    # The writer stops before the message of the waiting future is sent
+    instance._to_write.put_nowait(None)
+    instance._send_message({"id": 6, "type": "pong"})
+    with pytest.raises(asyncio.CancelledError):
+        await instance._async_wait_sent()
+    with pytest.raises(asyncio.CancelledError):
+        await instance._async_wait_sent()
+
+
 async def test_non_json_message(hass, websocket_client, caplog):
     """Test trying to serialize non JSON objects."""
     bad_data = object()
@@ -80,3 +111,94 @@ async def test_non_json_message(hass, websocket_client, caplog):
         f"Unable to serialize to JSON. Bad data found at $.result[0](State: test_domain.entity).attributes.bad={bad_data}(<class 'object'>"
         in caplog.text
     )
+
+
+async def test_coalesced_messages(hass, mock_low_peak, websocket_client):
+    """Test pending messages are sent as one frame and state changes coalesced."""
+    await websocket_client.send_json(
+        {
+            "id": 5,
+            "type": "supported_features",
+            "features": {const.FEATURE_COALESCE_MESSAGES: 1},
+        }
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    await websocket_client.send_json(
+        {"id": 6, "type": "subscribe_events", "event_type": "state_changed"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    def _states(msg):
+        return [
+            (
+                event["event"]["data"]["entity_id"],
+                event["event"]["data"]["new_state"]["state"],
+            )
+            for event in msg
+        ]
+
+    # The writer does not run before all states are set
+    hass.states.async_set("light.one", "on")
+    hass.states.async_set("light.one", "off")
+
+    # Every state change is sent while the client keeps up
+    msg = await websocket_client.receive_json()
+    assert _states(msg) == [("light.one", "on"), ("light.one", "off")]
+
+    for idx in range(5):
+        hass.states.async_set(f"sensor.sensor_{idx}", "on")
+    hass.states.async_set("light.one", "on")
+    hass.states.async_set("light.two", "on")
+    hass.states.async_set("light.one", "off")
+    hass.states.async_set("light.one", "on")
+
+    # Only the latest state change is sent once the client is behind
+    msg = await websocket_client.receive_json()
+    assert _states(msg)[5:] == [("light.one", "on"), ("light.two", "on")]
+    assert msg[5]["event"]["data"]["old_state"]["state"] == "off"
+
+    hass.states.async_set("light.two", "off")
+    msg = await websocket_client.receive_json()
+    assert msg["event"]["data"]["new_state"]["state"] == "off"
+
+
+async def test_state_changes_not_coalesced_without_feature(
+    hass, mock_low_peak, websocket_client
+):
+    """Test state changes are not coalesced for a client without the feature."""
+    await websocket_client.send_json(
+        {"id": 6, "type": "subscribe_events", "event_type": "state_changed"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    for idx in range(5):
+        hass.states.async_set(f"sensor.sensor_{idx}", "on")
+    hass.states.async_set("light.one", "on")
+    hass.states.async_set("light.one", "off")
+
+    for idx in range(5):
+        msg = await websocket_client.receive_json()
+        assert msg["event"]["data"]["entity_id"] == f"sensor.sensor_{idx}"
+    for state in ("on", "off"):
+        msg = await websocket_client.receive_json()
+        assert msg["event"]["data"]["new_state"]["state"] == state
+
+
+async def test_messages_not_batched_without_feature(hass, websocket_client):
+    """Test pending messages are sent one by one without the feature."""
+    await websocket_client.send_json(
+        {"id": 6, "type": "subscribe_events", "event_type": "test_event"}
+    )
+    msg = await websocket_client.receive_json()
+    assert msg["success"]
+
+    hass.bus.async_fire("test_event", {"number": 1})
+    hass.bus.async_fire("test_event", {"number": 2})
+
+    for number in (1, 2):
+        msg = await websocket_client.receive_json()
+        assert msg["event"]["data"] == {"number": number}
@@ -1,12 +1,14 @@
 """Test Websocket API messages module."""
+import json
 
 from homeassistant.components.websocket_api.messages import (
     _cached_event_message as lru_event_cache,
     cached_event_message,
+    event_message,
     message_to_json,
 )
 from homeassistant.const import EVENT_STATE_CHANGED
-from homeassistant.core import callback
+from homeassistant.core import Event, State, callback
 
 
 async def test_cached_event_message(hass):
@@ -78,18 +80,40 @@ async def test_cached_event_message_with_different_idens(hass):
     assert cache_info.currsize == 1
 
 
+async def test_cached_event_message_splices_states(hass):
+    """Test state changed events are serialized with the cached JSON of states."""
+    old_state = State("light.window", "off")
+    new_state = State("light.window", "on", {"brightness": 100})
+    event = Event(
+        EVENT_STATE_CHANGED,
+        {"entity_id": "light.window", "old_state": old_state, "new_state": new_state},
+    )
+    removed = Event(
+        EVENT_STATE_CHANGED,
+        {"entity_id": "light.window", "old_state": new_state, "new_state": None},
+    )
+    other = Event(EVENT_STATE_CHANGED, {"entity_id": "light.window", "extra": 1})
+    lru_event_cache.cache_clear()
+
+    for evt in (event, removed, other):
+        assert json.loads(cached_event_message(2, evt)) == json.loads(
+            message_to_json(event_message(2, evt))
+        )
+    assert new_state.as_dict_json.decode() in cached_event_message(2, event)
+
+
 async def test_message_to_json(caplog):
     """Test we can serialize websocket messages."""
 
     json_str = message_to_json({"id": 1, "message": "xyz"})
 
-    assert json_str == '{"id": 1, "message": "xyz"}'
+    assert json_str == '{"id":1,"message":"xyz"}'
 
     json_str2 = message_to_json({"id": 1, "message": _Unserializeable()})
 
     assert (
         json_str2
-        == '{"id": 1, "type": "result", "success": false, "error": {"code": "unknown_error", "message": "Invalid JSON in response"}}'
+        == '{"id":1,"type":"result","success":false,"error":{"code":"unknown_error","message":"Invalid JSON in response"}}'
     )
     assert "Unable to serialize to JSON" in caplog.text
 
@@ -1658,6 +1658,68 @@ async def test_condition_template_invalid_results(hass):
     assert not test(hass)
 
 
+async def test_condition_static_template(hass):
+    """Test a static template condition is evaluated once."""
+    test = await condition.async_from_config(
+        hass, {"condition": "template", "value_template": " True "}
+    )
+    assert test(hass)
+    assert_condition_trace({"": [{"result": {"result": True, "entities": []}}]})
+
+    test = await condition.async_from_config(
+        hass, {"condition": "template", "value_template": "on"}
+    )
+    assert not test(hass)
+
+
+async def test_condition_template_whitespace(hass):
+    """Test whitespace around a template result is ignored with or without trace."""
+    for source in (" true ", "{{ ' true ' }}", "{{ true }} "):
+        trace.trace_clear()
+        assert condition.async_template(hass, Template(source, hass))
+        trace.trace_cv.set(None)
+        assert condition.async_template(hass, Template(source, hass))
+
+
+async def test_condition_without_trace(hass):
+    """Test conditions are evaluated without a trace being recorded."""
+    trace.trace_cv.set(None)
+    test = await condition.async_from_config(
+        hass,
+        {
+            "condition": "and",
+            "conditions": [
+                {"condition": "state", "entity_id": "sensor.a", "state": "on"},
+                {"condition": "numeric_state", "entity_id": "sensor.b", "above": 5},
+                {
+                    "condition": "or",
+                    "conditions": [
+                        {
+                            "condition": "template",
+                            "value_template": "{{ is_state('sensor.a', 'on') }}",
+                        },
+                        {"condition": "state", "entity_id": "sensor.c", "state": "on"},
+                    ],
+                },
+            ],
+        },
+    )
+
+    hass.states.async_set("sensor.a", "on")
+    with pytest.raises(ConditionError, match="unknown entity sensor.b"):
+        test(hass)
+
+    hass.states.async_set("sensor.b", "10")
+    assert test(hass)
+
+    hass.states.async_set("sensor.b", "1")
+    assert not test(hass)
+    assert trace.trace_cv.get() is None
+
+    with pytest.raises(ConditionError, match="template"):
+        condition.async_template(hass, Template("{{ undefined.state }}", hass))
+
+
 def _find_run_id(traces, trace_type, item_id):
     """Find newest run_id for a script or automation."""
     for _trace in reversed(traces):
@@ -10,7 +10,7 @@ import jinja2
 import pytest
 
 from homeassistant.components import sun
-from homeassistant.const import MATCH_ALL
+from homeassistant.const import EVENT_STATE_CHANGED, MATCH_ALL
 import homeassistant.core as ha
 from homeassistant.core import callback
 from homeassistant.exceptions import TemplateError
@@ -24,6 +24,7 @@ from homeassistant.helpers.event import (
     async_track_point_in_utc_time,
     async_track_same_state,
     async_track_state_added_domain,
+    async_track_state_aggregate,
     async_track_state_change,
     async_track_state_change_event,
     async_track_state_change_filtered,
@@ -37,7 +38,7 @@ from homeassistant.helpers.event import (
     async_track_utc_time_change,
     track_point_in_utc_time,
 )
-from homeassistant.helpers.template import Template
+from homeassistant.helpers.template import Template, async_get_state_aggregate
 from homeassistant.setup import async_setup_component
 import homeassistant.util.dt as dt_util
 
@@ -1431,6 +1432,127 @@ async def test_track_template_result_iterator(hass):
     assert filter_runs == ["", "sensor.new"]
 
 
+async def test_track_template_result_error_analyzed(hass):
+    """Test a failing template only listens to the states it references."""
+    template_error = Template(
+        "{{ (states('sensor.a') | int) / (states('sensor.b') | int) }}", hass
+    )
+    results = []
+
+    @ha.callback
+    def _listener(event, updates):
+        results.append(updates.pop().result)
+
+    info = async_track_template_result(
+        hass, [TrackTemplate(template_error, None)], _listener
+    )
+    await hass.async_block_till_done()
+    assert info.listeners == {
+        "all": False,
+        "domains": set(),
+        "entities": {"sensor.a", "sensor.b"},
+        "time": False,
+    }
+
+    hass.states.async_set("sensor.c", "1")
+    await hass.async_block_till_done()
+    assert results == []
+
+    hass.states.async_set("sensor.a", "4")
+    await hass.async_block_till_done()
+    assert len(results) == 1
+    assert isinstance(results[0], TemplateError)
+
+    hass.states.async_set("sensor.b", "2")
+    await hass.async_block_till_done()
+    assert results[1:] == [2]
+
+
+async def test_track_state_aggregate(hass):
+    """Test tracking the aggregate of a domain."""
+    hass.states.async_set("sensor.a", "5")
+    sums = []
+    remove = async_track_state_aggregate(
+        hass, "sensor", lambda aggregate: sums.append(aggregate.sum())
+    )
+
+    hass.states.async_set("sensor.b", "7")
+    hass.states.async_set("light.a", "3")
+    await hass.async_block_till_done()
+    assert sums == [12]
+
+    remove()
+    hass.states.async_set("sensor.b", "8")
+    await hass.async_block_till_done()
+    assert sums == [12]
+
+
+async def test_track_template_result_domain_aggregate(hass):
+    """Test a template with a domain aggregate is rendered with updated values."""
+    hass.states.async_set("light.a", "on")
+    results = []
+
+    @ha.callback
+    def _listener(event, updates):
+        results.append(updates.pop().result)
+
+    info = async_track_template_result(
+        hass,
+        [TrackTemplate(Template("{{ domain_count('light', 'on') }}", hass), None)],
+        _listener,
+    )
+    await hass.async_block_till_done()
+    assert info.listeners == {
+        "all": False,
+        "domains": set(),
+        "entities": set(),
+        "time": False,
+    }
+    listeners = hass.bus.async_listeners()[EVENT_STATE_CHANGED]
+
+    hass.states.async_set("light.b", "on")
+    await hass.async_block_till_done()
+    hass.states.async_set("light.a", "off")
+    await hass.async_block_till_done()
+    hass.states.async_set("switch.a", "on")
+    await hass.async_block_till_done()
+    hass.states.async_remove("light.b")
+    await hass.async_block_till_done()
+    assert results == [2, 1, 0]
+
+    info.async_remove()
+    assert hass.bus.async_listeners().get(EVENT_STATE_CHANGED, 0) == listeners - 1
+    assert async_get_state_aggregate(hass, "light").count() == 1
+
+
+async def test_track_template_result_instrumentation(hass):
+    """Test renders of a tracked template are accounted to the tracker."""
+    instrumentation = hass.async_start_instrumentation()
+
+    class _Owner:
+        entity_id = "sensor.owner"
+
+        @ha.callback
+        def action(self, event, updates):
+            """Handle template updates."""
+
+    info = async_track_template_result(
+        hass,
+        [TrackTemplate(Template("{{ states('sensor.a') }}", hass), None)],
+        _Owner().action,
+    )
+    hass.states.async_set("sensor.a", "1")
+    await hass.async_block_till_done()
+    info.async_refresh()
+    Template("{{ states('sensor.a') }}", hass).async_render()
+
+    stats = instrumentation.templates["{{ states('sensor.a') }}"]
+    assert stats.render.count == 4
+    assert stats.owners == {"sensor.owner"}
+    assert stats.triggers == {"setup": 1, "sensor.a": 1, "refresh": 1, "render": 1}
+    hass.async_stop_instrumentation()
+
+
 async def test_track_template_result_errors(hass, caplog):
     """Test tracking template with errors in the template."""
     template_syntax_error = Template("{{states.switch", hass)
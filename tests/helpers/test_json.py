@@ -1,10 +1,16 @@
 """Test Home Assistant remote methods and classes."""
 from datetime import timedelta
+import json
 
 import pytest
 
 from homeassistant import core
-from homeassistant.helpers.json import ExtendedJSONEncoder, JSONEncoder
+from homeassistant.helpers.json import (
+    ExtendedJSONEncoder,
+    JSONEncoder,
+    json_bytes,
+    json_dumps,
+)
 from homeassistant.util import dt as dt_util
 
 
@@ -63,3 +69,20 @@ def test_trace_json_encoder(hass):
     # Default method falls back to repr(o)
     o = object()
     assert ha_json_enc.default(o) == {"__type": str(type(o)), "repr": repr(o)}
+
+
+def test_json_dumps(hass):
+    """Test serializing Home Assistant objects with orjson."""
+    state = core.State("test.test", "hello", {"list": ("a", "b")})
+    event = core.Event("test_event", {"new_state": state})
+    now = dt_util.utcnow()
+
+    data = {"state": state, "event": event, "set": {"milk"}, "now": now, 1: None}
+    assert json.loads(json_dumps(data)) == json.loads(json.dumps(data, cls=JSONEncoder))
+    assert json_bytes(data) == json_dumps(data).encode("utf-8")
+
+    # NaN is serialized as null instead of producing invalid JSON
+    assert json_dumps({"nan": float("nan")}) == '{"nan":null}'
+
+    with pytest.raises(TypeError):
+        json_dumps(object())
@@ -11,6 +11,7 @@ from homeassistant.components import group
 from homeassistant.config import async_process_ha_core_config
 from homeassistant.const import (
     ATTR_UNIT_OF_MEASUREMENT,
+    EVENT_STATE_CHANGED,
     LENGTH_METERS,
     MASS_GRAMS,
     PRESSURE_PA,
@@ -137,6 +138,171 @@ def test_raise_exception_on_error(hass):
         template.Template("{{ invalid_syntax").ensure_valid()
 
 
+def test_template_analysis(hass):
+    """Test the states a template references are found without rendering."""
+
+    def _analyze(source):
+        return template.Template(source, hass).async_analyze()
+
+    analysis = _analyze(
+        "{% if is_state('binary_sensor.door', 'on') %}"
+        "{{ state_attr('climate.living', 'temperature') }}"
+        "{% else %}{{ states.sensor.outside.state }}{% endif %}"
+        "{{ states['light.kitchen'].attributes[states('input_select.key')] }}"
+        "{{ states.switch | count }}{{ now().hour }}"
+    )
+    assert analysis.complete
+    assert analysis.entities == {
+        "binary_sensor.door",
+        "climate.living",
+        "sensor.outside",
+        "light.kitchen",
+        "input_select.key",
+    }
+    assert analysis.domains == {"switch"}
+    assert analysis.has_time
+
+    analysis = _analyze("{{ states('sensor.outside') }}")
+    assert analysis.complete
+    assert not analysis.has_time
+
+    analysis = _analyze("{{ domain_count('light', 'on') }}")
+    assert analysis.complete
+    assert analysis.domains == {"light"}
+
+    for source in (
+        "{{ states | count }}",
+        "{{ states(entity_id) }}",
+        "{{ states.sensor[object_id] }}",
+        "{{ expand('group.all') | list }}",
+        "{{ 'zone.home' | closest }}",
+        "{{ trigger.to_state.state }}",
+        "{{ states('invalid') }}",
+        "{{ states.sensor",
+        "{{ states | unknown_filter }}",
+        "{{ domain_sum(domain) }}",
+    ):
+        assert not _analyze(source).complete, source
+
+
+async def test_state_aggregate(hass):
+    """Test the aggregate of a domain is updated with its states."""
+    hass.states.async_set("sensor.a", "1.5", {"power": 10})
+    hass.states.async_set("sensor.b", "on", {"power": 20})
+    hass.states.async_set("light.c", "4")
+    aggregate = template.async_get_state_aggregate(hass, "sensor")
+    assert template.async_get_state_aggregate(hass, "sensor") is not aggregate
+    power = template.async_get_state_aggregate(hass, "sensor", "power")
+    listeners = hass.bus.async_listeners().get(EVENT_STATE_CHANGED, 0)
+
+    assert aggregate.count() == 2
+    assert aggregate.count("on") == 1
+    assert aggregate.count(["unhashable"]) == 0
+    assert aggregate.entity_ids("on") == ["sensor.b"]
+    assert aggregate.sum() == 1.5
+    assert (aggregate.min(), aggregate.max()) == (1.5, 1.5)
+    assert (power.sum(), power.min(), power.max()) == (30, 10, 20)
+
+    updates = []
+    remove = aggregate.async_add_listener(lambda event: updates.append(aggregate.sum()))
+    remove_power = power.async_add_listener(lambda event: None)
+    assert template.async_get_state_aggregate(hass, "sensor") is aggregate
+    assert hass.bus.async_listeners()[EVENT_STATE_CHANGED] == listeners + 2
+    hass.states.async_set("sensor.b", "0.1")
+    hass.states.async_set("sensor.c", "on")
+    hass.states.async_set("light.c", "5")
+    await hass.async_block_till_done()
+    assert updates == [pytest.approx(1.6), pytest.approx(1.6)]
+    assert aggregate.count() == 3
+    assert aggregate.entity_ids("on") == ["sensor.c"]
+    assert (aggregate.min(), aggregate.max()) == (0.1, 1.5)
+
+    hass.states.async_remove("sensor.a")
+    hass.states.async_set("sensor.b", "nan")
+    await hass.async_block_till_done()
+    assert aggregate.count() == 2
+    assert aggregate.sum() == 0
+    assert (aggregate.min(), aggregate.max()) == (None, None)
+    assert (power.sum(), power.min(), power.max()) == (0, None, None)
+    assert len(updates) == 4
+
+    remove()
+    remove_power()
+    hass.states.async_set("sensor.b", "2")
+    await hass.async_block_till_done()
+    assert aggregate.sum() == 0
+    assert len(updates) == 4
+    assert hass.bus.async_listeners().get(EVENT_STATE_CHANGED, 0) == listeners
+    assert template.async_get_state_aggregate(hass, "sensor") is not aggregate
+
+
+async def test_domain_aggregate_functions(hass):
+    """Test the domain aggregate functions in templates."""
+    hass.states.async_set("light.a", "on", {"brightness": 100})
+    hass.states.async_set("light.b", "off")
+    hass.states.async_set("light.c", "on", {"brightness": 50})
+    hass.states.async_set("sensor.temp", "21.5")
+
+    def _render(source):
+        return template.Template(source, hass).async_render()
+
+    assert _render("{{ domain_count('light') }}") == 3
+    assert _render("{{ domain_count('light', 'on') }}") == 2
+    assert _render("{{ domain_count('light', 100, 'brightness') }}") == 1
+    assert _render("{{ domain_entities('light', 'on') }}") == ["light.a", "light.c"]
+    assert _render("{{ domain_sum('light', 'brightness') }}") == 150
+    assert _render("{{ domain_min('light', 'brightness') }}") == 50
+    assert _render("{{ domain_max('light', 'brightness') }}") == 100
+    assert _render("{{ domain_max('sensor') }}") == 21.5
+    assert _render("{{ domain_max('switch') }}") is None
+
+    info = template.Template(
+        "{{ domain_count('light', 'on') }}", hass
+    ).async_render_to_info()
+    assert_result_info(info, 2)
+    assert info.aggregates == {("light", None)}
+    assert info.filter("light.d")
+    assert not info.filter("switch.a")
+    assert info.rate_limit is None
+    info = template.Template(
+        "{{ domain_count('light') }}{{ states.light | count }}", hass
+    ).async_render_to_info()
+    assert info.rate_limit == template.DOMAIN_STATES_RATE_LIMIT
+
+    hass.states.async_set("light.b", "on")
+    await hass.async_block_till_done()
+    assert _render("{{ domain_count('light', 'on') }}") == 3
+
+    with pytest.raises(TemplateError):
+        _render("{{ domain_count('not a domain') }}")
+
+    with pytest.raises(TemplateError):
+        template.Template("{{ domain_count('light') }}", hass).async_render(
+            limited=True
+        )
+
+
+async def test_render_to_info_with_exception_is_analyzed(hass):
+    """Test a failed render listens to the states the template references."""
+    info = template.Template(
+        "{{ (states('sensor.a') | int) / (states('sensor.b') | int) }}", hass
+    ).async_render_to_info()
+    assert info.exception
+    assert info.analyzed
+    assert info.entities == {"sensor.a", "sensor.b"}
+    assert info.rate_limit is None
+    assert info.filter("sensor.b")
+    assert not info.filter("sensor.c")
+
+    info = template.Template(
+        "{{ 1 / (states | count - states | count) }}", hass
+    ).async_render_to_info()
+    assert info.exception
+    assert not info.analyzed
+    assert info.rate_limit == template.ALL_STATES_RATE_LIMIT
+    assert info.filter("sensor.c")
+
+
 def test_iterating_all_states(hass):
     """Test iterating all states."""
     tmpl_str = "{% for state in states %}{{ state.state }}{% endfor %}"
@@ -2143,8 +2309,9 @@ def test_urlencode(hass):
     assert tpl.async_render() == "the%20quick%20brown%20fox%20%3D%20true"
 
 
-async def test_cache_garbage_collection():
-    """Test caching a template."""
+async def test_compiled_code_cache(hass):
+    """Test compiled templates are shared and kept after the templates are gone."""
+    template.COMPILED_CODE_CACHE.clear()
     template_string = (
         "{% set dict = {'foo': 'x&y', 'bar': 42} %} {{ dict | urlencode }}"
     )
@@ -2152,26 +2319,48 @@ async def test_cache_garbage_collection():
         (template_string),
     )
     tpl.ensure_valid()
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    assert template.COMPILED_CODE_CACHE.as_dict() == {
+        "size": 1,
+        "max_size": template.COMPILED_CODE_CACHE_SIZE,
+        "hits": 0,
+        "misses": 1,
+    }
 
     tpl2 = template.Template(
         (template_string),
     )
     tpl2.ensure_valid()
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    assert template.COMPILED_CODE_CACHE.hits == 1
 
     del tpl
-    assert template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
     del tpl2
-    assert not template._NO_HASS_ENV.template_cache.get(
-        template_string
-    )  # pylint: disable=protected-access
+    template.Template(template_string).ensure_valid()
+    assert template.COMPILED_CODE_CACHE.hits == 2
+
+    # Environments with other settings compile separately
+    template.Template(template_string, hass).ensure_valid()
+    assert template.COMPILED_CODE_CACHE.misses == 2
+    template.Template(template_string, hass).ensure_valid()
+    assert template.COMPILED_CODE_CACHE.hits == 3
+    assert len(template.COMPILED_CODE_CACHE) == 2
+
+
+async def test_compiled_code_cache_is_bounded(monkeypatch):
+    """Test the least recently used templates are evicted."""
+    cache = template.CompiledCodeCache(2)
+    monkeypatch.setattr(template, "COMPILED_CODE_CACHE", cache)
+
+    template.Template("{{ 1 }}").ensure_valid()
+    template.Template("{{ 2 }}").ensure_valid()
+    template.Template("{{ 1 }}").ensure_valid()
+    template.Template("{{ 3 }}").ensure_valid()
+    assert len(cache) == 2
+    assert cache.hits == 1
+
+    template.Template("{{ 1 }}").ensure_valid()
+    assert cache.hits == 2
+    template.Template("{{ 2 }}").ensure_valid()
+    assert cache.misses == 4
 
 
 def test_is_template_string():
@@ -9,8 +9,8 @@ import aiohttp
 import pytest
 import requests
 
-from homeassistant.const import EVENT_HOMEASSISTANT_STOP
-from homeassistant.core import CoreState
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP, EVENT_STATE_CHANGED
+from homeassistant.core import CoreState, callback
 from homeassistant.exceptions import ConfigEntryNotReady
 from homeassistant.helpers import update_coordinator
 from homeassistant.util.dt import utcnow
@@ -312,6 +312,32 @@ async def test_async_set_updated_data(crd):
     assert crd._unsub_refresh is not old_refresh
 
 
+async def test_listener_state_changes_fired_together(hass, crd):
+    """Test the state changes written by listeners are fired as one batch."""
+    batches = []
+
+    @callback
+    def listener(events):
+        batches.append(events)
+
+    hass.bus.async_listen_batch(EVENT_STATE_CHANGED, listener)
+
+    for idx in range(3):
+        crd.async_add_listener(
+            lambda idx=idx: hass.states.async_set(f"sensor.test_{idx}", crd.data)
+        )
+
+    await crd.async_refresh()
+    await hass.async_block_till_done()
+
+    assert len(batches) == 1
+    assert [event.data["entity_id"] for event in batches[0]] == [
+        "sensor.test_0",
+        "sensor.test_1",
+        "sensor.test_2",
+    ]
+
+
 async def test_stop_refresh_on_ha_stop(hass, crd):
     """Test no update interval refresh when Home Assistant is stopping."""
     # Add subscriber
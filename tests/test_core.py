@@ -3,6 +3,7 @@
 import asyncio
 from datetime import datetime, timedelta
 import functools
+import json
 import logging
 import os
 from tempfile import TemporaryDirectory
@@ -53,7 +54,7 @@ def test_split_entity_id():
 
 def test_async_add_hass_job_schedule_callback():
     """Test that we schedule coroutines and add jobs to the job pool."""
-    hass = MagicMock()
+    hass = MagicMock(instrumentation=None)
     job = MagicMock()
 
     ha.HomeAssistant.async_add_hass_job(hass, ha.HassJob(ha.callback(job)))
@@ -64,7 +65,7 @@ def test_async_add_hass_job_schedule_callback():
 
 def test_async_add_hass_job_schedule_partial_callback():
     """Test that we schedule partial coros and add jobs to the job pool."""
-    hass = MagicMock()
+    hass = MagicMock(instrumentation=None)
     job = MagicMock()
     partial = functools.partial(ha.callback(job))
 
@@ -76,7 +77,7 @@ def test_async_add_hass_job_schedule_partial_callback():
 
 def test_async_add_hass_job_schedule_coroutinefunction(loop):
     """Test that we schedule coroutines and add jobs to the job pool."""
-    hass = MagicMock(loop=MagicMock(wraps=loop))
+    hass = MagicMock(loop=MagicMock(wraps=loop), instrumentation=None)
 
     async def job():
         pass
@@ -89,7 +90,7 @@ def test_async_add_hass_job_schedule_coroutinefunction(loop):
 
 def test_async_add_hass_job_schedule_partial_coroutinefunction(loop):
     """Test that we schedule partial coros and add jobs to the job pool."""
-    hass = MagicMock(loop=MagicMock(wraps=loop))
+    hass = MagicMock(loop=MagicMock(wraps=loop), instrumentation=None)
 
     async def job():
         pass
@@ -104,7 +105,7 @@ def test_async_add_hass_job_schedule_partial_coroutinefunction(loop):
 
 def test_async_add_job_add_hass_threaded_job_to_pool():
     """Test that we schedule coroutines and add jobs to the job pool."""
-    hass = MagicMock()
+    hass = MagicMock(instrumentation=None)
 
     def job():
         pass
@@ -117,7 +118,7 @@ def test_async_add_job_add_hass_threaded_job_to_pool():
 
 def test_async_create_task_schedule_coroutine(loop):
     """Test that we schedule coroutines and add jobs to the job pool."""
-    hass = MagicMock(loop=MagicMock(wraps=loop))
+    hass = MagicMock(loop=MagicMock(wraps=loop), instrumentation=None)
 
     async def job():
         pass
@@ -130,7 +131,7 @@ def test_async_create_task_schedule_coroutine(loop):
 
 def test_async_run_hass_job_calls_callback():
     """Test that the callback annotation is respected."""
-    hass = MagicMock()
+    hass = MagicMock(instrumentation=None)
     calls = []
 
     def job():
@@ -143,7 +144,7 @@ def test_async_run_hass_job_calls_callback():
 
 def test_async_run_hass_job_delegates_non_async():
     """Test that the callback annotation is respected."""
-    hass = MagicMock()
+    hass = MagicMock(instrumentation=None)
     calls = []
 
     def job():
@@ -383,6 +384,24 @@ def test_state_as_dict():
     assert state.as_dict() is state.as_dict()
 
 
+def test_state_as_dict_json():
+    """Test a State as JSON."""
+    last_time = datetime(1984, 12, 8, 12, 0, 0)
+    state = ha.State(
+        "happy.happy",
+        "on",
+        {"pig": "dog"},
+        last_updated=last_time,
+        last_changed=last_time,
+    )
+    assert json.loads(state.as_dict_json) == state.as_dict()
+    # 2nd time to verify cache
+    assert state.as_dict_json is state.as_dict_json
+
+    with pytest.raises(TypeError):
+        ha.State("happy.happy", "on", {"pig": object()}).as_dict_json
+
+
 async def test_eventbus_add_remove_listener(hass):
     """Test remove_listener method."""
     old_count = len(hass.bus.async_listeners())
@@ -431,6 +450,98 @@ async def test_eventbus_filtered_listener(hass):
     unsub()
 
 
+async def test_eventbus_keyed_listener(hass):
+    """Test listeners indexed by a data key."""
+    calls = []
+    other_calls = []
+
+    @ha.callback
+    def listener(event):
+        """Mock listener."""
+        calls.append(event)
+
+    @ha.callback
+    def other_listener(event):
+        """Mock listener."""
+        other_calls.append(event)
+
+    listeners = hass.bus.async_listeners().get("test", 0)
+    unsub = hass.bus.async_listen_keyed(
+        "test", "entity_id", ["light.kitchen", "light.bowl"], listener
+    )
+    unsub_other = hass.bus.async_listen_keyed(
+        "test", "entity_id", ["light.bowl"], other_listener
+    )
+    assert hass.bus.async_listeners()["test"] == listeners + 2
+
+    hass.bus.async_fire("test", {"entity_id": "light.kitchen"})
+    hass.bus.async_fire("test", {"entity_id": "light.bowl"})
+    hass.bus.async_fire("test", {"entity_id": "light.ceiling"})
+    hass.bus.async_fire("test", {"entity_id": ["light.kitchen"]})
+    hass.bus.async_fire("test")
+    hass.bus.async_fire("other", {"entity_id": "light.kitchen"})
+    await hass.async_block_till_done()
+
+    assert [call.data["entity_id"] for call in calls] == [
+        "light.kitchen",
+        "light.bowl",
+    ]
+    assert len(other_calls) == 1
+
+    unsub()
+    hass.bus.async_fire("test", {"entity_id": "light.bowl"})
+    await hass.async_block_till_done()
+
+    assert len(calls) == 2
+    assert len(other_calls) == 2
+
+    unsub_other()
+    assert hass.bus.async_listeners().get("test", 0) == listeners
+
+
+async def test_eventbus_batch_listener(hass):
+    """Test batch listeners receive the events fired together."""
+    batches = []
+    filtered_batches = []
+
+    @ha.callback
+    def listener(events):
+        """Mock batch listener."""
+        batches.append(events)
+
+    @ha.callback
+    def event_filter(event):
+        """Mock filter."""
+        return event.data["value"] % 2 == 0
+
+    @ha.callback
+    def filtered_listener(events):
+        """Mock batch listener."""
+        filtered_batches.append(events)
+
+    unsub = hass.bus.async_listen_batch("test", listener)
+    hass.bus.async_listen_batch(MATCH_ALL, filtered_listener, event_filter)
+
+    hass.bus.async_fire("test", {"value": 1})
+    hass.bus.async_fire_events(
+        "test", [ha.Event("test", {"value": value}) for value in range(2, 5)]
+    )
+    await hass.async_block_till_done()
+
+    assert [[event.data["value"] for event in batch] for batch in batches] == [
+        [1],
+        [2, 3, 4],
+    ]
+    assert [[event.data["value"] for event in batch] for batch in filtered_batches] == [
+        [2, 4]
+    ]
+
+    unsub()
+    hass.bus.async_fire("test", {"value": 5})
+    await hass.async_block_till_done()
+    assert len(batches) == 2
+
+
 async def test_eventbus_unsubscribe_listener(hass):
     """Test unsubscribe listener from returned function."""
     calls = []
@@ -728,6 +839,68 @@ async def test_statemachine_force_update(hass):
     assert len(events) == 1
 
 
+async def test_statemachine_shares_unchanged_attributes(hass):
+    """Test states share the attributes of the previous state if they did not change."""
+    hass.states.async_set("light.bowl", "on", {"brightness": 100})
+    old_state = hass.states.get("light.bowl")
+
+    hass.states.async_set("light.bowl", "off", {"brightness": 100})
+    state = hass.states.get("light.bowl")
+    assert state.attributes is old_state.attributes
+
+    hass.states.async_set("light.bowl", "on", {"brightness": 50})
+    assert hass.states.get("light.bowl").attributes == {"brightness": 50}
+
+
+async def test_statemachine_set_current_attributes(hass):
+    """Test passing the attributes of the current state."""
+    hass.states.async_set("light.bowl", "on", {"brightness": 100})
+    old_state = hass.states.get("light.bowl")
+    events = async_capture_events(hass, EVENT_STATE_CHANGED)
+
+    hass.states.async_set("light.bowl", "on", old_state.attributes)
+    await hass.async_block_till_done()
+    assert len(events) == 0
+
+    hass.states.async_set("light.bowl", "off", old_state.attributes)
+    await hass.async_block_till_done()
+    assert len(events) == 1
+    assert events[0].data["new_state"].attributes is old_state.attributes
+
+
+async def test_statemachine_batch(hass):
+    """Test state changes of a batch are fired together."""
+    hass.states.async_set("light.bowl", "on")
+    batches = []
+    events = async_capture_events(hass, EVENT_STATE_CHANGED)
+
+    @ha.callback
+    def listener(events):
+        """Mock batch listener."""
+        batches.append(events)
+
+    hass.bus.async_listen_batch(EVENT_STATE_CHANGED, listener)
+
+    with hass.states.async_batch():
+        hass.states.async_set("light.bowl", "off")
+        with hass.states.async_batch():
+            hass.states.async_set("light.kitchen", "on")
+        hass.states.async_remove("light.bowl")
+        # States are set immediately
+        assert hass.states.get("light.kitchen").state == "on"
+        await hass.async_block_till_done()
+        assert batches == []
+
+    hass.states.async_set_many([("light.one", "on", None), ("light.two", "on", {})])
+    await hass.async_block_till_done()
+
+    assert len(events) == 5
+    assert [len(batch) for batch in batches] == [3, 2]
+    assert batches[0][0].data["new_state"].state == "off"
+    assert batches[0][2].data["new_state"] is None
+    assert batches[1][1].data["entity_id"] == "light.two"
+
+
 def test_service_call_repr():
     """Test ServiceCall repr."""
     call = ha.ServiceCall("homeassistant", "start")
@@ -1268,6 +1441,12 @@ def test_context():
     assert c.parent_id == 100
     assert c.id is not None
 
+    assert c == ha.Context(23, 100, c.id)
+    assert hash(c) == hash(ha.Context(23, 100, c.id))
+    assert c != ha.Context(23, 100)
+    assert c != ha.Context(23, None, c.id)
+    assert repr(c) == f"Context(user_id=23, parent_id=100, id='{c.id}')"
+
 
 async def test_async_functions_with_callback(hass):
     """Test we deal with async functions accidentally marked as callback."""
@@ -1572,3 +1751,41 @@ async def test_state_change_events_match_state_time(hass):
     state = hass.states.get("light.bedroom")
 
     assert state.last_updated == events[0].time_fired
+
+
+async def test_instrumentation(hass):
+    """Test jobs are timed while instrumentation is started."""
+    calls = []
+
+    @ha.callback
+    def callback_target(value):
+        calls.append(value)
+
+    async def coroutine_target(value):
+        calls.append(value)
+
+    hass.async_run_hass_job(ha.HassJob(callback_target), 1)
+    assert hass.instrumentation is None
+
+    instrumentation = hass.async_start_instrumentation()
+    assert hass.async_start_instrumentation() is instrumentation
+
+    hass.async_run_hass_job(ha.HassJob(callback_target), 2)
+    hass.async_add_hass_job(ha.HassJob(callback_target), 3)
+    hass.async_add_hass_job(ha.HassJob(coroutine_target), 4)
+    await hass.async_add_executor_job(calls.append, 5)
+    await hass.async_block_till_done()
+    assert sorted(calls) == [1, 2, 3, 4, 5]
+
+    jobs = {
+        name.rpartition(".")[2]: stats
+        for name, stats in instrumentation.slowest_jobs(10)
+    }
+    assert jobs["callback_target"].run.count == 2
+    assert jobs["coroutine_target"].run.count == 1
+    assert jobs["append"].wait.count == 1
+
+    hass.async_stop_instrumentation()
+    assert hass.instrumentation is None
+    hass.async_run_hass_job(ha.HassJob(callback_target), 6)
+    assert jobs["callback_target"].run.count == 2
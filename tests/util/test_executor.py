@@ -1,6 +1,7 @@
 """Test Home Assistant executor util."""
 
 import concurrent.futures
+import threading
 import time
 from unittest.mock import patch
 
@@ -89,3 +90,50 @@ async def test_overall_timeout_reached(caplog):
     assert finish - start < 1
 
     iexecutor.logged_shutdown()
+
+
+def test_executor_pools():
+    """Test named executor pools report their pending jobs."""
+    pools = executor.ExecutorPools({executor.POOL_INTERACTIVE: 8})
+    assert pools.stats() == {}
+
+    pool = pools.get(executor.POOL_INTERACTIVE)
+    assert pools.get(executor.POOL_INTERACTIVE) is pool
+    with pytest.raises(KeyError):
+        pools.get("unknown")
+
+    event = threading.Event()
+    futures = [pool.submit(event.wait) for _ in range(10)]
+    stats = pools.stats()[executor.POOL_INTERACTIVE]
+    assert stats["running"] == 8
+    assert stats["queued"] == 2
+    assert stats["utilization"] == 1
+    assert stats["submitted"] == 10
+
+    event.set()
+    concurrent.futures.wait(futures)
+    assert pool.stats()["running"] == 0
+
+    pools.shutdown()
+    with pytest.raises(RuntimeError):
+        pools.get(executor.POOL_CPU)
+
+
+def test_executor_pool_created_on_first_job():
+    """Test a pool only starts its workers for the first job."""
+    pools = executor.ExecutorPools()
+    with patch("homeassistant.util.executor.ProcessPoolExecutor") as process_pool:
+        pool = pools.get(executor.POOL_CPU)
+        assert pool.max_workers == executor.POOL_MAX_WORKERS[executor.POOL_CPU]
+        assert pools.stats()[executor.POOL_CPU]["submitted"] == 0
+        pools.shutdown()
+    assert not process_pool.called
+
+
+def test_executor_process_pool():
+    """Test the cpu pool runs jobs in processes."""
+    pools = executor.ExecutorPools()
+    pool = pools.get(executor.POOL_CPU)
+    assert pool.processes
+    assert pool.submit(pow, 2, 10).result() == 1024
+    pools.shutdown()
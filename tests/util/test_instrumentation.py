@@ -0,0 +1,133 @@
+"""Test Home Assistant instrumentation util methods."""
+import asyncio
+import functools
+
+import pytest
+
+from homeassistant.util import instrumentation as instrumentation_util
+
+
+def test_histogram():
+    """Test values are counted in buckets."""
+    histogram = instrumentation_util.Histogram()
+    assert histogram.percentile(95) is None
+
+    for value in (0.0005, 0.002, 0.002, 0.04, 30):
+        histogram.add(value)
+
+    assert histogram.count == 5
+    assert histogram.max == 30
+    assert histogram.counts[0] == 1
+    assert histogram.counts[1] == 2
+    assert histogram.counts[-1] == 1
+    assert histogram.percentile(50) == 0.0025
+    assert histogram.percentile(80) == 0.05
+    assert histogram.percentile(100) == 30
+    assert histogram.as_dict()["mean"] == histogram.total / 5
+
+
+def test_job_name():
+    """Test jobs are named after their target."""
+
+    def target():
+        """Target."""
+
+    assert instrumentation_util.job_name(target) == (
+        "tests.util.test_instrumentation.test_job_name.<locals>.target"
+    )
+    assert instrumentation_util.job_name(
+        functools.partial(functools.partial(target))
+    ) == instrumentation_util.job_name(target)
+
+
+def test_template_stats():
+    """Test template renders are accounted to their templates."""
+    instrumentation = instrumentation_util.Instrumentation()
+    instrumentation.record_template("{{ a }}", 0.3, "sensor.a", "sensor.b")
+    instrumentation.record_template("{{ a }}", 0.3, "sensor.c", "sensor.b")
+    instrumentation.record_template("{{ b }}", 0.2)
+    instrumentation.record_template("{{ c }}", 0.2, "sensor.c", "time")
+
+    templates = instrumentation.templates_as_list(2)
+    assert [template["template"] for template in templates] == ["{{ a }}", "{{ b }}"]
+    assert templates[0]["owners"] == ["sensor.a", "sensor.c"]
+    assert templates[0]["triggers"] == {"sensor.b": 2}
+    assert templates[0]["render"]["count"] == 2
+    assert templates[0]["p99"] == 0.3
+    assert templates[0]["share"] == pytest.approx(0.6)
+    assert templates[1]["triggers"] == {instrumentation_util.TRIGGER_RENDER: 1}
+    assert templates[1]["cumulative_share"] == pytest.approx(0.8)
+    assert len(instrumentation.templates_as_list()) == 3
+
+
+async def test_timed_jobs():
+    """Test callbacks, coroutine steps and executor jobs are recorded."""
+    instrumentation = instrumentation_util.Instrumentation()
+
+    def callback_target(value):
+        return value
+
+    async def coroutine_target(value):
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return value
+
+    def executor_target(value):
+        return value
+
+    assert instrumentation.run_callback(callback_target, 1) == 1
+    assert (
+        await asyncio.get_running_loop().create_task(
+            instrumentation.wrap_coroutine(coroutine_target, coroutine_target(2))
+        )
+        == 2
+    )
+    assert (
+        await asyncio.get_running_loop().run_in_executor(
+            None, instrumentation.wrap_executor_job(executor_target), 3
+        )
+        == 3
+    )
+
+    jobs = {
+        name.rpartition(".")[2]: stats
+        for name, stats in instrumentation.slowest_jobs(10)
+    }
+    assert jobs["callback_target"].job_type == "callback"
+    assert jobs["callback_target"].run.count == 1
+    assert jobs["coroutine_target"].job_type == "coroutine"
+    assert jobs["coroutine_target"].run.count == 3
+    assert jobs["coroutine_target"].wait is None
+    assert jobs["executor_target"].job_type == "executor"
+    assert jobs["executor_target"].wait.count == 1
+
+
+async def test_timed_coroutine_cancel():
+    """Test a timed coroutine can be cancelled."""
+    instrumentation = instrumentation_util.Instrumentation()
+
+    async def coroutine_target():
+        await asyncio.sleep(10)
+
+    task = asyncio.get_running_loop().create_task(
+        instrumentation.wrap_coroutine(coroutine_target, coroutine_target())
+    )
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.wait([task])
+    assert task.cancelled()
+    assert instrumentation.slowest_jobs(1)[0][1].run.count == 2
+
+
+async def test_loop_lag(monkeypatch):
+    """Test the event loop lag is measured."""
+    monkeypatch.setattr(instrumentation_util, "LOOP_LAG_INTERVAL", 0)
+    instrumentation = instrumentation_util.Instrumentation()
+    instrumentation.async_start(asyncio.get_running_loop())
+    for _ in range(3):
+        await asyncio.sleep(0)
+    instrumentation.async_stop()
+    count = instrumentation.loop_lag.count
+    assert count
+    await asyncio.sleep(0)
+    assert instrumentation.loop_lag.count == count
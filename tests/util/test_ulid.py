@@ -0,0 +1,13 @@
+"""Test Home Assistant ulid util methods."""
+
+import uuid
+
+import homeassistant.util.ulid as ulid_util
+
+
+async def test_ulid_util_ulid_hex():
+    """Verify we can generate a time ordered ulid."""
+    ulid = ulid_util.ulid_hex()
+    assert len(ulid) == 32
+    assert uuid.UUID(ulid)
+    assert ulid_util.ulid_hex()[:12] >= ulid[:12]